@@ -41,6 +41,11 @@ Solve using the Bathe method::
 
   python simple.py examples/linear_elasticity/elastodynamic.py -O "ts='tsb'"
 
+Solve using the explicit central difference method with the lumped mass
+matrix and the time step given by the critical time step estimate::
+
+  python simple.py examples/linear_elasticity/elastodynamic.py -O "ts='tscd'"
+
 View the resulting deformation using:
 
 - color by :math:`\ul{u}`::
@@ -242,6 +247,21 @@ solvers = {
 
         'verbose' : 1,
     }),
+    'tscd' : ('ts.central_difference', {
+        # Explicit method with the lumped mass matrix -> no linear solves,
+        # the time step is set using the critical time step estimate.
+        't0' : 0.0,
+        't1' : t1,
+
+        'is_linear'  : True,
+
+        'mass_lumping' : 'row_sum',
+        'dt_auto' : True,
+        'dt_safety' : 0.9,
+        'wave_speed' : cl,
+
+        'verbose' : 1,
+    }),
     'tsn' : ('ts.newmark', {
         't0' : 0.0,
         't1' : t1,
@@ -24,9 +24,42 @@ def validate_bool(val):
     else:
         raise ValueError('Could not convert "%s" to boolean!' % val)
 
+def validate_nonnegative_int(val):
+    """
+    Convert val to a non-negative integer or raise a ValueError.
+    """
+    ival = int(val)
+    if ival < 0:
+        raise ValueError('Could not convert "%s" to non-negative integer!'
+                         % val)
+
+    return ival
+
+def validate_str_or_none(val):
+    """
+    Convert val to a string, unless it is None.
+    """
+    if val is None:
+        return val
+
+    return str(val)
+
 default_goptions = {
     'verbose' : [True, validate_bool],
     'check_term_finiteness' : [False, validate_bool],
+    'n_threads' : [0, validate_nonnegative_int],
+    'use_scatter_maps' : [False, validate_bool],
+    'cache_term_matrices' : [False, validate_bool],
+    'chunk_size' : [0, validate_nonnegative_int],
+    'graph_cache_size' : [0, validate_nonnegative_int],
+    'graph_cache_dir' : [None, validate_str_or_none],
+    'profile' : [False, validate_bool],
+    'factorization_cache_size' : [0, validate_nonnegative_int],
+    'cache_reference_bases' : [True, validate_bool],
+    'sum_factorization' : [False, validate_bool],
+    'mapping_cache_size' : [0, validate_nonnegative_int],
+    'mapping_cache_float32' : [False, validate_bool],
+    'mapping_cache_dir' : [None, validate_str_or_none],
 }
 
 class ValidatedDict(dict):
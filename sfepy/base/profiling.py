@@ -0,0 +1,199 @@
+"""
+Simple profiling of the evaluation of equations.
+
+If the 'profile' global option is True (see :mod:`sfepy.base.goptions`), the
+global :data:`profiler` records the wall time, the number of calls and the
+memory allocated in the profiled code sections. The records are grouped by
+categories:
+
+- 'equations' - :func:`Equations.evaluate()
+  <sfepy.discrete.equations.Equations.evaluate()>` calls, by the evaluation
+  mode.
+- 'terms' - :func:`Term.evaluate() <sfepy.terms.terms.Term.evaluate()>` and
+  :func:`Term.evaluate_chunked()
+  <sfepy.terms.terms.Term.evaluate_chunked()>` calls, by the term.
+- 'regions' - the same as 'terms', by the term region.
+- 'materials' - :func:`Material.update_data()
+  <sfepy.discrete.materials.Material.update_data()>` calls, by the material.
+- 'mappings' - the reference mapping creation by fields, by the field,
+  region and integration.
+
+The times of nested sections are inclusive, e.g. a term evaluation time
+includes the time of creating the reference mappings it needs. The
+allocated memory is the net increase of the memory traced by
+:mod:`tracemalloc` - it is recorded only if :mod:`tracemalloc` is
+available. The tracing is started automatically with the first profiled
+section, and slows the computation down - call :func:`Profiler.stop()` to
+stop it.
+"""
+from __future__ import absolute_import
+import time
+from functools import wraps
+
+from sfepy.base.base import output
+from sfepy.base.goptions import goptions
+import six
+
+try:
+    import tracemalloc
+
+except ImportError:
+    tracemalloc = None
+
+class _Section(object):
+    """
+    Context manager measuring a profiled code section.
+    """
+
+    def __init__(self, profiler, keys):
+        self.profiler = profiler
+        self.keys = keys
+
+    def __enter__(self):
+        self.mem0 = self.profiler.get_traced_memory()
+        self.t0 = time.time()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        elapsed = time.time() - self.t0
+        mem = self.profiler.get_traced_memory() - self.mem0
+        for category, key in self.keys:
+            self.profiler.add(category, key, elapsed, mem)
+
+class _NoSection(object):
+    """
+    No-op context manager used when profiling is disabled.
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+_no_section = _NoSection()
+
+class Profiler(object):
+    """
+    Collect the wall time, call counts and allocated memory of profiled code
+    sections.
+
+    The records are stored in the `records` attribute, a dict of dicts
+    `{category : {key : [time, calls, bytes]}}`.
+    """
+
+    def __init__(self, trace_memory=True):
+        self.trace_memory = trace_memory and (tracemalloc is not None)
+        self.is_tracing = False
+        self.reset()
+
+    def reset(self):
+        """
+        Remove all records.
+        """
+        self.records = {}
+
+    def get_traced_memory(self):
+        if not self.trace_memory:
+            return 0
+
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.is_tracing = True
+
+        return tracemalloc.get_traced_memory()[0]
+
+    def stop(self):
+        """
+        Stop the memory tracing, if it was started by the profiler.
+        """
+        if self.is_tracing:
+            tracemalloc.stop()
+            self.is_tracing = False
+
+    def add(self, category, key, elapsed, mem=0):
+        """
+        Add a record of a single call of a code section.
+        """
+        record = self.records.setdefault(category, {}).setdefault(
+            key, [0.0, 0, 0])
+        record[0] += elapsed
+        record[1] += 1
+        record[2] += mem
+
+    def section(self, keys):
+        """
+        Return a context manager measuring the enclosed code section.
+
+        Parameters
+        ----------
+        keys : list of tuples or callable
+            The `(category, key)` pairs to which the measurements are
+            added, or a function without arguments returning them. If the
+            'profile' global option is False, nothing is measured and the
+            function is not called.
+        """
+        if not goptions['profile']:
+            return _no_section
+
+        if callable(keys):
+            keys = keys()
+
+        return _Section(self, keys)
+
+    def get_report(self):
+        """
+        Get the records as a dict of dicts `{category : {key : {'time' :
+        time, 'calls' : calls, 'bytes' : bytes}}}`.
+        """
+        report = {}
+        for category, records in six.iteritems(self.records):
+            report[category] = {key : {'time' : rec[0], 'calls' : rec[1],
+                                       'bytes' : rec[2]}
+                                for key, rec in six.iteritems(records)}
+
+        return report
+
+    def print_report(self, n_max=10):
+        """
+        Print the records of each category, sorted by the decreasing time.
+        At most `n_max` records are printed per category, all if `n_max` is
+        None.
+        """
+        output('profile report (inclusive times):')
+        for category in sorted(self.records.keys()):
+            records = self.records[category]
+            output('%s:' % category)
+            items = sorted(six.iteritems(records), key=lambda x: -x[1][0])
+            for key, (elapsed, calls, mem) in items[:n_max]:
+                output('  %10.4f [s] %8d calls %10.2f [MB] : %s'
+                       % (elapsed, calls, mem / 1024.0**2, key))
+
+            if (n_max is not None) and (len(items) > n_max):
+                output('  ... %d more' % (len(items) - n_max))
+
+profiler = Profiler()
+
+def profiled(get_keys):
+    """
+    Decorator profiling a method using :data:`profiler`.
+
+    Parameters
+    ----------
+    get_keys : callable
+        The function called with the arguments of the decorated method,
+        that returns the list of `(category, key)` pairs for the profiler
+        records.
+    """
+    def _decorator(fun):
+        @wraps(fun)
+        def _profiled(*args, **kwargs):
+            if not goptions['profile']:
+                return fun(*args, **kwargs)
+
+            with profiler.section(get_keys(*args, **kwargs)):
+                return fun(*args, **kwargs)
+
+        return _profiled
+
+    return _decorator
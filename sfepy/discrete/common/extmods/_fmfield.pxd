@@ -142,7 +142,7 @@ cdef extern from "geommech.h":
                                          int32 *conn)
 
 cdef int array2fmfield4(FMField *out,
-                        np.ndarray[float64, mode='c', ndim=4] arr) except -1
+                        np.ndarray[float64, ndim=4] arr) except -1
 cdef int array2fmfield3(FMField *out,
                         np.ndarray[float64, mode='c', ndim=3] arr) except -1
 cdef int array2fmfield2(FMField *out,
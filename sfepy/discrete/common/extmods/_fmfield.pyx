@@ -3,16 +3,36 @@ cimport cython
 
 @cython.boundscheck(False)
 cdef inline int array2fmfield4(FMField *out,
-                               np.ndarray[float64, mode='c', ndim=4] arr) \
+                               np.ndarray[float64, ndim=4] arr) \
                                except -1:
+    """
+    The array has to be C-contiguous, or broadcast along the first (cell)
+    axis with C-contiguous cells. In the latter case, the cell size of the
+    FMField is zero, so that all cells share the same data.
+    """
     cdef int32 n_cell, n_lev, n_row, n_col
     cdef int32 ii
+    cdef np.npy_intp *strides = arr.strides
+    cdef np.npy_intp isize = sizeof(float64)
+    cdef bint is_broadcast = False
 
     sh = arr.shape
     n_cell, n_lev, n_row, n_col = sh[0], sh[1], sh[2], sh[3]
 
+    if not np.PyArray_IS_C_CONTIGUOUS(arr):
+        is_broadcast = ((n_cell > 1) and (strides[0] == 0)
+                        and ((n_col <= 1) or (strides[3] == isize))
+                        and ((n_row <= 1) or (strides[2] == isize * n_col))
+                        and ((n_lev <= 1)
+                             or (strides[1] == isize * n_col * n_row)))
+        if not is_broadcast:
+            raise ValueError('ndarray is not C-contiguous'
+                             ' or broadcast along cells!')
+
     out.nAlloc = -1
     fmf_pretend(out, n_cell, n_lev, n_row, n_col, &arr[0, 0, 0, 0])
+    if is_broadcast:
+        out.cellSize = 0
 
 @cython.boundscheck(False)
 cdef inline int array2fmfield3(FMField *out,
@@ -3,11 +3,12 @@
 Low level finite element assembling functions.
 """
 cimport cython
+from cython.parallel cimport prange
 
 import numpy as np
 cimport numpy as np
 
-from types cimport int32, float64, complex128
+from types cimport int32, uint64, float64, complex128
 
 @cython.boundscheck(False)
 def assemble_vector(np.ndarray[float64, mode='c', ndim=1] vec not None,
@@ -85,7 +86,14 @@ def assemble_matrix(np.ndarray[float64, mode='c', ndim=1] mtx not None,
                     np.ndarray[int32, mode='c', ndim=1] iels not None,
                     float64 sign,
                     np.ndarray[int32, mode='c', ndim=2] row_conn not None,
-                    np.ndarray[int32, mode='c', ndim=2] col_conn not None):
+                    np.ndarray[int32, mode='c', ndim=2] col_conn not None,
+                    int upper=False):
+    """
+    Assemble cell matrices into a CSR matrix given by `mtx`, `prows`,
+    `cols`. If `upper` is True, only the upper triangle items, including
+    the diagonal, are assembled - the CSR structure then needs to contain
+    only the upper triangle.
+    """
     cdef int32 ii, iel, ir, ic, irg, icg, ik, iloc
     cdef int32 num = iels.shape[0]
     cdef int32 n_epr = row_conn.shape[1]
@@ -118,6 +126,7 @@ def assemble_matrix(np.ndarray[float64, mode='c', ndim=1] mtx not None,
             for ic in range(0, n_epc):
                 icg = pcol_conn[ic]
                 if icg < 0: continue
+                if upper and (icg < irg): continue
 
                 iloc = n_epc * ir + ic
 
@@ -142,7 +151,11 @@ def assemble_matrix_complex(np.ndarray[complex128, mode='c', ndim=1]
                             np.ndarray[int32, mode='c', ndim=2]
                             row_conn not None,
                             np.ndarray[int32, mode='c', ndim=2]
-                            col_conn not None):
+                            col_conn not None,
+                            int upper=False):
+    """
+    Complex version of :func:`assemble_matrix()`.
+    """
     cdef int32 ii, iel, ir, ic, irg, icg, ik, iloc
     cdef int32 num = iels.shape[0]
     cdef int32 n_epr = row_conn.shape[1]
@@ -175,6 +188,7 @@ def assemble_matrix_complex(np.ndarray[complex128, mode='c', ndim=1]
             for ic in range(0, n_epc):
                 icg = pcol_conn[ic]
                 if icg < 0: continue
+                if upper and (icg < irg): continue
 
                 iloc = n_epc * ir + ic
 
@@ -186,3 +200,404 @@ def assemble_matrix_complex(np.ndarray[complex128, mode='c', ndim=1]
                 else:
                     msg = 'matrix item (%d, %d) does not exist!' % (irg, icg)
                     raise IndexError(msg)
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def color_cells(np.ndarray[int32, mode='c', ndim=1] iels not None,
+                np.ndarray[int32, mode='c', ndim=2] conn not None,
+                int32 n_dof):
+    """
+    Color the assembling cells so that no two cells of the same color share
+    a DOF in `conn`. Negative DOF numbers are ignored, as they are not
+    assembled.
+
+    A greedy algorithm is used: the colors used in each DOF are stored in a
+    64-bit mask, so that at most 64 colors are assigned in one pass over the
+    cells. The cells that could not be colored are processed in the next
+    pass with a new set of colors.
+
+    Parameters
+    ----------
+    iels : array
+        The assembling cells, i.e. the row indices into `conn`.
+    conn : array
+        The DOF connectivity.
+    n_dof : int
+        The number of DOFs, greater than the maximum DOF number in `conn`.
+
+    Returns
+    -------
+    color_ptr : array
+        The pointers to `color_items` delimiting the individual colors.
+    color_items : array
+        The positions in `iels` grouped by colors.
+    """
+    cdef int32 ii, ir, irg, ib, base
+    cdef int32 num = iels.shape[0]
+    cdef int32 n_ep = conn.shape[1]
+    cdef int32 n_left = num
+    cdef uint64 used, bit
+    cdef uint64 full = <uint64> 0xffffffffffffffffULL
+    cdef int32 *piels = &iels[0] if num else NULL
+    cdef (int32 *) pconn0, pconn
+    cdef np.ndarray[int32, mode='c', ndim=1] colors
+    cdef np.ndarray[uint64, mode='c', ndim=1] masks
+    cdef int32 *pcolors
+    cdef uint64 *pmasks
+
+    colors = np.empty(num, dtype=np.int32)
+    colors.fill(-1)
+    masks = np.empty(max(n_dof, 1), dtype=np.uint64)
+
+    pcolors = &colors[0] if num else NULL
+    pmasks = &masks[0]
+    pconn0 = &conn[0, 0] if conn.size else NULL
+
+    base = 0
+    while n_left > 0:
+        masks.fill(0)
+
+        for ii in range(0, num):
+            if pcolors[ii] >= 0: continue
+
+            pconn = pconn0 + piels[ii] * n_ep
+
+            used = 0
+            for ir in range(0, n_ep):
+                irg = pconn[ir]
+                if irg < 0: continue
+
+                used |= pmasks[irg]
+
+            if used == full: continue
+
+            ib = 0
+            bit = 1
+            while used & bit:
+                ib += 1
+                bit <<= 1
+
+            pcolors[ii] = base + ib
+            n_left -= 1
+
+            for ir in range(0, n_ep):
+                irg = pconn[ir]
+                if irg < 0: continue
+
+                pmasks[irg] |= bit
+
+        base += 64
+
+    color_items = np.argsort(colors, kind='mergesort').astype(np.int32)
+    counts = np.bincount(colors)
+    counts = counts[counts > 0]
+    color_ptr = np.zeros(len(counts) + 1, dtype=np.int32)
+    np.cumsum(counts, out=color_ptr[1:])
+
+    return color_ptr, color_items
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def assemble_vector_colored(np.ndarray[float64, mode='c', ndim=1]
+                            vec not None,
+                            np.ndarray[float64, mode='c', ndim=4]
+                            vec_in_els not None,
+                            np.ndarray[int32, mode='c', ndim=1] iels not None,
+                            float64 sign,
+                            np.ndarray[int32, mode='c', ndim=2] conn not None,
+                            np.ndarray[int32, mode='c', ndim=1]
+                            color_ptr not None,
+                            np.ndarray[int32, mode='c', ndim=1]
+                            color_items not None,
+                            int n_threads):
+    """
+    Threaded version of :func:`assemble_vector()`. The cells of each color
+    given by :func:`color_cells()` do not share any DOF, so that they are
+    assembled in parallel without write conflicts.
+    """
+    cdef int32 ic, jj, ii, ir, irg
+    cdef int32 num = iels.shape[0]
+    cdef int32 n_ep = conn.shape[1]
+    cdef int32 n_color = color_ptr.shape[0] - 1
+    # Allow both row or column vectors.
+    cdef int32 cell_size = vec_in_els.shape[2] * vec_in_els.shape[3]
+    cdef (int32 *) pconn0, pconn
+    cdef int32 *piels
+    cdef int32 *pptr = &color_ptr[0]
+    cdef int32 *pitems
+    cdef float64 *val = &vec[0]
+    cdef (float64 *) vec_in_el0, vec_in_el
+
+    assert num == vec_in_els.shape[0]
+    assert num == color_items.shape[0]
+    if num == 0: return
+
+    piels = &iels[0]
+    pitems = &color_items[0]
+    pconn0 = &conn[0, 0]
+    vec_in_el0 = &vec_in_els[0, 0, 0, 0]
+
+    for ic in range(0, n_color):
+        for jj in prange(pptr[ic], pptr[ic + 1], nogil=True,
+                         num_threads=n_threads, schedule='static'):
+            ii = pitems[jj]
+
+            pconn = pconn0 + piels[ii] * n_ep
+            vec_in_el = vec_in_el0 + ii * cell_size
+
+            for ir in range(0, n_ep):
+                irg = pconn[ir]
+                if irg < 0: continue
+
+                val[irg] += sign * vec_in_el[ir]
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef inline int32 _assemble_matrix_cell(float64 *val,
+                                        int32 *_prows, int32 *_cols,
+                                        float64 *mtx_in_el, float64 sign,
+                                        int32 *prow_conn, int32 n_epr,
+                                        int32 *pcol_conn,
+                                        int32 n_epc, int32 upper) nogil:
+    """
+    Assemble a single cell matrix, return the number of matrix items missing
+    in the CSR structure.
+    """
+    cdef int32 ir, ic, irg, icg, ik, iloc
+    cdef int32 n_missing = 0
+
+    for ir in range(0, n_epr):
+        irg = prow_conn[ir]
+        if irg < 0: continue
+
+        for ic in range(0, n_epc):
+            icg = pcol_conn[ic]
+            if icg < 0: continue
+            if upper and (icg < irg): continue
+
+            iloc = n_epc * ir + ic
+
+            for ik in range(_prows[irg], _prows[irg + 1]):
+                if _cols[ik] == icg:
+                    val[ik] += sign * mtx_in_el[iloc]
+                    break
+
+            else:
+                n_missing += 1
+
+    return n_missing
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def assemble_matrix_colored(np.ndarray[float64, mode='c', ndim=1] mtx not None,
+                            np.ndarray[int32, mode='c', ndim=1] prows not None,
+                            np.ndarray[int32, mode='c', ndim=1] cols not None,
+                            np.ndarray[float64, mode='c', ndim=4]
+                            mtx_in_els not None,
+                            np.ndarray[int32, mode='c', ndim=1] iels not None,
+                            float64 sign,
+                            np.ndarray[int32, mode='c', ndim=2]
+                            row_conn not None,
+                            np.ndarray[int32, mode='c', ndim=2]
+                            col_conn not None,
+                            np.ndarray[int32, mode='c', ndim=1]
+                            color_ptr not None,
+                            np.ndarray[int32, mode='c', ndim=1]
+                            color_items not None,
+                            int n_threads, int upper=False):
+    """
+    Threaded version of :func:`assemble_matrix()`. The cells of each color
+    given by :func:`color_cells()` applied to `row_conn` do not share any
+    matrix row, so that they are assembled in parallel without write
+    conflicts.
+    """
+    cdef int32 ic, jj, ii, iel
+    cdef int32 n_missing = 0
+    cdef int32 num = iels.shape[0]
+    cdef int32 n_epr = row_conn.shape[1]
+    cdef int32 n_epc = col_conn.shape[1]
+    cdef int32 n_color = color_ptr.shape[0] - 1
+    cdef int32 cell_size = mtx_in_els.shape[2] * mtx_in_els.shape[3]
+    cdef (int32 *) prow_conn0, pcol_conn0
+    cdef int32 *piels
+    cdef int32 *pptr = &color_ptr[0]
+    cdef int32 *pitems
+    cdef int32 *_prows = &prows[0]
+    cdef int32 *_cols = &cols[0]
+    cdef float64 *val = &mtx[0]
+    cdef float64 *mtx_in_el0
+
+    assert num == mtx_in_els.shape[0]
+    assert num == color_items.shape[0]
+    if num == 0: return
+
+    piels = &iels[0]
+    pitems = &color_items[0]
+    prow_conn0 = &row_conn[0, 0]
+    pcol_conn0 = &col_conn[0, 0]
+    mtx_in_el0 = &mtx_in_els[0, 0, 0, 0]
+
+    for ic in range(0, n_color):
+        for jj in prange(pptr[ic], pptr[ic + 1], nogil=True,
+                         num_threads=n_threads, schedule='static'):
+            ii = pitems[jj]
+            iel = piels[ii]
+
+            n_missing += _assemble_matrix_cell(val, _prows, _cols,
+                                               mtx_in_el0 + ii * cell_size,
+                                               sign,
+                                               prow_conn0 + iel * n_epr, n_epr,
+                                               pcol_conn0 + iel * n_epc, n_epc,
+                                               upper)
+
+    if n_missing:
+        msg = '%d matrix items do not exist!' % n_missing
+        raise IndexError(msg)
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def create_scatter_map(np.ndarray[int32, mode='c', ndim=1] prows not None,
+                       np.ndarray[int32, mode='c', ndim=1] cols not None,
+                       np.ndarray[int32, mode='c', ndim=1] iels not None,
+                       np.ndarray[int32, mode='c', ndim=2] row_conn not None,
+                       np.ndarray[int32, mode='c', ndim=2] col_conn not None,
+                       int upper=False):
+    """
+    Create the scatter map of cell matrix items into the data array of a CSR
+    matrix given by `prows`, `cols`. If `upper` is True, the items below the
+    diagonal are not assembled.
+
+    Returns
+    -------
+    offsets : array
+        The offsets into the CSR matrix data of shape `(n_cell, n_epr *
+        n_epc)`. The items not to be assembled, corresponding to negative
+        DOF numbers in `row_conn` or `col_conn` or to the lower triangle,
+        have the offset -1.
+    """
+    cdef int32 ii, iel, ir, ic, irg, icg, ik
+    cdef int32 num = iels.shape[0]
+    cdef int32 n_epr = row_conn.shape[1]
+    cdef int32 n_epc = col_conn.shape[1]
+    cdef (int32 *) prow_conn0, pcol_conn0, prow_conn, pcol_conn, poffset
+    cdef int32 *_prows = &prows[0]
+    cdef int32 *_cols = &cols[0]
+    cdef np.ndarray[int32, mode='c', ndim=2] offsets
+
+    offsets = np.empty((num, n_epr * n_epc), dtype=np.int32)
+    if num == 0: return offsets
+
+    prow_conn0 = &row_conn[0, 0]
+    pcol_conn0 = &col_conn[0, 0]
+
+    for ii in range(0, num):
+        iel = iels[ii]
+
+        prow_conn = prow_conn0 + iel * n_epr
+        pcol_conn = pcol_conn0 + iel * n_epc
+        poffset = &offsets[ii, 0]
+
+        for ir in range(0, n_epr):
+            irg = prow_conn[ir]
+
+            for ic in range(0, n_epc):
+                icg = pcol_conn[ic]
+                if (irg < 0) or (icg < 0) or (upper and (icg < irg)):
+                    poffset[n_epc * ir + ic] = -1
+                    continue
+
+                for ik in range(_prows[irg], _prows[irg + 1]):
+                    if _cols[ik] == icg:
+                        poffset[n_epc * ir + ic] = ik
+                        break
+
+                else:
+                    msg = 'matrix item (%d, %d) does not exist!' % (irg, icg)
+                    raise IndexError(msg)
+
+    return offsets
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def assemble_matrix_mapped(np.ndarray[float64, mode='c', ndim=1] mtx not None,
+                           np.ndarray[float64, mode='c', ndim=4]
+                           mtx_in_els not None,
+                           float64 sign,
+                           np.ndarray[int32, mode='c', ndim=2]
+                           offsets not None):
+    """
+    Assemble cell matrices into the data array of a CSR matrix using the
+    scatter map `offsets` created by :func:`create_scatter_map()`.
+    """
+    cdef Py_ssize_t ii, n_item
+    cdef int32 ik
+    cdef int32 num = offsets.shape[0]
+    cdef int32 cell_size = offsets.shape[1]
+    cdef int32 *poffsets
+    cdef float64 *val = &mtx[0]
+    cdef float64 *mtx_in_el0
+
+    assert num == mtx_in_els.shape[0]
+    assert cell_size == mtx_in_els.shape[2] * mtx_in_els.shape[3]
+    if num == 0: return
+
+    poffsets = &offsets[0, 0]
+    mtx_in_el0 = &mtx_in_els[0, 0, 0, 0]
+
+    n_item = <Py_ssize_t> num * cell_size
+    for ii in range(0, n_item):
+        ik = poffsets[ii]
+        if ik < 0: continue
+
+        val[ik] += sign * mtx_in_el0[ii]
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def assemble_matrix_mapped_colored(np.ndarray[float64, mode='c', ndim=1]
+                                   mtx not None,
+                                   np.ndarray[float64, mode='c', ndim=4]
+                                   mtx_in_els not None,
+                                   float64 sign,
+                                   np.ndarray[int32, mode='c', ndim=2]
+                                   offsets not None,
+                                   np.ndarray[int32, mode='c', ndim=1]
+                                   color_ptr not None,
+                                   np.ndarray[int32, mode='c', ndim=1]
+                                   color_items not None,
+                                   int n_threads):
+    """
+    Threaded version of :func:`assemble_matrix_mapped()`, see also
+    :func:`assemble_matrix_colored()`.
+    """
+    cdef int32 ic, jj, ii, iloc, ik
+    cdef int32 num = offsets.shape[0]
+    cdef int32 cell_size = offsets.shape[1]
+    cdef int32 n_color = color_ptr.shape[0] - 1
+    cdef int32 *pptr = &color_ptr[0]
+    cdef int32 *pitems
+    cdef (int32 *) poffsets0, poffset
+    cdef float64 *val = &mtx[0]
+    cdef (float64 *) mtx_in_el0, mtx_in_el
+
+    assert num == mtx_in_els.shape[0]
+    assert num == color_items.shape[0]
+    assert cell_size == mtx_in_els.shape[2] * mtx_in_els.shape[3]
+    if num == 0: return
+
+    pitems = &color_items[0]
+    poffsets0 = &offsets[0, 0]
+    mtx_in_el0 = &mtx_in_els[0, 0, 0, 0]
+
+    for ic in range(0, n_color):
+        for jj in prange(pptr[ic], pptr[ic + 1], nogil=True,
+                         num_threads=n_threads, schedule='static'):
+            ii = pitems[jj]
+
+            poffset = poffsets0 + <Py_ssize_t> ii * cell_size
+            mtx_in_el = mtx_in_el0 + <Py_ssize_t> ii * cell_size
+
+            for iloc in range(0, cell_size):
+                ik = poffset[iloc]
+                if ik < 0: continue
+
+                val[ik] += sign * mtx_in_el[iloc]
@@ -714,7 +714,7 @@ cdef extern from 'meshutils.h':
     int32 mesh_graph(int32 *p_nnz, int32 **p_prow, int32 **p_icol,
                      int32 n_row, int32 n_col, int32 n_gr, int32 *n_el,
                      int32 *n_epr, int32 **conn_r,
-                     int32 *n_epc, int32 **conn_c)
+                     int32 *n_epc, int32 **conn_c, int32 upper)
 
     int32 c_graph_components \
           'graph_components'(int32 *p_n_comp,
@@ -750,7 +750,8 @@ def orient_elements(np.ndarray[int32, mode='c', ndim=1] flag not None,
                              swap_to.shape[0], swap_to.shape[1])
 
 @cython.boundscheck(False)
-def create_mesh_graph(int n_row, int n_col, int n_gr, rconns, cconns):
+def create_mesh_graph(int n_row, int n_col, int n_gr, rconns, cconns,
+                      int upper=False):
     """
     Create sparse (CSR) graph corresponding to given row and column
     connectivities.
@@ -767,6 +768,10 @@ def create_mesh_graph(int n_row, int n_col, int n_gr, rconns, cconns):
         The list of length `n_gr` of row connectivities.
     cconns : list of arrays
         The list of length `n_gr` of column connectivities.
+    upper : bool
+        If True, create only the upper triangle of the graph, including the
+        diagonal. Makes sense only if the row and column connectivities
+        share the same numbering.
 
     Returns
     -------
@@ -807,7 +812,7 @@ def create_mesh_graph(int n_row, int n_col, int n_gr, rconns, cconns):
             conn_c[ii] = &cconn[0, 0]
 
         mesh_graph(&nnz, &pprow, &picol, n_row, n_col, n_gr, n_el,
-                   n_epr, conn_r, n_epc, conn_c)
+                   n_epr, conn_r, n_epc, conn_c, upper)
 
         prow = np.empty((n_row + 1,), dtype=np.int32)
         icol = np.empty((nnz,), dtype=np.int32)
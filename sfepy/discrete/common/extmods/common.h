@@ -131,7 +131,22 @@ void sys_pause(void);
 #define ERR_Chk (g_error != 0)
 #define ERR_Clear (g_error = 0)
 #define ErrHead __FUNC__ "(): "
-extern int32 g_error;
+
+/*
+  The error flag is thread-local, so that the C functions running
+  concurrently in several threads do not see or clear the errors of each
+  other.
+*/
+#if defined(_MSC_VER)
+#  define SFEPY_THREAD_LOCAL __declspec(thread)
+#elif defined(__STDC_VERSION__) && (__STDC_VERSION__ >= 201112L) \
+  && !defined(__STDC_NO_THREADS__)
+#  define SFEPY_THREAD_LOCAL _Thread_local
+#else
+#  define SFEPY_THREAD_LOCAL __thread
+#endif
+
+extern SFEPY_THREAD_LOCAL int32 g_error;
 
 #define Max(a,b) (((a) > (b)) ? (a) : (b))
 #define Min(a,b) (((a) < (b)) ? (a) : (b))
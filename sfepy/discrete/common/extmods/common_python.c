@@ -2,7 +2,17 @@
 
 #include "common.h"
 
-int32 g_error = 0;
+/*
+  The C functions may be called with the GIL released (e.g. from the term
+  evaluation functions running in several threads). The Python C-API
+  functions and the memory usage bookkeeping below are therefore called with
+  the GIL acquired by PyGILState_Ensure(), which is a no-op if the calling
+  thread already holds it. The error flag g_error is thread-local, as is the
+  Python error indicator, so errput(), errset() and errclear() affect only
+  the calling thread.
+*/
+
+SFEPY_THREAD_LOCAL int32 g_error = 0;
 
 #undef __FUNC__
 #define __FUNC__ "output"
@@ -31,17 +41,25 @@ void errput(const char *what, ...)
 {
   va_list ap;
 
+  PyGILState_STATE gil = PyGILState_Ensure();
+
   va_start(ap, what);
   vprintf(what, ap);
   va_end(ap);
   PyErr_SetString(PyExc_RuntimeError, "ccore error (see above)");
   g_error++;
+
+  PyGILState_Release(gil);
 }
 
 void errset(const char *msg)
 {
+  PyGILState_STATE gil = PyGILState_Ensure();
+
   PyErr_SetString(PyExc_RuntimeError, msg);
   g_error++;
+
+  PyGILState_Release(gil);
 }
 
 #undef __FUNC__
@@ -52,8 +70,12 @@ void errset(const char *msg)
 */
 void errclear()
 {
+  PyGILState_STATE gil = PyGILState_Ensure();
+
   PyErr_Clear();
   g_error = 0;
+
+  PyGILState_Release(gil);
 }
 
 /*!
@@ -156,6 +178,7 @@ void *mem_alloc_mem(size_t size, int lineNo, char *funName,
   char *p;
   size_t hsize = sizeof(AllocSpaceAlign);
   size_t tsize, aux;
+  PyGILState_STATE gil = PyGILState_Ensure();
 
   if (size == 0) {
     errput("%s, %s, %s, %d: zero allocation!\n",
@@ -181,6 +204,8 @@ void *mem_alloc_mem(size_t size, int lineNo, char *funName,
   }
   al_frags++;
 
+  PyGILState_Release(gil);
+
   memset(p, 0, size);
 
   return((void *) p);
@@ -190,6 +215,8 @@ void *mem_alloc_mem(size_t size, int lineNo, char *funName,
     errput(ErrHead "error exit!\n");
   }
 
+  PyGILState_Release(gil);
+
   return(0);
 }
 
@@ -204,9 +231,12 @@ void *mem_realloc_mem(void *pp, size_t size, int lineNo, char *funName,
   float64 *endptr;
   AllocSpace *head;
   char *phead;
+  PyGILState_STATE gil;
 
   if (p == 0) return(0);
 
+  gil = PyGILState_Ensure();
+
   if (size == 0) {
     errput("%s, %s, %s, %d: zero allocation!\n",
            dirName, fileName, funName, lineNo);
@@ -250,6 +280,8 @@ void *mem_realloc_mem(void *pp, size_t size, int lineNo, char *funName,
   }
   al_frags++;
 
+  PyGILState_Release(gil);
+
   return((void *) p);
 
  end_label:
@@ -257,6 +289,8 @@ void *mem_realloc_mem(void *pp, size_t size, int lineNo, char *funName,
     errput(ErrHead "error exit!\n");
   }
 
+  PyGILState_Release(gil);
+
   return(0);
 }
 
@@ -274,9 +308,12 @@ void mem_free_mem(void *pp, int lineNo, char *funName,
   float64 *endptr;
   AllocSpace *head;
   char *phead;
+  PyGILState_STATE gil;
 
   if (p == 0) return;
 
+  gil = PyGILState_Ensure();
+
   mem_check_ptr(p, lineNo, funName, fileName, dirName);
   if (ERR_Chk) {
     ERR_GotoEnd(1);
@@ -296,12 +333,16 @@ void mem_free_mem(void *pp, int lineNo, char *funName,
 
   PyMem_Free(phead);
 
+  PyGILState_Release(gil);
+
   return;
 
  end_label:
   if (ERR_Chk) {
     errput(ErrHead "error exit!\n");
   }
+
+  PyGILState_Release(gil);
 }
 
 #undef __FUNC__
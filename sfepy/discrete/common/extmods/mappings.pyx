@@ -60,6 +60,100 @@ cdef class CMapping:
         array2fmfield4(self._bfg, self.bfg)
         self.geo.bfGM = self._bfg
 
+    def set_data(self, bf=None, bfg=None, det=None, volume=None,
+                 normal=None):
+        """
+        Replace the data arrays by the given arrays, e.g. memory-mapped ones,
+        without copying. The arrays have to be C-contiguous float64 arrays
+        with the shapes of the current arrays, except for the number of
+        cells, that is taken from `det`, if given.
+        """
+        if det is not None:
+            self.det = det
+            array2fmfield4(self._det, self.det)
+            self.geo.det = self._det
+
+            self.geo.nEl = self.n_el = det.shape[0]
+            self.shape = (self.n_el, self.n_qp, self.dim, self.n_ep)
+
+        if bf is not None:
+            self.bf = bf
+            array2fmfield4(self._bf, self.bf)
+            self.geo.bf = self._bf
+
+        if volume is not None:
+            self.volume = volume
+            array2fmfield4(self._volume, self.volume)
+            self.geo.volume = self._volume
+            self.geo.totalVolume = self.volume.sum()
+
+        if bfg is not None:
+            self.bfg = bfg
+            array2fmfield4(self._bfg, self.bfg)
+            self.geo.bfGM = self._bfg
+
+        if normal is not None:
+            self.normal = normal
+            array2fmfield4(self._normal, self.normal)
+            self.geo.normal = self._normal
+
+    def get_cells(self, int32 start, int32 stop):
+        """
+        Return a new CMapping instance restricted to the cells in the range
+        [`start`, `stop`). The data arrays of the new instance are views of
+        the data arrays of this instance.
+        """
+        cdef CMapping out
+        cdef int32 n_el
+
+        start = max(start, 0)
+        stop = min(stop, self.n_el)
+        n_el = max(stop - start, 0)
+
+        out = CMapping(0, self.n_qp, self.dim, self.n_ep, mode=self.mode)
+
+        if self.bf.shape[0] > 1:
+            out.bf = self.bf[start:stop]
+
+        else:
+            out.bf = self.bf
+        array2fmfield4(out._bf, out.bf)
+        out.geo.bf = out._bf
+
+        out.det = self.det[start:stop]
+        array2fmfield4(out._det, out.det)
+        out.geo.det = out._det
+
+        out.volume = self.volume[start:stop]
+        array2fmfield4(out._volume, out.volume)
+        out.geo.volume = out._volume
+
+        if self.bfg is not None:
+            out.bfg = self.bfg[start:stop]
+            array2fmfield4(out._bfg, out.bfg)
+            out.geo.bfGM = out._bfg
+
+        if self.normal is not None:
+            out.normal = self.normal[start:stop]
+            array2fmfield4(out._normal, out.normal)
+            out.geo.normal = out._normal
+
+        out.shape = (n_el, self.n_qp, self.dim, self.n_ep)
+        out.geo.nEl = out.n_el = n_el
+        out.geo.totalVolume = out.volume.sum()
+
+        out.integral = self.integral
+        out.qp = self.qp
+        out.ps = self.ps
+        if ((self.mtx_t is not None) and hasattr(self.mtx_t, 'shape')
+            and (self.mtx_t.shape[0] == self.n_el)):
+            out.mtx_t = self.mtx_t[start:stop]
+
+        else:
+            out.mtx_t = self.mtx_t
+
+        return out
+
     def __str__(self):
         return 'CMapping: mode: %s, n_el %d, n_qp %d, dim: %d, n_ep: %d' \
                % ((self.mode,) + self.shape)
@@ -105,7 +199,7 @@ cdef class CMapping:
 
     def integrate(self,
                   np.ndarray[float64, mode='c', ndim=4] out not None,
-                  np.ndarray[float64, mode='c', ndim=4] arr not None,
+                  np.ndarray[float64, ndim=4] arr not None,
                   int32 mode=0):
         """
         Integrate `arr` over the domain of the mapping into `out`.
@@ -190,10 +190,14 @@ int32 mesh_nod_in_el_count(int32 *p_niec_max, int32 *niec,
   - 01.03.2004
   - 03.03.2005
   - 07.02.2006
+
+  If `upper` is nonzero, only the upper triangle (including the diagonal) of
+  the graph is created, i.e. column nodes less than the row node are skipped.
 */
 int32 mesh_graph(int32 *p_nnz, int32 **p_prow, int32 **p_icol,
                  int32 n_row, int32 n_col, int32 n_gr, int32 *n_el,
-                 int32 *n_epr, int32 **conn_r, int32 *n_epc, int32 **conn_c)
+                 int32 *n_epr, int32 **conn_r, int32 *n_epc, int32 **conn_c,
+                 int32 upper)
 {
   int32 in, ii, ip, ig, iel, iep, ir, ic, nn, np, pr,
     niec_max_r, n_ep_max_c, n_unique, iir, iic, found;
@@ -264,7 +268,7 @@ int32 mesh_graph(int32 *p_nnz, int32 **p_prow, int32 **p_icol,
 /*        output(" %d %d %d\n", ip, ig, iel); */
       for (iep = 0; iep < n_epc[ig]; iep++) {
         np = conn_c[ig][n_epc[ig]*iel+iep];
-        if (np >= 0) {
+        if ((np >= 0) && (!upper || (np >= in))) {
           nods[ii] = np;
 /*      output("  %d %d\n", ii, nods[ii]); */
           ii++;
@@ -320,6 +324,7 @@ int32 mesh_graph(int32 *p_nnz, int32 **p_prow, int32 **p_icol,
         for (ic = 0; ic < n_epc[ig]; ic++) {
           iic = pconn_c[ic];
           if (iic < 0) continue;
+          if (upper && (iic < iir)) continue;
 /*        output("   %d %d\n", iic, nir[iir]); */
           /* This is a bottle-neck! */
           found = 0;
@@ -15,7 +15,8 @@ int32 orient_elements(int32 *flag, int32 flag_n_row,
 
 int32 mesh_graph(int32 *p_nnz, int32 **p_prow, int32 **p_icol,
                  int32 n_row, int32 n_col, int32 n_gr, int32 *n_el,
-                 int32 *n_epr, int32 **conn_r, int32 *n_epc, int32 **conn_c);
+                 int32 *n_epr, int32 **conn_r, int32 *n_epc, int32 **conn_c,
+                 int32 upper);
 
 int32 graph_components(int32 *p_n_comp,
                        int32 *flag, int32 flag_len,
@@ -9,3 +9,4 @@ ctypedef np.complex128_t complex128
 ctypedef np.float64_t float64
 ctypedef np.int32_t int32
 ctypedef np.uint32_t uint32
+ctypedef np.uint64_t uint64
@@ -4,6 +4,7 @@ import time
 import numpy as nm
 
 from sfepy.base.base import output, iter_dict_of_lists, Struct, basestr
+from sfepy.discrete.mapping_cache import MappingCache
 import six
 
 
@@ -68,6 +69,14 @@ def setup_extra_data(conn_info):
             field = var.get_field()
             field.setup_extra_data(info.ps_tg, info, info.is_trace)
 
+def get_mapping_profile_keys(field, region, integral, integration,
+                             *args, **kwargs):
+    """
+    Get the profiler record keys of the reference mapping creation, see
+    :mod:`sfepy.base.profiling`.
+    """
+    return [('mappings', '%s.%s.%s' % (field.name, region.name, integration))]
+
 def fields_from_conf(conf, regions):
     fields = {}
     for key, val in six.iteritems(conf):
@@ -177,9 +186,16 @@ class Field(Struct):
 
     def clear_mappings(self, clear_all=False):
         """
-        Clear current reference mappings.
+        Clear current reference mappings and the sum factorizations.
+
+        The `mappings_version` counter is incremented, so that data depending
+        on the mappings, e.g. cached cell matrices of linear terms, are
+        invalidated. A new mapping cache is created with the settings given by
+        the global options, see :mod:`sfepy.discrete.mapping_cache`.
         """
-        self.mappings = {}
+        self.mappings = MappingCache.from_goptions()
+        self.sum_factorizations = {}
+        self.mappings_version = getattr(self, 'mappings_version', 0) + 1
         if clear_all:
             if hasattr(self, 'mappings0'):
                 self.mappings0.clear()
@@ -189,12 +205,16 @@ class Field(Struct):
     def save_mappings(self):
         """
         Save current reference mappings to `mappings0` attribute.
+
+        The saved mappings cannot be recreated after the mesh coordinates
+        change, so `mappings0` is not subject to the memory limit of the
+        mapping cache.
         """
         import sfepy.base.multiproc as multi
 
         if multi.is_remote_dict(self.mappings0):
-            for k, v in six.iteritems(self.mappings):
-                m, _ = self.mappings[k]
+            for k, v in self.mappings.items():
+                m, _ = v
                 nv = (m.bf, m.bfg, m.det, m.volume, m.normal)
                 self.mappings0[k] = nv
         else:
@@ -210,10 +230,11 @@ class Field(Struct):
         corresponding to the field approximation.
 
         The mappings are cached in the field instance in `mappings`
-        attribute. The mappings can be saved to `mappings0` using
-        `Field.save_mappings`. The saved mapping can be retrieved by
-        passing `get_saved=True`. If the required (saved) mapping
-        is not in cache, a new one is created.
+        attribute, see :class:`MappingCache
+        <sfepy.discrete.mapping_cache.MappingCache>`. The mappings can be
+        saved to `mappings0` using `Field.save_mappings`. The saved mapping
+        can be retrieved by passing `get_saved=True`. If the required
+        (saved) mapping is not in cache, a new one is created.
 
         Returns
         -------
@@ -8,10 +8,13 @@ from copy import copy
 import numpy as nm
 import scipy.sparse as sp
 
-from sfepy.base.base import output, assert_, get_default, iter_dict_of_lists
+from sfepy.base.base import (output, assert_, get_default, iter_dict_of_lists,
+                             goptions)
 from sfepy.base.base import OneTypeList, Container, Struct
+from sfepy.base.profiling import profiled
 from sfepy.discrete import Materials, Variables, create_adof_conns
-from sfepy.discrete.common.extmods.cmesh import create_mesh_graph
+from sfepy.discrete.graph_cache import create_cached_mesh_graph
+from sfepy.linalg.sparse import set_matrix_generations, SymmetricCSRMatrix
 from sfepy.terms import Terms, Term
 import six
 
@@ -47,6 +50,11 @@ def get_expression_arg_names(expression, strip_dots=True):
 
     return set(args)
 
+def _get_evaluate_profile_keys(equations, names=None, mode='eval',
+                               dw_mode='vector', *args, **kwargs):
+    key = '%s (%s)' % (mode, dw_mode) if mode == 'weak' else mode
+    return [('equations', key)]
+
 class Equations(Container):
 
     @staticmethod
@@ -425,7 +433,8 @@ class Equations(Container):
         return rdcs, cdcs
 
     def create_matrix_graph(self, any_dof_conn=False, rdcs=None, cdcs=None,
-                            shape=None, active_only=True, verbose=True):
+                            shape=None, active_only=True, symmetric=False,
+                            verbose=True):
         """
         Create tangent matrix graph, i.e. preallocate and initialize the
         sparse storage needed for the tangent matrix. Order of DOF
@@ -447,6 +456,13 @@ class Equations(Container):
         active_only : bool
             If True, the matrix graph has reduced size and is created with the
             reduced (active DOFs only) numbering.
+        symmetric : bool
+            If True, the tangent matrix is assumed to be symmetric and only
+            its upper triangle, including the diagonal, is preallocated. The
+            returned matrix is then a
+            :class:`SymmetricCSRMatrix <sfepy.linalg.sparse.SymmetricCSRMatrix>`
+            instance, and the terms assemble only the upper triangle items
+            into it.
         verbose : bool
             If False, reduce verbosity.
 
@@ -478,15 +494,24 @@ class Equations(Container):
         output('assembling matrix graph...', verbose=verbose)
         tt = time.clock()
 
-        nnz, prow, icol = create_mesh_graph(shape[0], shape[1],
-                                            len(rdcs), rdcs, cdcs)
+        if symmetric and (shape[0] != shape[1]):
+            raise ValueError('symmetric matrix graph must be square! (%s)'
+                             % (shape,))
+
+        nnz, prow, icol = create_cached_mesh_graph(shape[0], shape[1],
+                                                   len(rdcs), rdcs, cdcs,
+                                                   symmetric)
 
         output('...done in %.2f s' % (time.clock() - tt), verbose=verbose)
         output('matrix structural nonzeros: %d (%.2e%% fill)' \
                % (nnz, float(nnz) / nm.prod(shape)), verbose=verbose)
 
         data = nm.zeros((nnz,), dtype=self.variables.dtype)
-        matrix = sp.csr_matrix((data, icol, prow), shape)
+        if symmetric:
+            matrix = SymmetricCSRMatrix((data, icol, prow), shape)
+
+        else:
+            matrix = sp.csr_matrix((data, icol, prow), shape)
 
         return matrix
 
@@ -597,8 +622,9 @@ class Equations(Container):
     def get_lcbc_operator(self):
         return self.variables.get_lcbc_operator()
 
+    @profiled(_get_evaluate_profile_keys)
     def evaluate(self, names=None, mode='eval', dw_mode='vector',
-                 term_mode=None, asm_obj=None):
+                 term_mode=None, asm_obj=None, chunk_size=None):
         """
         Evaluate the equations.
 
@@ -608,6 +634,11 @@ class Equations(Container):
             The evaluation mode.
         names : str or sequence of str, optional
             Evaluate only equations of the given name(s).
+        chunk_size : int, optional
+            If given and nonzero, the terms are evaluated and assembled in
+            the 'weak' mode in chunks of at most `chunk_size` cells, see
+            :func:`Equation.evaluate()`. If None, the 'chunk_size' global
+            option is used.
 
         Returns
         -------
@@ -615,6 +646,11 @@ class Equations(Container):
             The evaluation result. In 'weak' mode it is the
             `asm_obj`. Otherwise, it is a dict of results with equation names
             as keys or a single result for a single equation.
+
+        Notes
+        -----
+        The sparse matrices assembled in the 'weak' mode get new generation
+        counters, see :func:`sfepy.linalg.sparse.set_matrix_generations()`.
         """
         if names is None:
             eqs = self
@@ -631,13 +667,30 @@ class Equations(Container):
             extras = []
             for eq in eqs:
                 out = eq.evaluate(mode=mode, dw_mode=dw_mode,
-                                  term_mode=term_mode, asm_obj=asm_obj)
+                                  term_mode=term_mode, asm_obj=asm_obj,
+                                  chunk_size=chunk_size)
                 if isinstance(out, tuple): extras.extend(out[1])
 
+            if (dw_mode == 'matrix') and sp.issparse(asm_obj):
+                set_matrix_generations(asm_obj)
+
             out = asm_obj
+            if extras and isinstance(asm_obj, SymmetricCSRMatrix):
+                # The extra matrices contain the upper triangle items only.
+                out = asm_obj.get_upper()
+
             for extra in extras:
                 out = out + extra
 
+            if extras and isinstance(asm_obj, SymmetricCSRMatrix):
+                out = out.tocsr()
+                out.sort_indices()
+                out = SymmetricCSRMatrix((out.data, out.indices, out.indptr),
+                                         shape=out.shape)
+
+            if extras and (dw_mode == 'matrix') and sp.issparse(out):
+                set_matrix_generations(out)
+
         else:
             out = {}
             for eq in eqs:
@@ -729,12 +782,27 @@ class Equations(Container):
             The assembled matrix. If `by_blocks` is True, a dictionary
             is returned instead, with keys given by `block_name` part
             of the individual equation names.
+
+        Notes
+        -----
+        If `tangent_matrix` is a :class:`SymmetricCSRMatrix
+        <sfepy.linalg.sparse.SymmetricCSRMatrix>`, the symmetry of the
+        assembled matrix is checked in its first evaluation, see
+        :func:`Equations.check_tangent_symmetry()`. The blocks are always
+        assembled into the whole matrix, as the individual equations need
+        not be symmetric.
         """
         self.set_variables_from_state(state)
 
         if by_blocks:
             names = get_default(names, self.names)
 
+            if isinstance(tangent_matrix, SymmetricCSRMatrix):
+                graph = tangent_matrix.get_full_graph()
+
+            else:
+                graph = tangent_matrix
+
             out = {}
 
             get_indx = self.variables.get_indx
@@ -746,11 +814,14 @@ class Equations(Container):
                 ir = get_indx(rname, stripped=True, allow_dual=True)
                 ic = get_indx(cname, stripped=True, allow_dual=True)
 
-                tangent_matrix.data[:] = 0.0
+                graph.data[:] = 0.0
                 aux = eq.evaluate(mode='weak', dw_mode='matrix',
-                                  asm_obj=tangent_matrix)
+                                  asm_obj=graph)
 
                 out[key] = aux[ir, ic]
+                set_matrix_generations(out[key])
+
+            set_matrix_generations(tangent_matrix)
 
         else:
             tangent_matrix.data[:] = 0.0
@@ -758,8 +829,171 @@ class Equations(Container):
             out = self.evaluate(mode='weak', dw_mode='matrix',
                                 asm_obj=tangent_matrix)
 
+            if (isinstance(tangent_matrix, SymmetricCSRMatrix)
+                and not getattr(tangent_matrix, 'symmetry_checked', False)):
+                self.check_tangent_symmetry(state, out)
+                tangent_matrix.symmetry_checked = True
+
+        return out
+
+    def check_tangent_symmetry(self, state, mtx, rtol=1e-10):
+        """
+        Check that the tangent matrix stored in `mtx` by its upper triangle
+        is symmetric by comparing its product with a vector to the product
+        evaluated from the cell matrices, see
+        :func:`Equations.eval_tangent_action()`. The lower triangle items
+        dropped in the assembling of a nonsymmetric matrix change the
+        product.
+
+        Parameters
+        ----------
+        state : array
+            The vector of DOF values the tangent matrix is evaluated at.
+        mtx : SymmetricCSRMatrix instance
+            The assembled tangent matrix.
+        rtol : float
+            The relative tolerance of the products comparison.
+
+        Raises
+        ------
+        ValueError
+            If the tangent matrix is not symmetric.
+        """
+        vec = nm.random.RandomState(0).rand(mtx.shape[0])
+        val0 = self.eval_tangent_action(state, vec)
+        val = mtx * vec
+
+        err = nm.abs(val - val0).max()
+        if err > rtol * nm.abs(val0).max():
+            raise ValueError('tangent matrix is not symmetric (error: %e),'
+                             ' do not use symmetric_storage option!' % err)
+
+    def iter_tangent_cells(self, chunk_size=None, exclude=None):
+        """
+        Iterate over the cell matrices of all terms w.r.t. all unknown
+        variables, evaluated in chunks of cells.
+
+        Parameters
+        ----------
+        chunk_size : int, optional
+            If given and nonzero, the terms are evaluated in chunks of at
+            most `chunk_size` cells. If None, the 'chunk_size' global option
+            is used.
+        exclude : list, optional
+            The terms to skip.
+
+        Yields
+        ------
+        term : Term instance
+            The evaluated term.
+        svar : Variable instance
+            The variable the term was differentiated w.r.t.
+        val : array or tuple
+            The cell matrices or the extra sparse matrix data, see
+            :func:`Term.evaluate() <sfepy.terms.terms.Term.evaluate()>`.
+        iels : array or None
+            The cells of `val`.
+        """
+        chunk_size = get_default(chunk_size, goptions['chunk_size'])
+
+        exclude = get_default(exclude, [])
+
+        for eq in self:
+            for term in eq.terms:
+                if any(term is ex for ex in exclude):
+                    continue
+
+                svars = term.get_state_variables(unknown_only=True)
+                for svar in svars:
+                    if chunk_size:
+                        vals = term.evaluate_chunked(chunk_size,
+                                                     diff_var=svar.name,
+                                                     standalone=False)
+
+                    else:
+                        vals = [term.evaluate(mode='weak', diff_var=svar.name,
+                                              standalone=False)]
+
+                    for val, iels in vals:
+                        yield term, svar, val, iels
+
+    def eval_tangent_action(self, state, vec, out=None, chunk_size=None):
+        """
+        Evaluate the product of the tangent matrix with a vector without
+        assembling the matrix.
+
+        Parameters
+        ----------
+        state : array
+            The vector of DOF values the tangent matrix is evaluated at.
+        vec : array
+            The vector to multiply. It has the size of the tangent matrix
+            as assembled by :func:`Equations.eval_tangent_matrices()`.
+        out : array, optional
+            The output array. If given, the product is added to it.
+        chunk_size : int, optional
+            The maximum number of cells evaluated at once, see
+            :func:`Equations.iter_tangent_cells()`.
+
+        Returns
+        -------
+        out : array
+            The product of the tangent matrix with `vec`.
+        """
+        self.set_variables_from_state(state)
+
+        if out is None:
+            dtype = nm.result_type(vec.dtype, self.variables.dtype)
+            out = nm.zeros(len(vec), dtype=dtype)
+
+        # The terms supporting the sum factorization skip the cell matrices.
+        done = [term for eq in self for term in eq.terms
+                if term.assemble_sum_factorized_action(out, vec)]
+
+        for term, svar, val, iels in self.iter_tangent_cells(chunk_size,
+                                                             exclude=done):
+            term.assemble_action_to(out, vec, val, iels, svar)
+
         return out
 
+    def eval_tangent_block_diagonal(self, state, blocks, chunk_size=None):
+        """
+        Evaluate (assemble) the block diagonal part of the tangent matrix.
+
+        Parameters
+        ----------
+        state : array
+            The vector of DOF values the tangent matrix is evaluated at.
+        blocks : array
+            The block numbers of the tangent matrix DOFs. Only the entries
+            with the row and column DOFs in the same block are assembled.
+        chunk_size : int, optional
+            The maximum number of cells evaluated at once, see
+            :func:`Equations.iter_tangent_cells()`.
+
+        Returns
+        -------
+        mtx : csr_matrix
+            The block diagonal part of the tangent matrix.
+        """
+        self.set_variables_from_state(state)
+
+        vals, rows, cols = [], [], []
+        for term, svar, val, iels in self.iter_tangent_cells(chunk_size):
+            aux = term.get_block_diagonal_entries(val, iels, svar, blocks)
+            vals.append(aux[0])
+            rows.append(aux[1])
+            cols.append(aux[2])
+
+        n_dof = len(blocks)
+        mtx = sp.coo_matrix((nm.concatenate(vals),
+                             (nm.concatenate(rows), nm.concatenate(cols))),
+                            shape=(n_dof, n_dof))
+        mtx = mtx.tocsr()
+        mtx.sort_indices()
+
+        return mtx
+
 class Equation(Struct):
 
     @staticmethod
@@ -824,13 +1058,35 @@ class Equation(Struct):
             conn_info[key] = term.get_conn_info()
 
     def evaluate(self, mode='eval', dw_mode='vector', term_mode=None,
-                 asm_obj=None):
+                 asm_obj=None, chunk_size=None):
         """
         Parameters
         ----------
         mode : one of 'eval', 'el_eval', 'el_avg', 'qp', 'weak'
             The evaluation mode.
+        chunk_size : int, optional
+            If given and nonzero, the terms are evaluated and assembled in
+            the 'weak' mode in chunks of at most `chunk_size` cells using
+            :func:`Term.evaluate_chunked()
+            <sfepy.terms.terms.Term.evaluate_chunked()>`. This bounds the
+            memory needed for the cell vectors or matrices. If None, the
+            'chunk_size' global option is used.
         """
+        chunk_size = get_default(chunk_size, goptions['chunk_size'])
+
+        def _evaluate_weak(term, diff_var=None):
+            if chunk_size:
+                return term.evaluate_chunked(chunk_size, diff_var=diff_var,
+                                             term_mode=term_mode,
+                                             standalone=False,
+                                             ret_status=True)
+
+            else:
+                return [term.evaluate(mode=mode, diff_var=diff_var,
+                                      term_mode=term_mode,
+                                      standalone=False,
+                                      ret_status=True)]
+
         if mode in ('eval', 'el_eval', 'el_avg', 'qp'):
             val = 0.0
             for term in self.terms:
@@ -847,11 +1103,8 @@ class Equation(Struct):
             if dw_mode == 'vector':
 
                 for term in self.terms:
-                    val, iels, status = term.evaluate(mode=mode,
-                                                      term_mode=term_mode,
-                                                      standalone=False,
-                                                      ret_status=True)
-                    term.assemble_to(asm_obj, val, iels, mode=dw_mode)
+                    for val, iels, status in _evaluate_weak(term):
+                        term.assemble_to(asm_obj, val, iels, mode=dw_mode)
 
                 out = asm_obj
 
@@ -862,14 +1115,12 @@ class Equation(Struct):
                     svars = term.get_state_variables(unknown_only=True)
 
                     for svar in svars:
-                        val, iels, status = term.evaluate(mode=mode,
-                                                          term_mode=term_mode,
-                                                          diff_var=svar.name,
-                                                          standalone=False,
-                                                          ret_status=True)
-                        extra = term.assemble_to(asm_obj, val, iels,
-                                                 mode=dw_mode, diff_var=svar)
-                        if extra is not None: extras.append(extra)
+                        for val, iels, status in _evaluate_weak(term,
+                                                                svar.name):
+                            extra = term.assemble_to(asm_obj, val, iels,
+                                                     mode=dw_mode,
+                                                     diff_var=svar)
+                            if extra is not None: extras.append(extra)
 
                 out = (asm_obj, extras) if len(extras) else asm_obj
 
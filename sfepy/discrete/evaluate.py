@@ -2,10 +2,15 @@ from __future__ import absolute_import
 from copy import copy
 
 import numpy as nm
+import scipy.sparse as sp
+from scipy.sparse.linalg import LinearOperator
 
-from sfepy.base.base import output, get_default, OneTypeList, Struct, basestr
+from sfepy.base.base import (output, get_default, OneTypeList, Struct, basestr,
+                             goptions)
 from sfepy.discrete import Equations, Variables, Region, Integral, Integrals
 from sfepy.discrete.common.fields import setup_extra_data
+from sfepy.linalg.sparse import (set_matrix_generations, get_full_matrix,
+                                 SymmetricCSRMatrix)
 import six
 
 def apply_ebc_to_matrix(mtx, ebc_rows, epbc_rows=None):
@@ -31,16 +36,168 @@ def apply_ebc_to_matrix(mtx, ebc_rows, epbc_rows=None):
         mtx[master, master] = 1.0
         mtx[master, slave] = -1.0
 
+def get_dof_blocks(variables):
+    """
+    Get the block numbers of the active DOFs of state variables for the
+    block-Jacobi preconditioning: the DOFs of a variable in a single node
+    form a block.
+    """
+    adi = variables.adi
+    blocks = nm.empty(adi.ptr[-1], dtype=nm.int32)
+
+    n_block = 0
+    for var in variables.iter_state(ordered=True):
+        nods = nm.arange(var.n_dof, dtype=nm.int32) // var.n_components
+        if var.eq_map is not None:
+            eq = var.eq_map.eq
+            ii = eq >= 0
+            blocks[adi.indx[var.name].start + eq[ii]] = n_block + nods[ii]
+
+        else:
+            blocks[adi.indx[var.name]] = n_block + nods
+
+        n_block += var.n_nod
+
+    return blocks
+
+class MatrixFreeOperator(LinearOperator):
+    """
+    The tangent matrix of a problem as a linear operator, whose action on
+    a vector is evaluated term by term and cell by cell, without assembling
+    the matrix.
+
+    The operator acts on the vectors of the active DOFs, reduced by LCBCs
+    if present, i.e. it corresponds to the matrix returned by
+    :func:`Evaluator.eval_tangent_matrix()`. It can be passed instead of a
+    sparse matrix to the iterative linear solvers that accept
+    LinearOperator instances.
+
+    Parameters
+    ----------
+    problem : Problem instance
+        The problem with `active_only` set to True.
+    vec : array
+        The full state vector the tangent matrix is evaluated at.
+    precond : {None, 'diagonal', 'block'}
+        If not None, create a Jacobi preconditioner using the matrix
+        diagonal, or a block-Jacobi preconditioner using the diagonal blocks
+        corresponding to the nodal DOFs of the state variables. The diagonal
+        (blocks) are assembled from the cell matrices.
+    chunk_size : int, optional
+        The maximum number of cells evaluated at once. If None, the
+        'chunk_size' global option is used, or `default_chunk_size`, if the
+        option is zero, so that the cell matrices of all cells are never
+        held at once.
+    """
+    default_chunk_size = 1000
+
+    def __init__(self, problem, vec, precond=None, chunk_size=None):
+        if not problem.active_only:
+            raise ValueError('matrix-free operator requires'
+                             ' active_only == True!')
+
+        eqs = problem.equations
+        n_dof = eqs.variables.adi.ptr[-1]
+
+        mtx_lcbc = None
+        if eqs.variables.has_lcbc:
+            mtx_lcbc = eqs.get_lcbc_operator()
+            n_dof = mtx_lcbc.shape[1]
+
+        LinearOperator.__init__(self, nm.dtype(eqs.variables.dtype),
+                                (n_dof, n_dof))
+
+        self.problem = problem
+        self.vec = vec
+        self.mtx_lcbc = mtx_lcbc
+        self.chunk_size = (get_default(chunk_size, goptions['chunk_size'])
+                           or self.default_chunk_size)
+
+        self.precond = None
+        if precond is not None:
+            self.precond = self.create_preconditioner(precond)
+
+    def _matvec(self, x):
+        x = nm.asarray(x).ravel()
+        if self.mtx_lcbc is not None:
+            x = self.mtx_lcbc * x
+
+        out = self.problem.equations.eval_tangent_action(
+            self.vec, x, chunk_size=self.chunk_size
+        )
+
+        if self.mtx_lcbc is not None:
+            out = self.mtx_lcbc.T * out
+
+        return out
+
+    def get_block_diagonal(self, kind='diagonal'):
+        """
+        Assemble the diagonal (`kind` = 'diagonal') or the nodal diagonal
+        blocks (`kind` = 'block') of the tangent matrix.
+        """
+        eqs = self.problem.equations
+        if kind == 'diagonal':
+            blocks = nm.arange(eqs.variables.adi.ptr[-1], dtype=nm.int32)
+
+        elif kind == 'block':
+            blocks = get_dof_blocks(eqs.variables)
+
+        else:
+            raise ValueError('unknown block diagonal kind! (%s)' % kind)
+
+        mtx = eqs.eval_tangent_block_diagonal(self.vec, blocks,
+                                              chunk_size=self.chunk_size)
+        if self.mtx_lcbc is not None:
+            mtx = (self.mtx_lcbc.T * mtx * self.mtx_lcbc).tocsr()
+
+        return mtx
+
+    def create_preconditioner(self, kind='diagonal'):
+        """
+        Create the (block-)Jacobi preconditioner as a LinearOperator, see
+        :func:`MatrixFreeOperator.get_block_diagonal()`.
+        """
+        from scipy.sparse.linalg import splu
+
+        mtx = self.get_block_diagonal(kind=kind)
+
+        if kind == 'diagonal':
+            diag = mtx.diagonal()
+            diag[diag == 0.0] = 1.0
+            idiag = 1.0 / diag
+            matvec = lambda x: idiag * nm.asarray(x).ravel()
+
+        else:
+            diag = mtx.diagonal()
+            ii = nm.where(diag == 0.0)[0]
+            if len(ii):
+                mtx = mtx + sp.csr_matrix((nm.ones(len(ii)), (ii, ii)),
+                                          shape=mtx.shape)
+
+            lu = splu(mtx.tocsc())
+            matvec = lambda x: lu.solve(nm.asarray(x).ravel())
+
+        return LinearOperator(self.shape, matvec=matvec, dtype=self.dtype)
+
 ##
 # 02.10.2007, c
 class Evaluator(Struct):
     """
     This class provides the functions required by a nonlinear solver for a
     given problem.
+
+    If `matrix_free` is True, :func:`Evaluator.eval_tangent_matrix()`
+    returns a :class:`MatrixFreeOperator` instance with the preconditioner
+    given by `precond` and the cell chunk size `chunk_size` instead of the
+    assembled matrix.
     """
 
-    def __init__(self, problem, matrix_hook=None):
-        Struct.__init__(self, problem=problem, matrix_hook=matrix_hook)
+    def __init__(self, problem, matrix_hook=None, matrix_free=False,
+                 precond=None, chunk_size=None):
+        Struct.__init__(self, problem=problem, matrix_hook=matrix_hook,
+                        matrix_free=matrix_free, precond=precond,
+                        chunk_size=chunk_size, operator=None)
 
     def new_ulf_iteration(self, nls, vec, it, err, err0):
 
@@ -89,6 +246,9 @@ class Evaluator(Struct):
         return vec_r
 
     def eval_tangent_matrix(self, vec, mtx=None, is_full=False):
+        if self.matrix_free:
+            return self.get_tangent_operator(vec, is_full=is_full)
+
         if isinstance(vec, basestr) and vec == 'linear':
             return get_default(mtx, self.problem.mtx_a)
 
@@ -109,17 +269,48 @@ class Evaluator(Struct):
         if self.problem.equations.variables.has_lcbc:
             mtx_lcbc = self.problem.equations.get_lcbc_operator()
 
-            mtx_r = mtx_lcbc.T * mtx * mtx_lcbc
+            mtx_r = mtx_lcbc.T * get_full_matrix(mtx) * mtx_lcbc
             mtx_r = mtx_r.tocsr()
             mtx_r.sort_indices()
+            if isinstance(mtx, SymmetricCSRMatrix):
+                mtx_r = SymmetricCSRMatrix.from_full(mtx_r)
 
             if self.matrix_hook is not None:
                 mtx_r = self.matrix_hook(mtx_r, self.problem, call_mode='lcbc')
 
             mtx = mtx_r
 
+        if sp.issparse(mtx):
+            # Mark the values changed by the EBCs, LCBCs or matrix_hook.
+            set_matrix_generations(mtx)
+
         return mtx
 
+    def get_tangent_operator(self, vec, is_full=False):
+        """
+        Get the tangent matrix at `vec` as a :class:`MatrixFreeOperator`
+        instance. For `vec` equal to 'linear', the last created operator is
+        returned.
+        """
+        if isinstance(vec, basestr) and vec == 'linear':
+            if self.operator is None:
+                raise ValueError('no matrix-free operator created yet!')
+
+            return self.operator
+
+        if self.matrix_hook is not None:
+            raise ValueError('matrix_hook cannot be used with'
+                             ' the matrix-free operator!')
+
+        if not is_full and self.problem.active_only:
+            vec = self.make_full_vec(vec)
+
+        self.operator = MatrixFreeOperator(self.problem, vec.copy(),
+                                           precond=self.precond,
+                                           chunk_size=self.chunk_size)
+
+        return self.operator
+
     def make_full_vec(self, vec):
         return self.problem.equations.make_full_vec(vec)
 
@@ -16,13 +16,15 @@ import numpy as nm
 
 from sfepy.base.base import output, get_default, assert_
 from sfepy.base.base import Struct
-from sfepy.discrete.common.fields import parse_shape, Field
+from sfepy.base.profiling import profiled
+from sfepy.discrete.common.fields import (parse_shape, Field,
+                                          get_mapping_profile_keys)
 from sfepy.discrete.fem.mesh import Mesh
 from sfepy.discrete.fem.meshio import convert_complex_output
 from sfepy.discrete.fem.utils import (extend_cell_data, prepare_remap,
                                       invert_remap, get_min_value)
 from sfepy.discrete.fem.mappings import VolumeMapping, SurfaceMapping
-from sfepy.discrete.fem.poly_spaces import PolySpace
+from sfepy.discrete.fem.poly_spaces import PolySpace, eval_cached_base
 from sfepy.discrete.fem.fe_surface import FESurface
 from sfepy.discrete.integrals import Integral
 from sfepy.discrete.fem.linearizer import (get_eval_dofs, get_eval_coors,
@@ -636,8 +638,9 @@ class FEField(Field):
             else:
                 ori = self.ori
 
-            self.bf[bf_key] = ps.eval_base(qp.vals, diff=derivative, ori=ori,
-                                           transform=self.basis_transform)
+            self.bf[bf_key] = eval_cached_base(ps, qp.vals, diff=derivative,
+                                               ori=ori,
+                                               transform=self.basis_transform)
 
         if base_only:
             return self.bf[bf_key]
@@ -653,7 +656,7 @@ class FEField(Field):
             qp = self.get_qp(sd.face_type, integral)
 
             ps_s = self.gel.surface_facet.poly_space
-            bf_s = ps_s.eval_base(qp.vals)
+            bf_s = eval_cached_base(ps_s, qp.vals)
 
             coors, faces = gel.coors, gel.get_surface_entities()
 
@@ -977,6 +980,7 @@ class FEField(Field):
         """
         return self.get_econn(integration, region, is_trace=is_trace)
 
+    @profiled(get_mapping_profile_keys)
     def create_mapping(self, region, integral, integration,
                        return_mapping=True):
         """
@@ -1034,7 +1038,8 @@ class FEField(Field):
                 self.create_bqp(region.name, integral)
                 qp = self.qp_coors[(integral.order, esd.bkey)]
 
-                abf = ps.eval_base(qp.vals[0], transform=self.basis_transform)
+                abf = eval_cached_base(ps, qp.vals[0],
+                                       transform=self.basis_transform)
                 bf = abf[..., self.efaces[0]]
 
                 indx = self.gel.get_surface_entities()[0]
@@ -1049,7 +1054,7 @@ class FEField(Field):
                 if integration == 'surface_extra':
                     sg.alloc_extra_data(self.econn.shape[1])
 
-                    bf_bg = geo_ps.eval_base(qp.vals, diff=True)
+                    bf_bg = eval_cached_base(geo_ps, qp.vals, diff=True)
                     ebf_bg = self.get_base(esd.bkey, 1, integral)
 
                     sg.evaluate_bfbgm(bf_bg, ebf_bg, coors, sd.fis, dconn)
@@ -1057,7 +1062,8 @@ class FEField(Field):
             else:
                 # Do not use BQP for surface fields.
                 qp = self.get_qp(sd.face_type, integral)
-                bf = ps.eval_base(qp.vals, transform=self.basis_transform)
+                bf = eval_cached_base(ps, qp.vals,
+                                      transform=self.basis_transform)
 
                 sg = mapping.get_mapping(qp.vals, qp.weights,
                                          poly_space=Struct(n_nod=bf.shape[-1]),
@@ -1088,6 +1094,33 @@ class FEField(Field):
 
         return out
 
+    def get_sum_factorization(self, region, integral):
+        """
+        Get the sum factorization of the field bases in the `region` cells
+        for the given integral, see
+        :func:`create_sum_factorization()
+        <sfepy.discrete.fem.sum_factorization.create_sum_factorization()>`.
+
+        The sum factorizations are cached in the field instance in the
+        `sum_factorizations` attribute and cleared together with the
+        reference mappings.
+
+        Returns
+        -------
+        sf : SumFactorization instance or None
+            The sum factorization, or None, if it is not supported for the
+            field approximation.
+        """
+        from sfepy.discrete.fem.sum_factorization \
+             import create_sum_factorization
+
+        key = (region.name, integral.order)
+        if key not in self.sum_factorizations:
+            sf = create_sum_factorization(self, region, integral)
+            self.sum_factorizations[key] = sf
+
+        return self.sum_factorizations[key]
+
 class VolumeField(FEField):
     """
     Finite element field base class over volume elements (element dimension
@@ -6,7 +6,7 @@ import numpy as nm
 from sfepy.base.base import get_default, output
 from sfepy.discrete.common.mappings import Mapping
 from sfepy.discrete.common.extmods.mappings import CMapping
-from sfepy.discrete.fem.poly_spaces import PolySpace
+from sfepy.discrete.fem.poly_spaces import PolySpace, eval_cached_base
 
 class FEMapping(Mapping):
     """
@@ -48,7 +48,7 @@ class FEMapping(Mapping):
         Get base functions or their gradient evaluated in given
         coordinates.
         """
-        bf = self.poly_space.eval_base(coors, diff=diff)
+        bf = eval_cached_base(self.poly_space, coors, diff=diff)
         return bf
 
     def get_physical_qps(self, qp_coors):
@@ -90,8 +90,8 @@ class VolumeMapping(FEMapping):
 
         bf_g = self.get_base(qp_coors, diff=True)
 
-        ebf_g = poly_space.eval_base(qp_coors, diff=True, ori=ori,
-                                     force_axis=True, transform=transform)
+        ebf_g = eval_cached_base(poly_space, qp_coors, diff=True, ori=ori,
+                                 force_axis=True, transform=transform)
         flag = (ori is not None) or (ebf_g.shape[0] > 1)
 
         cmap = CMapping(self.n_el, qp_coors.shape[0], self.dim,
@@ -117,7 +117,7 @@ class SurfaceMapping(FEMapping):
         Get base functions or their gradient evaluated in given
         coordinates.
         """
-        bf = self.poly_space.eval_base(coors, diff=diff)
+        bf = eval_cached_base(self.poly_space, coors, diff=diff)
         return nm.ascontiguousarray(bf[..., :self.dim-1:, self.indices])
 
     def get_mapping(self, qp_coors, weights, poly_space=None, mode='surface'):
@@ -1,8 +1,10 @@
 from __future__ import absolute_import
+import hashlib
+
 import numpy as nm
 import numpy.linalg as nla
 
-from sfepy.base.base import find_subclasses, assert_, Struct
+from sfepy.base.base import find_subclasses, assert_, Struct, goptions
 from sfepy.linalg import combine, insert_strided_axis
 from six.moves import range
 from functools import reduce
@@ -43,6 +45,69 @@ def transform_basis(transform, bf):
 
     return nbf
 
+def _update_digest(sha1, arr):
+    if arr is None:
+        sha1.update(b'None')
+
+    else:
+        arr = nm.ascontiguousarray(arr)
+        sha1.update(('%s %s' % (arr.dtype.str, arr.shape)).encode('ascii'))
+        sha1.update(arr.data)
+
+def get_base_key(ps, coors, diff=0, force_axis=False):
+    """
+    Get the key of the reference base evaluated by
+    :func:`PolySpace.eval_base()` with the given arguments.
+
+    The polynomial space is identified by its class, reference geometry, order
+    and number of nodes, so that the equivalent polynomial spaces of different
+    fields share the key. The coordinates are identified by their SHA1
+    digest.
+    """
+    sha1 = hashlib.sha1()
+    _update_digest(sha1, coors)
+
+    key = (ps.__class__.__name__, ps.geometry.name, ps.order, ps.n_nod,
+           int(diff), bool(force_axis), sha1.hexdigest())
+    return key
+
+base_cache = {}
+
+def eval_cached_base(ps, coors, diff=0, ori=None, force_axis=False,
+                     transform=None):
+    """
+    Cached version of :func:`PolySpace.eval_base()` for reference bases, e.g.
+    the bases evaluated in quadrature points.
+
+    The results are stored in the process-wide cache :data:`base_cache` and
+    shared by all equivalent polynomial spaces, see :func:`get_base_key()`.
+    The returned arrays are read-only. The cache is used only if the
+    'cache_reference_bases' global option is True, see
+    :mod:`sfepy.base.goptions`, and only for the bases independent of
+    cells, i.e. if neither `ori` nor `transform` is given - the per-cell
+    bases would accumulate in the cache with each new mesh.
+    """
+    if ((not goptions['cache_reference_bases'])
+        or (ori is not None) or (transform is not None)):
+        return ps.eval_base(coors, diff=diff, ori=ori, force_axis=force_axis,
+                            transform=transform)
+
+    coors = nm.asarray(coors)
+    key = get_base_key(ps, coors, diff=diff, force_axis=force_axis)
+    base = base_cache.get(key)
+    if base is None:
+        base = ps.eval_base(coors, diff=diff, force_axis=force_axis)
+        base.flags.writeable = False
+        base_cache[key] = base
+
+    return base
+
+def clear_base_cache():
+    """
+    Clear the process-wide reference base cache.
+    """
+    base_cache.clear()
+
 class LagrangeNodes(Struct):
     """Helper class for defining nodes of Lagrange elements."""
 
@@ -0,0 +1,463 @@
+"""
+Sum-factorized evaluation of tensor product bases.
+
+The bases of the tensor product polynomial spaces
+(:class:`LagrangeTensorProductPolySpace
+<sfepy.discrete.fem.poly_spaces.LagrangeTensorProductPolySpace>` and
+:class:`LobattoTensorProductPolySpace
+<sfepy.discrete.fem.poly_spaces.LobattoTensorProductPolySpace>`) are products
+of 1D bases. In the quadrature points of a tensor product quadrature, the
+values and gradients of a function given by its cell DOFs can therefore be
+computed by successive contractions of the DOFs with the 1D base tables along
+each axis, instead of multiplying them by the full tables of all the base
+functions in all the quadrature points. For the approximation order `p` in 3D,
+this costs :math:`O(p^4)` instead of :math:`O(p^6)` operations per cell. The
+transposed contractions integrate the quadrature point values against the
+base functions, so that the term residuals and the actions of the tangent
+matrices of linear terms can be evaluated without computing the cell matrices,
+whose cost is :math:`O(p^9)`.
+
+The terms supporting the sum factorization have the `sum_factorized` class
+attribute set to True and implement :func:`Term.eval_sum_factorized()
+<sfepy.terms.terms.Term.eval_sum_factorized()>`. The evaluation is enabled by
+the 'sum_factorization' global option, see :mod:`sfepy.base.goptions`.
+"""
+from __future__ import absolute_import
+import numpy as nm
+
+from sfepy.base.base import Struct
+from sfepy.discrete.quadratures import QuadraturePoints
+from sfepy.discrete.fem.poly_spaces import (LagrangeTensorProductPolySpace,
+                                            LobattoTensorProductPolySpace)
+from six.moves import range
+
+def eval_lagrange_1d(coors, order, c_min=0.0, c_max=1.0, diff=False):
+    """
+    Evaluate the 1D Lagrange basis with equidistant nodes on the interval
+    [`c_min`, `c_max`], or its derivative, in the given points.
+
+    Returns
+    -------
+    bf : array
+        The basis values or derivatives with shape `(n_coor, order + 1)`.
+        The k-th function is one in the node `c_min + k * (c_max - c_min) /
+        order`.
+    """
+    coors = nm.asarray(coors, dtype=nm.float64).ravel()
+    n_coor = coors.shape[0]
+    if order == 0:
+        val = 0.0 if diff else 1.0
+        return nm.full((n_coor, 1), val, dtype=nm.float64)
+
+    nodes = nm.linspace(c_min, c_max, order + 1)
+    n_nod = order + 1
+
+    aux = nodes[:, None] - nodes[None, :]
+    aux[nm.diag_indices(n_nod)] = 1.0
+    den = aux.prod(axis=1)
+
+    dx = coors[:, None] - nodes[None, :]
+    eye = nm.eye(n_nod, dtype=nm.bool_)
+    if not diff:
+        # (n_coor, k, m): the factors (x - x_m), m != k.
+        fac = nm.where(eye[None, :, :], 1.0, dx[:, None, :])
+        bf = fac.prod(axis=2) / den
+
+    else:
+        # (n_coor, k, j, m): the factors (x - x_m), m != k, m != j.
+        skip = eye[:, None, :] | eye[None, :, :]
+        fac = nm.where(skip[None, ...], 1.0, dx[:, None, None, :])
+        terms = fac.prod(axis=3)
+        terms[:, eye] = 0.0
+        bf = terms.sum(axis=2) / den
+
+    return bf
+
+def eval_lobatto_1d(coors, order, c_min=0.0, c_max=1.0, diff=False):
+    """
+    Evaluate the 1D Lobatto basis on the interval [`c_min`, `c_max`], or its
+    derivative, in the given points.
+
+    Returns
+    -------
+    bf : array
+        The basis values or derivatives with shape `(n_coor, order + 1)`,
+        ordered as the 1D indices used in the `nodes` attribute of
+        :class:`LobattoTensorProductPolySpace
+        <sfepy.discrete.fem.poly_spaces.LobattoTensorProductPolySpace>`.
+    """
+    from sfepy.discrete.fem.extmods.lobatto_bases \
+         import eval_lobatto_tensor_product as ev
+
+    coors = nm.ascontiguousarray(coors, dtype=nm.float64).reshape((-1, 1))
+    nodes = nm.arange(order + 1, dtype=nm.int32)[:, None]
+
+    bf = ev(coors, nodes, c_min, c_max, order, diff)
+
+    return bf[:, 0, :]
+
+def get_lobatto_dof_transform(ps, ori):
+    """
+    Get the per-cell signed permutations of the base functions of a
+    :class:`LobattoTensorProductPolySpace
+    <sfepy.discrete.fem.poly_spaces.LobattoTensorProductPolySpace>` instance
+    that correspond to the orientation array `ori`, as applied in
+    :func:`PolySpace.eval_base()
+    <sfepy.discrete.fem.poly_spaces.PolySpace.eval_base()>`.
+
+    Returns
+    -------
+    perm : array
+        The base function indices with shape `(n_cell, n_nod)`. The i-th base
+        function of a cell is `signs[:, i]` times the `perm[:, i]`-th
+        reference base function.
+    signs : array
+        The signs with shape `(n_cell, n_nod)`.
+    """
+    n_cell = ori.shape[0]
+    perm = nm.tile(nm.arange(ps.n_nod, dtype=nm.int32), (n_cell, 1))
+    signs = nm.ones((n_cell, ps.n_nod), dtype=nm.float64)
+
+    if ps.edge_indx.shape[0]:
+        ie, ii = nm.where(ori[:, ps.edge_indx] == 1)
+        signs[ie, ps.edge_indx[ii]] = -1.0
+
+    if ps.face_indx.shape[0]:
+        fori = ori[:, ps.face_indx]
+
+        ie, ii = nm.where((fori == 1) | (fori == 2))
+        signs[ie, ps.face_indx[ii]] = -1.0
+
+        # The swapped axes functions are the face functions with the
+        # transposed 1D indices.
+        nodes = ps.nodes[ps.face_indx]
+        iswap = nm.empty(ps.face_indx.shape[0], dtype=nm.int32)
+        for ii, node in enumerate(ps.sfnodes):
+            iswap[ii] = nm.where((nodes == node).all(axis=1))[0][0]
+
+        ie, ii = nm.where(fori >= 4)
+        perm[ie, ps.face_indx[ii]] = ps.face_indx[iswap[ii]]
+        signs[ie, ps.face_indx[ii]] = 1.0
+
+        ie, ii = nm.where((fori == 5) | (fori == 6))
+        signs[ie, ps.face_indx[ii]] = -1.0
+
+    return perm, signs
+
+class SumFactorization(Struct):
+    """
+    Sum-factorized tensor product basis in tensor product quadrature points.
+
+    The quadrature point and DOF orderings follow the sfepy conventions: the
+    tensor product quadrature points are ordered with the first coordinate
+    varying fastest, the cell DOFs are ordered as the base functions of the
+    polynomial space. Internally, the cell data are stored in arrays with
+    the shape `(n_cell, n_c, n_{dim-1}, ..., n_0)`, where `n_c` is the number
+    of components.
+
+    Parameters
+    ----------
+    ps : PolySpace instance
+        The tensor product polynomial space.
+    coors1d : array
+        The 1D quadrature point coordinates on the reference line.
+    weights1d : array
+        The 1D quadrature weights.
+    """
+
+    def __init__(self, ps, coors1d, weights1d):
+        if isinstance(ps, LagrangeTensorProductPolySpace):
+            eval_1d = eval_lagrange_1d
+            indices = ps.nodes[:, 1::2]
+
+        elif isinstance(ps, LobattoTensorProductPolySpace):
+            eval_1d = eval_lobatto_1d
+            indices = ps.nodes
+
+        else:
+            raise ValueError('not a tensor product polynomial space! (%s)'
+                             % ps.name)
+
+        dim = ps.geometry.dim
+        n_1d = ps.order + 1
+        c_min, c_max = ps.bbox[:, 0]
+
+        coors1d = nm.asarray(coors1d, dtype=nm.float64).ravel()
+        weights1d = nm.asarray(weights1d, dtype=nm.float64).ravel()
+
+        bf1d = eval_1d(coors1d, ps.order, c_min, c_max, diff=False)
+        bfg1d = eval_1d(coors1d, ps.order, c_min, c_max, diff=True)
+
+        # Positions of the base functions in the tensor product table with
+        # the first axis varying fastest.
+        ipos = nm.dot(indices, n_1d ** nm.arange(dim)).astype(nm.int32)
+        iperm = nm.argsort(ipos).astype(nm.int32)
+
+        grids = nm.meshgrid(*([coors1d] * dim), indexing='ij')
+        coors = nm.array([grids[dim - 1 - ii].ravel() for ii in range(dim)]).T
+
+        weights = weights1d
+        for ii in range(dim - 1):
+            weights = nm.outer(weights1d, weights).ravel()
+
+        Struct.__init__(self, name='sum_factorization_%s' % ps.name,
+                        ps=ps, dim=dim, n_1d=n_1d, n_qp1d=len(coors1d),
+                        n_nod=ps.n_nod, n_qp=coors.shape[0],
+                        bf1d=bf1d, bfg1d=bfg1d, ipos=ipos, iperm=iperm,
+                        coors=nm.ascontiguousarray(coors), weights=weights,
+                        perm=None, signs=None, jac_inv=None, wdet=None,
+                        same_qps=False, qp_data_cache={})
+
+    def set_dof_transform(self, perm, signs):
+        """
+        Set the per-cell signed permutations of the base functions, see
+        :func:`get_lobatto_dof_transform()`.
+        """
+        self.perm = perm
+        self.signs = signs
+
+    def describe_geometry(self, gsf, coors):
+        """
+        Compute the inverse jacobians and the jacobian determinants
+        multiplied by the quadrature weights of the cells.
+
+        Parameters
+        ----------
+        gsf : SumFactorization instance
+            The sum factorization of the geometry polynomial space with the
+            same quadrature points.
+        coors : array
+            The cell vertex coordinates with shape `(n_cell, n_vertex, dim)`.
+        """
+        # The jacobians dx_i/dxi_j with shape (n_cell, n_qp, dim, dim).
+        jac = gsf.eval_grad(nm.swapaxes(coors, 1, 2), reference=True)
+        det = nm.linalg.det(jac)
+        if (det <= 0.0).any():
+            raise ValueError('warp violation %e at some cells!' % det.min())
+
+        self.n_cell = coors.shape[0]
+        self.jac_inv = nm.linalg.inv(jac)
+        self.wdet = det * self.weights
+        self.volume = self.wdet.sum(axis=1)
+
+    def _contract(self, arr, mtxs, transpose=False):
+        """
+        Contract the tensor axes of `arr` with the 1D matrices `mtxs` given
+        per coordinate axis.
+        """
+        ia = 0 if transpose else 1
+        for ii in range(self.dim):
+            arr = nm.tensordot(arr, mtxs[self.dim - 1 - ii], axes=([2], [ia]))
+
+        return arr
+
+    def _to_tensor(self, vals):
+        n_cell, n_c = vals.shape[:2]
+        if self.perm is not None:
+            aux = nm.zeros_like(vals)
+            ic = nm.arange(n_cell)[:, None]
+            aux[ic, :, self.perm] = (self.signs[..., None]
+                                     * nm.swapaxes(vals, 1, 2))
+            vals = aux
+
+        vals = vals[..., self.iperm]
+        return vals.reshape((n_cell, n_c) + (self.n_1d,) * self.dim)
+
+    def _from_tensor(self, arr):
+        n_cell, n_c = arr.shape[:2]
+        vals = arr.reshape((n_cell, n_c, -1))[..., self.ipos]
+        if self.perm is not None:
+            ic = nm.arange(n_cell)[:, None]
+            vals = nm.swapaxes(self.signs[..., None] * vals[ic, :, self.perm],
+                               1, 2)
+
+        return nm.ascontiguousarray(vals)
+
+    def eval_val(self, vals):
+        """
+        Evaluate values in the quadrature points.
+
+        Parameters
+        ----------
+        vals : array
+            The cell DOF values with shape `(n_cell, n_c, n_nod)`.
+
+        Returns
+        -------
+        out : array
+            The values with shape `(n_cell, n_qp, n_c)`.
+        """
+        arr = self._contract(self._to_tensor(vals), [self.bf1d] * self.dim)
+        arr = arr.reshape(arr.shape[:2] + (self.n_qp,))
+
+        return nm.swapaxes(arr, 1, 2)
+
+    def eval_grad(self, vals, reference=False):
+        """
+        Evaluate gradients in the quadrature points.
+
+        Parameters
+        ----------
+        vals : array
+            The cell DOF values with shape `(n_cell, n_c, n_nod)`.
+        reference : bool
+            If True, return the gradients w.r.t. the reference element
+            coordinates. Otherwise, :func:`SumFactorization.describe_geometry()`
+            has to be called before to get the physical gradients.
+
+        Returns
+        -------
+        out : array
+            The gradients with shape `(n_cell, n_qp, n_c, dim)`.
+        """
+        arr = self._to_tensor(vals)
+
+        grads = []
+        for ir in range(self.dim):
+            mtxs = [self.bfg1d if ii == ir else self.bf1d
+                    for ii in range(self.dim)]
+            aux = self._contract(arr, mtxs)
+            grads.append(aux.reshape(aux.shape[:2] + (self.n_qp,)))
+
+        grad = nm.transpose(nm.array(grads), (1, 3, 2, 0))
+        if not reference:
+            grad = nm.einsum('cqij,cqdi->cqdj', self.jac_inv, grad)
+
+        return grad
+
+    def integrate_val(self, qvals):
+        """
+        Integrate the products of the base functions with values in the
+        quadrature points over the cells.
+
+        Parameters
+        ----------
+        qvals : array
+            The values with shape `(n_cell, n_qp, n_c)`.
+
+        Returns
+        -------
+        out : array
+            The cell vectors with shape `(n_cell, n_c, n_nod)`.
+        """
+        qvals = self.wdet[..., None] * qvals
+        arr = nm.swapaxes(qvals, 1, 2)
+        arr = arr.reshape(arr.shape[:2] + (self.n_qp1d,) * self.dim)
+        arr = self._contract(arr, [self.bf1d] * self.dim, transpose=True)
+
+        return self._from_tensor(arr)
+
+    def integrate_grad(self, flux):
+        """
+        Integrate the dot products of the physical gradients of the base
+        functions with vectors in the quadrature points over the cells.
+
+        Parameters
+        ----------
+        flux : array
+            The vectors with shape `(n_cell, n_qp, n_c, dim)`.
+
+        Returns
+        -------
+        out : array
+            The cell vectors with shape `(n_cell, n_c, n_nod)`.
+        """
+        flux = nm.einsum('cqij,cqdj->cqdi', self.jac_inv,
+                         self.wdet[..., None, None] * flux)
+
+        out = 0.0
+        for ir in range(self.dim):
+            arr = nm.swapaxes(flux[..., ir], 1, 2)
+            arr = arr.reshape(arr.shape[:2] + (self.n_qp1d,) * self.dim)
+            mtxs = [self.bfg1d if ii == ir else self.bf1d
+                    for ii in range(self.dim)]
+            out = out + self._contract(arr, mtxs, transpose=True)
+
+        return self._from_tensor(out)
+
+    def get_qp_data(self, data, key=None):
+        """
+        Get the material data in the quadrature points of the sum
+        factorization.
+
+        Parameters
+        ----------
+        data : array
+            The material data with shape `(n_cell, n_qp', n_row, n_col)` in
+            the quadrature points of the term integral.
+        key : tuple, optional
+            The `(names, versions)` key of the data, see
+            :func:`Term.get_sum_factorized_data_key()
+            <sfepy.terms.terms.Term.get_sum_factorized_data_key()>`. If given,
+            the check whether the data are constant in the quadrature points
+            is done only once for each data version.
+
+        Returns
+        -------
+        out : array or None
+            The data with shape `(n_cell, n_qp or 1, n_row, n_col)`, or None,
+            if the term integral quadrature points differ from the sum
+            factorization ones and the data vary in the quadrature points.
+        """
+        if (data.shape[1] == 1) or (self.same_qps
+                                    and (data.shape[1] == self.n_qp)):
+            return data
+
+        if key is None:
+            is_constant = (data == data[:, :1]).all()
+
+        else:
+            names, versions = key
+            cached = self.qp_data_cache.get(names)
+            if (cached is None) or (cached[0] != versions):
+                cached = (versions, (data == data[:, :1]).all())
+                self.qp_data_cache[names] = cached
+
+            is_constant = cached[1]
+
+        if is_constant:
+            return data[:, :1]
+
+        return None
+
+def create_sum_factorization(field, region, integral):
+    """
+    Create the sum factorization of `field` bases in `region` cells for the
+    tensor product of the 1D quadrature corresponding to `integral`.
+
+    Returns
+    -------
+    sf : SumFactorization instance or None
+        The sum factorization, or None, if the field approximation or the
+        integral are not supported.
+    """
+    ps = field.poly_space
+    gps = field.gel.poly_space
+    if (field.is_surface
+        or not isinstance(ps, (LagrangeTensorProductPolySpace,
+                               LobattoTensorProductPolySpace))
+        or not isinstance(gps, LagrangeTensorProductPolySpace)
+        or (field.basis_transform is not None)
+        or (integral.mode != 'builtin')):
+        return None
+
+    qp1d = QuadraturePoints.from_table('1_2', integral.order)
+
+    sf = SumFactorization(ps, qp1d.coors, qp1d.weights)
+    gsf = SumFactorization(gps, qp1d.coors, qp1d.weights)
+
+    cells = region.get_cells()
+    if getattr(field, 'ori', None) is not None:
+        ii = field.region.get_cell_indices(cells, true_cells_only=True)
+        sf.set_dof_transform(*get_lobatto_dof_transform(ps, field.ori[ii]))
+
+    domain = field.domain
+    coors = domain.get_mesh_coors(actual=True)
+    conn = domain.get_conn()[cells]
+    sf.describe_geometry(gsf, coors[conn])
+
+    qp_coors, _ = integral.get_qp(field.gel.name)
+    sf.same_qps = ((qp_coors.shape == sf.coors.shape)
+                   and nm.allclose(qp_coors, sf.coors, rtol=0.0, atol=1e-12))
+
+    return sf
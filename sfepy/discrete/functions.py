@@ -48,7 +48,8 @@ class ConstantFunction(Function):
     def __init__(self, values):
         """Make a function out of a dictionary of constant values. When
         called with coors argument, the values are repeated for each
-        coordinate."""
+        coordinate - the returned arrays are read-only views with the zero
+        stride along the coordinates, so no copies are made."""
 
         name = '_'.join(['get_constants'] + list(values.keys()))
 
@@ -65,7 +66,12 @@ class ConstantFunction(Function):
                     if '.' in key: continue
 
                     val = nm.array(val, dtype=nm.float64, ndmin=3)
-                    out[key] = nm.tile(val, (coors.shape[0], 1, 1))
+                    if val.shape[0] == 1:
+                        out[key] = nm.broadcast_to(val, (coors.shape[0],)
+                                                   + val.shape[1:])
+
+                    else:
+                        out[key] = nm.tile(val, (coors.shape[0], 1, 1))
 
             elif (mode == 'special_constant') or (mode is None):
                 for key, val in six.iteritems(values):
@@ -0,0 +1,206 @@
+"""
+Cache of sparse matrix graphs.
+
+The matrix graph given by the row and column DOF connectivities is the same
+for all problems with the same mesh, fields and boundary conditions, e.g. in
+problem copies, in parameter sweeps or when the equations of a problem are
+set repeatedly. :class:`MatrixGraphCache` stores the graphs computed by
+:func:`create_mesh_graph()
+<sfepy.discrete.common.extmods.cmesh.create_mesh_graph()>` under a digest of
+the connectivities, optionally persisting them in a directory, so that the
+reruns on the same mesh skip the graph construction.
+
+The global cache used by :func:`Equations.create_matrix_graph()
+<sfepy.discrete.equations.Equations.create_matrix_graph()>` is controlled by
+the following global options, see :mod:`sfepy.base.goptions`:
+
+- 'graph_cache_size' - the maximum memory in MB taken by the cached graphs;
+  0 disables the in-memory cache.
+- 'graph_cache_dir' - the directory for storing the graphs on the disk;
+  None disables the persistence.
+"""
+from __future__ import absolute_import
+import os
+import hashlib
+import tempfile
+from collections import OrderedDict
+
+import numpy as nm
+
+from sfepy.base.base import output, goptions
+from sfepy.discrete.common.extmods.cmesh import create_mesh_graph
+
+# Change when the stored graph format changes to invalidate the disk cache.
+_format_version = 1
+
+def get_graph_key(n_row, n_col, rconns, cconns, upper=False):
+    """
+    Get the digest of the matrix graph given by the connectivities.
+
+    Parameters
+    ----------
+    n_row, n_col : int
+        The numbers of row and column connectivity nodes.
+    rconns, cconns : list of arrays
+        The lists of row and column connectivities.
+    upper : bool
+        If True, the upper triangle graph is considered.
+
+    Returns
+    -------
+    key : str
+        The SHA1 digest of the connectivities.
+    """
+    sha1 = hashlib.sha1()
+    sha1.update(('%d %d %d %d %d' % (_format_version, n_row, n_col,
+                                     len(rconns), upper)).encode('ascii'))
+    for rconn, cconn in zip(rconns, cconns):
+        for conn in (rconn, cconn):
+            conn = nm.ascontiguousarray(conn, dtype=nm.int32)
+            sha1.update(('%s' % (conn.shape,)).encode('ascii'))
+            sha1.update(conn.data)
+
+    return sha1.hexdigest()
+
+class MatrixGraphCache(object):
+    """
+    Least recently used cache of sparse matrix graphs.
+
+    The graphs are stored as the CSR row pointer and column index arrays.
+    Copies of the stored arrays are returned, so that the callers may
+    modify them.
+
+    Parameters
+    ----------
+    max_mem : float
+        The maximum memory in MB taken by the cached graphs. The least
+        recently used graphs are evicted if it is exceeded.
+    cache_dir : str, optional
+        If given, the graphs are also stored in this directory and loaded
+        from it if not in memory.
+    """
+
+    def __init__(self, max_mem=0, cache_dir=None):
+        self.max_mem = max_mem
+        self.cache_dir = cache_dir
+        self.clear()
+
+    def clear(self):
+        """
+        Clear the in-memory cache and the statistics.
+        """
+        self.graphs = OrderedDict()
+        self.mem = 0
+        self.stats = {'hits' : 0, 'disk_hits' : 0, 'misses' : 0}
+
+    def get_filename(self, key):
+        return os.path.join(self.cache_dir, 'graph_%s.npz' % key)
+
+    def get(self, key):
+        """
+        Get the graph stored under `key`.
+
+        Returns
+        -------
+        graph : tuple or None
+            The tuple `(nnz, prow, icol)`, or None if the graph is not in
+            the cache.
+        """
+        item = self.graphs.pop(key, None)
+        if item is not None:
+            self.graphs[key] = item
+            self.stats['hits'] += 1
+
+        elif self.cache_dir is not None:
+            filename = self.get_filename(key)
+            if os.path.exists(filename):
+                try:
+                    with nm.load(filename) as data:
+                        item = (data['prow'], data['icol'])
+
+                except (IOError, ValueError, KeyError) as exc:
+                    output('cannot load matrix graph from %s! (%s)'
+                           % (filename, exc))
+
+                else:
+                    self.stats['disk_hits'] += 1
+                    self._store(key, item)
+
+        if item is None:
+            self.stats['misses'] += 1
+            return None
+
+        prow, icol = item
+        return icol.shape[0], prow.copy(), icol.copy()
+
+    def put(self, key, prow, icol):
+        """
+        Store the graph given by the CSR arrays `prow`, `icol` under `key`.
+        """
+        item = (prow.copy(), icol.copy())
+        self._store(key, item)
+
+        if self.cache_dir is not None:
+            self._save(key, item)
+
+    def _store(self, key, item):
+        if key in self.graphs:
+            self.mem -= sum(ii.nbytes for ii in self.graphs.pop(key))
+
+        size = sum(ii.nbytes for ii in item)
+        max_size = self.max_mem * 1024**2
+        if size > max_size:
+            return
+
+        self.graphs[key] = item
+        self.mem += size
+        while self.mem > max_size:
+            _, old = self.graphs.popitem(last=False)
+            self.mem -= sum(ii.nbytes for ii in old)
+
+    def _save(self, key, item):
+        if not os.path.exists(self.cache_dir):
+            os.makedirs(self.cache_dir)
+
+        # Write to a temporary file first, so that other processes never
+        # see partially written files.
+        fd, tmp_name = tempfile.mkstemp(suffix='.npz', dir=self.cache_dir)
+        try:
+            with os.fdopen(fd, 'wb') as fh:
+                nm.savez(fh, prow=item[0], icol=item[1])
+            os.rename(tmp_name, self.get_filename(key))
+
+        except (IOError, OSError) as exc:
+            output('cannot save matrix graph to %s! (%s)'
+                   % (self.cache_dir, exc))
+            if os.path.exists(tmp_name):
+                os.remove(tmp_name)
+
+graph_cache = MatrixGraphCache()
+
+def create_cached_mesh_graph(n_row, n_col, n_gr, rconns, cconns, upper=False,
+                             cache=None):
+    """
+    Cached version of :func:`create_mesh_graph()
+    <sfepy.discrete.common.extmods.cmesh.create_mesh_graph()>`.
+
+    If `cache` is not given, the global cache :data:`graph_cache` is used
+    with the settings given by the 'graph_cache_size' and 'graph_cache_dir'
+    global options. If both options are disabled, the graph is always
+    created.
+    """
+    if cache is None:
+        cache = graph_cache
+        cache.max_mem = goptions['graph_cache_size']
+        cache.cache_dir = goptions['graph_cache_dir']
+
+    if (cache.max_mem == 0) and (cache.cache_dir is None):
+        return create_mesh_graph(n_row, n_col, n_gr, rconns, cconns, upper)
+
+    key = get_graph_key(n_row, n_col, rconns, cconns, upper=upper)
+    graph = cache.get(key)
+    if graph is None:
+        graph = create_mesh_graph(n_row, n_col, n_gr, rconns, cconns, upper)
+        cache.put(key, graph[1], graph[2])
+
+    return graph
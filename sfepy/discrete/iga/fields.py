@@ -5,7 +5,9 @@ from __future__ import absolute_import
 import numpy as nm
 
 from sfepy.base.base import assert_, basestr, Struct
-from sfepy.discrete.common.fields import parse_shape, Field
+from sfepy.base.profiling import profiled
+from sfepy.discrete.common.fields import (parse_shape, Field,
+                                          get_mapping_profile_keys)
 from sfepy.discrete.iga.mappings import IGMapping
 from sfepy.discrete.iga.iga import get_bezier_element_entities
 from six.moves import range
@@ -81,7 +83,7 @@ class IGField(Field):
         self.n_efun = nm.prod(self.nurbs.degrees + 1)
         self.approx_order = self.nurbs.degrees.max()
 
-        self.mappings = {}
+        self.clear_mappings()
 
         self.is_surface = False
 
@@ -356,6 +358,7 @@ class IGField(Field):
         if dct != 'volume':
             raise ValueError('unknown dof connectivity type! (%s)' % dct)
 
+    @profiled(get_mapping_profile_keys)
     def create_mapping(self, region, integral, integration):
         """
         Create a new reference mapping.
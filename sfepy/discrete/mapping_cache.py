@@ -0,0 +1,411 @@
+"""
+Cache of reference mappings of fields.
+
+A field keeps the reference mappings (the base function values and
+gradients, the jacobians, element volumes, ...) of each region, integral and
+integration type it has been used with, see :func:`Field.get_mapping()
+<sfepy.discrete.common.fields.Field.get_mapping()>`. For many regions and
+integrals on large meshes, the base function gradients `bfg` and jacobians
+`det` can dominate the memory footprint of a computation.
+:class:`MappingCache` bounds the memory taken by the mappings by evicting the
+least recently used ones, which are then either recreated on demand, or, if
+a directory is given, stored there and served from memory-mapped files. The
+base function gradients can be also stored in single precision - the
+double precision copies of the recently used mappings are then kept within
+the memory limit.
+
+The mapping caches created by fields are controlled by the following global
+options, see :mod:`sfepy.base.goptions`:
+
+- 'mapping_cache_size' - the maximum memory in MB taken by the mappings of a
+  field; 0 means no limit.
+- 'mapping_cache_float32' - if True, store the base function gradients in
+  single precision.
+- 'mapping_cache_dir' - the directory for storing the evicted mappings on
+  the disk; None disables the spilling.
+
+The options are applied when the field mappings are cleared, e.g. by
+:func:`Problem.time_update() <sfepy.discrete.problem.Problem.time_update()>`.
+"""
+from __future__ import absolute_import
+import os
+import shutil
+import tempfile
+from collections import OrderedDict
+
+import numpy as nm
+
+from sfepy.base.base import output, goptions, Struct
+from sfepy.discrete.common.extmods.mappings import CMapping
+
+# The data arrays of CMapping, and the auxiliary attributes assigned from
+# Python.
+_array_names = ['bf', 'bfg', 'det', 'volume', 'normal']
+_attr_names = ['integral', 'qp', 'ps', 'mtx_t']
+
+class PackedMapping(Struct):
+    """
+    The data of a reference mapping, see :func:`pack_mapping()`.
+    """
+
+def get_mapping_size(geo):
+    """
+    Get the memory in bytes taken by the data arrays of the reference mapping
+    `geo`.
+    """
+    if isinstance(geo, PackedMapping):
+        arrays = geo.arrays.values()
+
+    else:
+        arrays = [getattr(geo, name, None) for name in _array_names]
+
+    return sum(arr.nbytes for arr in arrays if isinstance(arr, nm.ndarray))
+
+def pack_mapping(geo, bfg_dtype=None):
+    """
+    Pack the data of the reference mapping `geo` into a PackedMapping
+    instance that can be stored and later converted back by
+    :func:`unpack_mapping()`.
+
+    Parameters
+    ----------
+    geo : CMapping instance
+        The reference mapping.
+    bfg_dtype : numpy.dtype, optional
+        If given, the base function gradients are stored with this data type.
+
+    Returns
+    -------
+    packed : PackedMapping instance
+        The packed mapping with the data arrays in the `arrays` attribute.
+    """
+    arrays = {}
+    for name in _array_names:
+        val = getattr(geo, name)
+        if val is None: continue
+
+        if (name == 'bfg') and (bfg_dtype is not None):
+            val = val.astype(bfg_dtype)
+
+        arrays[name] = val
+
+    attrs = dict((name, getattr(geo, name)) for name in _attr_names)
+
+    return PackedMapping(name='packed_mapping', mode=geo.mode,
+                         shape=geo.shape, arrays=arrays, attrs=attrs)
+
+def unpack_mapping(packed, copy=True):
+    """
+    Create a new reference mapping from the data packed by
+    :func:`pack_mapping()`.
+
+    If `copy` is True, the data arrays are copied to the new mapping in
+    double precision. Otherwise, the mapping uses the data arrays directly,
+    e.g. memory-mapped ones - they have to be C-contiguous float64 arrays.
+    """
+    n_el, n_qp, dim, n_ep = packed.shape
+    arrays = packed.arrays
+
+    if copy:
+        geo = CMapping(n_el, n_qp, dim, n_ep, mode=packed.mode,
+                       flag=arrays['bf'].shape[0] != 1)
+        if (geo.bfg is None) and ('bfg' in arrays):
+            geo.alloc_extra_data(arrays['bfg'].shape[3])
+
+        for name, val in arrays.items():
+            getattr(geo, name)[:] = val
+
+    else:
+        geo = CMapping(0, n_qp, dim, n_ep, mode=packed.mode)
+        if (geo.bfg is None) and ('bfg' in arrays):
+            geo.alloc_extra_data(arrays['bfg'].shape[3])
+
+        geo.set_data(**arrays)
+
+    for name, val in packed.attrs.items():
+        setattr(geo, name, val)
+
+    return geo
+
+class MappingCache(object):
+    """
+    Least recently used cache of reference mappings.
+
+    The cached items are the `(geo, mapping)` tuples returned by
+    `Field.create_mapping()`. Only the data arrays of `geo` count to the
+    memory limit. The mappings that are not instances of CMapping are always
+    stored as they are and just dropped when evicted.
+
+    With `bfg_dtype` given, the mappings are stored packed, see
+    :func:`pack_mapping()`, and their double precision copies are kept in
+    the `expanded` attribute. The copies count to the memory limit and are
+    dropped first when it is exceeded, except for the most recently used
+    one. Without the memory limit, only the most recently used copy is
+    kept. The copy of a newly stored mapping is the mapping itself.
+
+    The evicted mappings stored on the disk stay there and are served by
+    mappings using the memory-mapped (copy-on-write) data files, that do not
+    count to the memory limit.
+
+    Parameters
+    ----------
+    max_mem : float
+        The maximum memory in MB taken by the cached mappings. The least
+        recently used mappings are evicted if it is exceeded. 0 means no
+        limit.
+    bfg_dtype : numpy.dtype, optional
+        If given, the base function gradients are stored with this data type,
+        e.g. `numpy.float32`.
+    cache_dir : str, optional
+        If given, the evicted mappings are stored in a temporary subdirectory
+        of this directory. The subdirectory is removed by :func:`clear()`.
+    """
+
+    @staticmethod
+    def from_goptions():
+        """
+        Create a new cache with the settings given by the 'mapping_cache_size',
+        'mapping_cache_float32' and 'mapping_cache_dir' global options.
+        """
+        bfg_dtype = nm.float32 if goptions['mapping_cache_float32'] else None
+        return MappingCache(max_mem=goptions['mapping_cache_size'],
+                            bfg_dtype=bfg_dtype,
+                            cache_dir=goptions['mapping_cache_dir'])
+
+    def __init__(self, max_mem=0, bfg_dtype=None, cache_dir=None):
+        self.max_mem = max_mem
+        self.bfg_dtype = bfg_dtype
+        self.cache_dir = cache_dir
+        self.spill_dir = None
+        self.clear()
+
+    def __del__(self):
+        try:
+            self._remove_spilled()
+
+        except Exception:
+            pass
+
+    def __len__(self):
+        return len(self.mappings) + len(self.spilled)
+
+    def __contains__(self, key):
+        return (key in self.mappings) or (key in self.spilled)
+
+    def keys(self):
+        return list(self.mappings.keys()) + list(self.spilled.keys())
+
+    def clear(self):
+        """
+        Clear the cache including the mappings stored on the disk, and the
+        statistics.
+        """
+        self._remove_spilled()
+        self.mappings = OrderedDict()
+        self.expanded = OrderedDict()
+        self.mem = 0
+        self.stats = {'hits' : 0, 'disk_hits' : 0, 'misses' : 0}
+
+    def get(self, key, default=None):
+        """
+        Get the `(geo, mapping)` tuple stored under `key`, or `default` if it
+        is not in the cache.
+        """
+        item = self.mappings.pop(key, None)
+        if item is not None:
+            self.mappings[key] = item
+            self.stats['hits'] += 1
+
+            geo, mapping = item
+            if isinstance(geo, PackedMapping):
+                geo = self._expand(key, geo)
+                self._trim()
+
+            return geo, mapping
+
+        elif key in self.spilled:
+            item = self._get_spilled(key)
+            if item is not None:
+                self.stats['disk_hits'] += 1
+                return item
+
+        self.stats['misses'] += 1
+        return default
+
+    def __getitem__(self, key):
+        out = self.get(key)
+        if out is None:
+            raise KeyError(key)
+
+        return out
+
+    def __setitem__(self, key, value):
+        """
+        Store the `(geo, mapping)` tuple `value` under `key`.
+        """
+        self._drop_spilled(key)
+        self._drop_expanded(key)
+
+        geo, mapping = value
+        if (self.bfg_dtype is not None) and isinstance(geo, CMapping):
+            self._store(key, (pack_mapping(geo, bfg_dtype=self.bfg_dtype),
+                              mapping))
+            self.expanded[key] = geo
+            self.mem += get_mapping_size(geo)
+
+        else:
+            self._store(key, (geo, mapping))
+
+        self._trim()
+
+    def items(self):
+        """
+        Return the list of all `(key, (geo, mapping))` items, including the
+        mappings stored on the disk. The statistics are not updated.
+        """
+        out = [(key, self._get_value(key, item))
+               for key, item in self.mappings.items()]
+        for key in list(self.spilled.keys()):
+            item = self._get_spilled(key)
+            if item is not None:
+                out.append((key, item))
+
+        return out
+
+    def copy(self):
+        """
+        Return a copy of the cache without the memory limit and the disk
+        storage. The stored mappings are shared, including the mappings
+        served from the disk.
+        """
+        out = MappingCache(bfg_dtype=self.bfg_dtype)
+        for key, item in self.mappings.items():
+            out._store(key, item)
+
+        for key in list(self.spilled.keys()):
+            item = self._get_spilled(key)
+            if item is not None:
+                out._store(key, item)
+
+        return out
+
+    def _get_value(self, key, item):
+        geo, mapping = item
+        if isinstance(geo, PackedMapping):
+            geo = self.expanded.get(key)
+            if geo is None:
+                geo = unpack_mapping(item[0])
+
+        return geo, mapping
+
+    def _expand(self, key, packed):
+        geo = self.expanded.pop(key, None)
+        if geo is None:
+            geo = unpack_mapping(packed)
+            self.mem += get_mapping_size(geo)
+
+        self.expanded[key] = geo
+
+        return geo
+
+    def _drop_expanded(self, key):
+        geo = self.expanded.pop(key, None)
+        if geo is not None:
+            self.mem -= get_mapping_size(geo)
+
+    def _store(self, key, item):
+        if key in self.mappings:
+            self.mem -= get_mapping_size(self.mappings.pop(key)[0])
+
+        self.mappings[key] = item
+        self.mem += get_mapping_size(item[0])
+
+    def _trim(self):
+        if self.max_mem == 0:
+            while len(self.expanded) > 1:
+                self._drop_expanded(next(iter(self.expanded)))
+            return
+
+        max_size = self.max_mem * 1024**2
+        while (self.mem > max_size) and (len(self.expanded) > 1):
+            self._drop_expanded(next(iter(self.expanded)))
+
+        while (self.mem > max_size) and len(self.mappings):
+            key, item = self.mappings.popitem(last=False)
+            self.mem -= get_mapping_size(item[0])
+            geo = self.expanded.get(key, item[0])
+            self._drop_expanded(key)
+
+            if self.cache_dir is not None:
+                self._spill(key, (geo, item[1]))
+
+    def _spill(self, key, item):
+        geo, mapping = item
+        if isinstance(geo, CMapping):
+            geo = pack_mapping(geo)
+
+        elif not isinstance(geo, PackedMapping):
+            return
+
+        try:
+            if self.spill_dir is None:
+                if not os.path.exists(self.cache_dir):
+                    os.makedirs(self.cache_dir)
+                self.spill_dir = tempfile.mkdtemp(prefix='mappings_',
+                                                  dir=self.cache_dir)
+
+            filenames = {}
+            for name, val in geo.arrays.items():
+                fd, filename = tempfile.mkstemp(suffix='.npy',
+                                                dir=self.spill_dir)
+                with os.fdopen(fd, 'wb') as fh:
+                    # Store all arrays in double precision, so that the
+                    # memory-mapped files can be used directly.
+                    nm.save(fh, nm.ascontiguousarray(val, dtype=nm.float64))
+                filenames[name] = filename
+
+        except (IOError, OSError) as exc:
+            output('cannot store reference mapping to %s! (%s)'
+                   % (self.cache_dir, exc))
+            return
+
+        spilled = geo.copy(name=geo.name)
+        spilled.arrays = filenames
+        spilled.geo = None
+        self.spilled[key] = (spilled, mapping)
+
+    def _get_spilled(self, key):
+        """
+        Get the mapping stored on the disk under `key`. The mapping using the
+        memory-mapped data files is created on the first access.
+        """
+        spilled, mapping = self.spilled[key]
+        if spilled.geo is None:
+            try:
+                arrays = dict((name, nm.load(filename, mmap_mode='c'))
+                              for name, filename in spilled.arrays.items())
+
+            except (IOError, ValueError) as exc:
+                output('cannot load reference mapping from %s! (%s)'
+                       % (self.spill_dir, exc))
+                self._drop_spilled(key)
+                return None
+
+            packed = spilled.copy(name=spilled.name)
+            packed.arrays = arrays
+            spilled.geo = unpack_mapping(packed, copy=False)
+
+        return spilled.geo, mapping
+
+    def _drop_spilled(self, key):
+        item = self.spilled.pop(key, None)
+        if item is not None:
+            for filename in item[0].arrays.values():
+                if os.path.exists(filename):
+                    os.remove(filename)
+
+    def _remove_spilled(self):
+        self.spilled = {}
+        if self.spill_dir is not None:
+            shutil.rmtree(self.spill_dir, ignore_errors=True)
+            self.spill_dir = None
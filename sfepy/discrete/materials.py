@@ -1,12 +1,26 @@
 from __future__ import absolute_import
 import time
+import hashlib
 from copy import copy
 
+import numpy as nm
+
 from sfepy.base.base import (Struct, Container, OneTypeList, assert_,
                              output, get_default, basestr)
+from sfepy.base.profiling import profiled
+from sfepy.linalg.utils import broadcast_to_cells
 from .functions import ConstantFunction, ConstantFunctionByRegion
 import six
 
+def get_coors_digest(domain):
+    """
+    Get the SHA1 digest of the coordinates defining the geometry of `domain`,
+    i.e. the mesh vertices or the NURBS control points.
+    """
+    nurbs = getattr(domain, 'nurbs', None)
+    coors = nurbs.cps if nurbs is not None else domain.mesh.coors
+
+    return hashlib.sha1(nm.ascontiguousarray(coors)).hexdigest()
 
 class Materials(Container):
 
@@ -72,6 +86,28 @@ class Material(Struct):
 
     Material parameters are passed to terms using the dot notation,
     i.e. 'm.E' in our example case.
+
+    The physical quadrature point coordinates passed to the material function
+    are cached per the (region, integral) data keys and recomputed only when
+    the mesh coordinates change.
+
+    The parameters of a material given by a function that do not change
+    during a time-dependent simulation can be declared using the flags::
+
+        material_3 = {
+           'name' : 'm',
+           'function' : 'get_pars',
+           'flags' : {'time_independent' : ['D'],
+                      'state_independent' : ['f']},
+        }
+
+    The 'time_independent' parameters depend only on the coordinates - they
+    are evaluated once and then reused. The 'state_independent' parameters do
+    not depend on the state and are reevaluated only when the time
+    changes. The other parameters are reevaluated in each update. In the
+    subsequent updates, the material function is called with the `names`
+    keyword argument - the list of parameters to reevaluate - and may
+    return only those.
     """
     @staticmethod
     def from_conf(conf, functions):
@@ -105,11 +141,13 @@ class Material(Struct):
         values : dict
             Constant material values.
         flags : dict, optional
-            Special flags.
+            Special flags: 'special_constant', 'time_independent' and
+            'state_independent', see :class:`Material`.
         **kwargs : keyword arguments, optional
             Constant material values passed by their names.
         """
-        Struct.__init__(self, name=name, kind=kind, is_constant=False)
+        Struct.__init__(self, name=name, kind=kind, is_constant=False,
+                        data_version=0)
 
         if (function is not None) and ((values is not None) or len(kwargs)):
             msg = 'material can have function or values but not both! (%s)' \
@@ -117,6 +155,7 @@ class Material(Struct):
             raise ValueError(msg)
 
         self.flags = get_default(flags, {})
+        self.qps_cache = {}
 
         if hasattr(function, '__call__'):
             self.function = function
@@ -154,21 +193,24 @@ class Material(Struct):
         """
         Iterate terms for which the material data should be evaluated.
         """
-        if equations is None: raise StopIteration
+        if equations is None: return
 
+        keys = set()
         for equation in equations:
             for term in equation.terms:
                 names = [ii[0] for ii in term.names.material]
                 if self.name not in names: continue
 
                 key = term.get_qp_key()
+                if key in keys: continue
                 if only_new and (key in self.datas): continue
 
+                keys.add(key)
                 self.datas.setdefault(key, {})
 
                 yield key, term
 
-    def set_data(self, key, qps, data):
+    def set_data(self, key, qps, data, update=False):
         """
         Set the material data in quadrature points.
 
@@ -179,22 +221,45 @@ class Material(Struct):
         qps : Struct
             Information about the quadrature points.
         data : dict
-            The material data.
+            The material data. The values are arrays with the shape
+            (n_qp_total, n_row, n_col), where n_qp_total is the number of
+            all physical quadrature points, or arrays broadcastable to the
+            shape (n_el, n_qp, n_row, n_col), see
+            :func:`sfepy.linalg.utils.broadcast_to_cells()`.
+            Constant values broadcast along the cells, e.g. by
+            `numpy.broadcast_to()`, are stored without copies.
+        update : bool
+            If True, the existing data not present in `data` are preserved.
         """
         # Restore shape to (n_el, n_qp, ...) until the C
         # core is rewritten to work with a bunch of physical
         # point values only.
-        new_data = {}
+        new_data = self.datas.get(key, {}).copy() if update else {}
         if data is not None:
             for dkey, val in six.iteritems(data):
-                if val.ndim != 3:
+                if val.ndim == 3:
+                    val = val.reshape(qps.get_shape(val.shape))
+
+                elif val.ndim == 4:
+                    if qps.shape[1] > 0:
+                        val = broadcast_to_cells(val, qps.shape[:2]
+                                                 + val.shape[2:])
+
+                else:
                     raise ValueError('material parameter array must have'
-                                     " three dimensions! ('%s' has %d)"
-                                     % (dkey, val.ndim))
-                new_data[dkey] = val.reshape(qps.get_shape(val.shape))
+                                     " three or four dimensions!"
+                                     " ('%s' has %d)" % (dkey, val.ndim))
+
+                if (val.shape[0] > 1) and (val.strides[0] == 0):
+                    # Keep the data constant over cells compact.
+                    val = broadcast_to_cells(val[:1], val.shape)
+
+                new_data[dkey] = val
 
         self.datas[key] = new_data
+        self.data_version += 1
 
+    @profiled(lambda self, *args, **kwargs: [('materials', self.name)])
     def update_data(self, key, ts, equations, term, problem=None):
         """
         Update the material parameters in quadrature points.
@@ -214,13 +279,88 @@ class Material(Struct):
         """
         self.datas.setdefault(key, {})
 
-        qps = term.get_physical_qps()
+        qps, is_new = self.get_physical_qps(key, term)
+        time = ts.time if ts is not None else None
+
+        names = None if is_new else self.get_update_names(key, time)
+        if names is not None:
+            if not len(names): return
+
+            kwargs = dict(self.extra_args, names=names)
+
+        else:
+            kwargs = self.extra_args
+
         coors = qps.values
         data = self.function(ts, coors, mode='qp',
                              equations=equations, term=term, problem=problem,
-                             **self.extra_args)
+                             **kwargs)
+
+        self.set_data(key, qps, data, update=names is not None)
+        self.data_times[key] = time
+
+    def get_physical_qps(self, key, term):
+        """
+        Get the physical quadrature points of `term` from the cache, or
+        compute them if the mesh coordinates changed.
 
-        self.set_data(key, qps, data)
+        Parameters
+        ----------
+        key : tuple
+            The (region_name, integral_name) data key.
+        term : Term
+            The term for which the update occurs.
+
+        Returns
+        -------
+        qps : PhysicalQPs
+            The physical quadrature points.
+        is_new : bool
+            True, if the quadrature points were computed.
+        """
+        digest = get_coors_digest(term.region.domain)
+
+        item = self.qps_cache.get(key)
+        if ((item is not None) and (item[0] is term.region)
+            and (item[1] is term.integral) and (item[2] == digest)):
+            return item[3], False
+
+        qps = term.get_physical_qps()
+        self.qps_cache[key] = (term.region, term.integral, digest, qps)
+
+        return qps, True
+
+    def get_update_names(self, key, time):
+        """
+        Get the names of parameters that need to be reevaluated at `time`
+        according to the 'time_independent' and 'state_independent' flags.
+
+        Parameters
+        ----------
+        key : tuple
+            The (region_name, integral_name) data key.
+        time : float or None
+            The current time.
+
+        Returns
+        -------
+        names : list or None
+            The parameter names, or None if all parameters have to be
+            evaluated.
+        """
+        ti_names = self.flags.get('time_independent', [])
+        si_names = self.flags.get('state_independent', [])
+        datas = self.datas.get(key)
+        if ((not (len(ti_names) or len(si_names))) or (not datas)
+            or (key not in self.data_times)):
+            return None
+
+        is_new_time = time != self.data_times[key]
+        names = [name for name in sorted(datas.keys())
+                 if (name not in ti_names)
+                 and (is_new_time or (name not in si_names))]
+
+        return names
 
     def update_special_data(self, ts, equations, problem=None):
         """
@@ -284,13 +424,17 @@ class Material(Struct):
             ``self.datas`` is not empty. For time-dependent materials
             (``self.kind == 'time-dependent'``, the default) that are not
             constant, i.e., are given by a user function, 'normal' mode behaves
-            like 'force' mode. For constant materials it behaves like 'update'
-            mode - existing data are reused.
+            like 'force' mode, unless the 'time_independent' or
+            'state_independent' flags are given - then only the parameters
+            that can change are reevaluated. For constant materials it
+            behaves like 'update' mode - existing data are reused.
         problem : Problem instance, optional
             The problem that can be passed to user functions as a context.
         """
+        only_new = True
         if mode == 'force':
             self.datas = {}
+            self.data_version += 1
 
         elif self.datas:
             if mode == 'normal':
@@ -298,9 +442,15 @@ class Material(Struct):
                     return
 
                 elif not self.is_constant:
-                    self.datas = {}
+                    if (self.flags.get('time_independent')
+                        or self.flags.get('state_independent')):
+                        only_new = False
+
+                    else:
+                        self.datas = {}
+                        self.data_version += 1
 
-        for key, term in self.iter_terms(equations):
+        for key, term in self.iter_terms(equations, only_new=only_new):
             self.update_data(key, ts, equations, term, problem=problem)
 
         self.update_special_data(ts, equations, problem=problem)
@@ -333,6 +483,7 @@ class Material(Struct):
         """
         self.mode = 'user'
         self.datas = datas
+        self.data_version += 1
 
     def set_function(self, function):
         self.function = function
@@ -345,6 +496,8 @@ class Material(Struct):
         """
         self.mode = None
         self.datas = {}
+        self.data_times = {}
+        self.data_version += 1
         self.special_names = set()
         self.constant_names = set()
         self.extra_args = {}
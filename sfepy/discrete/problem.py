@@ -8,7 +8,8 @@ import numpy as nm
 
 from sfepy.base.base import (
     dict_from_keys_init, select_by_names, is_string, is_integer, is_sequence,
-    output, get_default, Struct, IndexedStruct)
+    output, get_default, Struct, IndexedStruct, goptions)
+from sfepy.base.profiling import profiler
 import sfepy.base.ioutils as io
 from sfepy.base.conf import ProblemConf, get_standard_keywords
 from sfepy.base.conf import transform_variables, transform_materials
@@ -605,11 +606,30 @@ class Problem(Struct):
             If True, force the matrix graph computation.
         is_matrix : bool
             If False, the matrix is not created. Has precedence over
-            `create_matrix`.
+            `create_matrix`. The matrix is also not created, if the
+            'matrix_free' option is True.
+
+        Notes
+        -----
+        If the 'symmetric_storage' option is True, only the upper triangle of
+        the tangent matrix is created and assembled, see
+        :func:`Equations.create_matrix_graph()
+        <sfepy.discrete.equations.Equations.create_matrix_graph()>`. This
+        requires `active_only` set to True and equations with a symmetric
+        tangent matrix.
         """
         self.update_time_stepper(ts)
         functions = get_default(functions, self.functions)
 
+        options = getattr(self.conf, 'options', {})
+        if options.get('matrix_free', False):
+            is_matrix = False
+
+        symmetric = options.get('symmetric_storage', False)
+        if symmetric and not self.active_only:
+            raise ValueError('symmetric_storage option requires'
+                             ' active_only == True!')
+
         ac = self.active_only
         graph_changed = self.equations.time_update(self.ts,
                                                    ebcs, epbcs, lcbcs,
@@ -620,7 +640,8 @@ class Problem(Struct):
         if (is_matrix
             and ((self.active_only and graph_changed)
                  or (self.mtx_a is None) or create_matrix)):
-            self.mtx_a = self.equations.create_matrix_graph(active_only=ac)
+            self.mtx_a = self.equations.create_matrix_graph(
+                active_only=ac, symmetric=symmetric)
             ## import sfepy.base.plotutils as plu
             ## plu.spy(self.mtx_a)
             ## plu.plt.show()
@@ -959,9 +980,19 @@ class Problem(Struct):
                 raise AttributeError('call Problem.init_solvers() or'\
                                      ' set reuse to False!')
         else:
-            UserEvaluator = self.conf.options.get('user_evaluator', None)
+            options = self.conf.options
+            UserEvaluator = options.get('user_evaluator', None)
             Eval = UserEvaluator if UserEvaluator is not None else Evaluator
-            ev = self.evaluator = Eval(self, matrix_hook=self.matrix_hook)
+
+            kwargs = {}
+            if options.get('matrix_free', False):
+                kwargs['matrix_free'] = True
+                kwargs['precond'] = options.get('matrix_free_precond', None)
+                kwargs['chunk_size'] = options.get('matrix_free_chunk_size',
+                                                   None)
+
+            ev = self.evaluator = Eval(self, matrix_hook=self.matrix_hook,
+                                       **kwargs)
 
         return ev
 
@@ -1336,10 +1367,20 @@ class Problem(Struct):
         -------
         state : State
             The final state.
+
+        Notes
+        -----
+        If the 'profile' global option is True, the profiler records (see
+        :mod:`sfepy.base.profiling`) are reset at the start, printed at the
+        end and stored in `status['profile']`. The memory tracing of the
+        profiler is stopped at the end.
         """
         if status is None:
             status = IndexedStruct()
 
+        if goptions['profile']:
+            profiler.reset()
+
         if self.solver is None:
             self.init_solvers(status=status)
 
@@ -1390,6 +1431,11 @@ class Problem(Struct):
         if post_process_hook_final is not None: # User postprocessing.
             post_process_hook_final(self, state)
 
+        if goptions['profile']:
+            profiler.stop()
+            profiler.print_report()
+            status['profile'] = profiler.get_report()
+
         return state
 
     def block_solve(self, state0=None, status=None, save_results=True,
@@ -2,6 +2,8 @@
 Fields corresponding to structural elements.
 """
 from sfepy.base.base import Struct
+from sfepy.base.profiling import profiled
+from sfepy.discrete.common.fields import get_mapping_profile_keys
 from sfepy.discrete.fem.fields_nodal import H1NodalMixin, VolumeField
 from sfepy.discrete.structural.mappings import Shell10XMapping
 from sfepy.discrete.fem.poly_spaces import PolySpace
@@ -19,6 +21,7 @@ class Shell10XField(H1NodalMixin, VolumeField):
                                      base='lagrange', force_bubble=False)
         self.poly_space = ps
 
+    @profiled(get_mapping_profile_keys)
     def create_mapping(self, region, integral, integration,
                        return_mapping=True):
         """
@@ -122,6 +122,7 @@ class CorrMiniApp(MiniAppBase):
         self.set_default('dump_name', self.save_name)
         self.set_default('dump_variables', [])
         self.set_default('save_variables', self.dump_variables)
+        self.set_default('multi_rhs', True)
 
         if self.save_name is not None:
             self.save_name = os.path.normpath(os.path.join(self.output_dir,
@@ -130,6 +131,57 @@ class CorrMiniApp(MiniAppBase):
             self.dump_name = os.path.normpath(os.path.join(self.output_dir,
                                                            self.dump_name))
 
+    def can_solve_cases(self, problem):
+        """
+        Return True, if the load cases of the corrector problem can be
+        solved by a single linear solver call, see
+        :func:`CorrMiniApp.solve_cases()`.
+
+        This requires a linear problem with the `multi_rhs` option True, the
+        active DOFs only and no LCBCs.
+        """
+        return (self.is_linear and self.multi_rhs and problem.active_only
+                and not problem.equations.variables.has_lcbc)
+
+    def solve_cases(self, problem, cases, set_variables):
+        """
+        Solve the linear corrector problem for all load cases by a single
+        linear solver call.
+
+        The matrix is assembled and presolved only once in
+        :func:`MiniAppBase.init_solvers()`. The right-hand sides are the
+        residuals in the initial state satisfying the EBCs, evaluated after
+        calling `set_variables(*case)` for each item of `cases`.
+
+        Returns
+        -------
+        states : list of State
+            The solutions of the load cases.
+        """
+        state0 = problem.create_state()
+        state0.apply_ebc()
+        vec0 = state0.get_vec(problem.active_only)
+
+        ev = problem.get_evaluator()
+        rhs = nm.empty((vec0.shape[0], len(cases)), dtype=vec0.dtype)
+        for ii, case in enumerate(cases):
+            set_variables(*case)
+            rhs[:, ii] = ev.eval_residual(vec0)
+
+        tt = time.clock()
+        ls = problem.get_ls()
+        vec_dx = ls(rhs, mtx=ev.eval_tangent_matrix('linear'))
+        output('%d load cases solved in %.2f s'
+               % (len(cases), time.clock() - tt))
+
+        states = []
+        for ii in range(len(cases)):
+            state = state0.copy()
+            state.set_vec(vec0 - vec_dx[:, ii], problem.active_only)
+            states.append(state)
+
+        return states
+
     def setup_output(self, save_format=None, dump_format=None,
                       post_process_hook=None, file_per_var=None):
         """Instance attributes have precedence!"""
@@ -343,22 +395,29 @@ class CorrNN(CorrMiniApp):
 
         variables = problem.get_variables()
 
+        def set_variables(ir, ic):
+            if isinstance(self.set_variables, list):
+                self.set_variables_default(variables, ir, ic,
+                                           self.set_variables, data)
+            else:
+                self.set_variables(variables, ir, ic, **data)
+
         states = nm.zeros((self.dim, self.dim), dtype=nm.object)
-        clist = []
-        for ir in range(self.dim):
-            for ic in range(self.dim):
-                if isinstance(self.set_variables, list):
-                    self.set_variables_default(variables, ir, ic,
-                                               self.set_variables, data)
-                else:
-                    self.set_variables(variables, ir, ic, **data)
+        clist = [(ir, ic) for ir in range(self.dim) for ic in range(self.dim)]
+        if self.can_solve_cases(problem):
+            for (ir, ic), state in zip(clist,
+                                       self.solve_cases(problem, clist,
+                                                        set_variables)):
+                states[ir,ic] = state.get_parts()
+
+        else:
+            for ir, ic in clist:
+                set_variables(ir, ic)
 
                 state = problem.solve(update_materials=False)
                 assert_(state.has_ebc())
                 states[ir,ic] = state.get_parts()
 
-                clist.append((ir, ic))
-
         corr_sol = CorrSolution(name=self.name,
                                 states=states,
                                 components=clist)
@@ -394,19 +453,27 @@ class CorrN(CorrMiniApp):
 
         variables = problem.get_variables()
 
-        states = nm.zeros((self.dim,), dtype=nm.object)
-        clist = []
-        for ir in range(self.dim):
+        def set_variables(ir):
             if isinstance(self.set_variables, list):
                 self.set_variables_default(variables, ir,
                                            self.set_variables, data)
             else:
                 self.set_variables(variables, ir, **data)
-            state = problem.solve()
-            assert_(state.has_ebc())
-            states[ir] = state.get_parts()
 
-            clist.append((ir,))
+        states = nm.zeros((self.dim,), dtype=nm.object)
+        clist = [(ir,) for ir in range(self.dim)]
+        if self.can_solve_cases(problem):
+            for (ir,), state in zip(clist,
+                                    self.solve_cases(problem, clist,
+                                                     set_variables)):
+                states[ir] = state.get_parts()
+
+        else:
+            for ir, in clist:
+                set_variables(ir)
+                state = problem.solve()
+                assert_(state.has_ebc())
+                states[ir] = state.get_parts()
 
         corr_sol = CorrSolution(name=self.name,
                                 states=states,
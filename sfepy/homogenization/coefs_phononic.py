@@ -129,7 +129,7 @@ def get_log_freqs(f0, f1, df, freq_eps, n_point_min, n_point_max):
     f_mid = 0.5 * (f0 + f1)
 
     if (f1 - f0) > (2.0 * freq_eps):
-        num = min(n_point_max, max(n_point_min, (f1 - f0) / df))
+        num = int(min(n_point_max, max(n_point_min, (f1 - f0) / df)))
         a = nm.linspace(0., 1., num)
         log_freqs = f0 + freq_eps \
                     + 0.5 * (nm.sin((a - 0.5) * nm.pi) + 1.0) \
@@ -141,6 +141,96 @@ def get_log_freqs(f0, f1, df, freq_eps, n_point_min, n_point_max):
 
     return log_freqs
 
+_sweep_callbacks = {}
+
+def _call_sweep_callback(args):
+    key, f = args
+    return _sweep_callbacks[key](f)
+
+class FrequencySweep(Struct):
+    """
+    Evaluate the band gap callbacks, see :func:`get_callback()`, for batches
+    of frequencies, optionally in parallel.
+
+    The frequencies are independent, so they are distributed among the
+    workers of a process or thread pool, if `n_process` is greater than 1.
+    The process pool workers inherit the callbacks, that need not be
+    pickleable, when forked, so the callbacks have to be given in the
+    constructor. The process pool is therefore always started by forking,
+    regardless of the default start method of :mod:`multiprocessing`. Where
+    forking is not available, a thread pool is used instead.
+
+    Parameters
+    ----------
+    callbacks : list of callables
+        The callbacks to evaluate.
+    n_process : int
+        The number of pool workers. If 1, no pool is used.
+    pool_kind : 'process' or 'thread'
+        The pool kind.
+    """
+
+    def __init__(self, callbacks, n_process=1, pool_kind='process'):
+        Struct.__init__(self, callbacks=callbacks, n_process=n_process,
+                        pool_kind=pool_kind, pool=None)
+
+        self.keys = {}
+        if n_process > 1:
+            for callback in callbacks:
+                key = (id(self), id(callback))
+                _sweep_callbacks[key] = callback
+                self.keys[id(callback)] = key
+
+            if pool_kind not in ('process', 'thread'):
+                raise ValueError('unknown pool kind! (%s)' % pool_kind)
+
+            if pool_kind == 'process':
+                import multiprocessing
+                try:
+                    ctx = multiprocessing.get_context('fork')
+
+                except ValueError:
+                    output('fork start method not available,'
+                           ' using thread pool!')
+                    self.pool_kind = 'thread'
+
+                else:
+                    self.pool = ctx.Pool(n_process)
+
+            if self.pool_kind == 'thread':
+                from multiprocessing.pool import ThreadPool
+                self.pool = ThreadPool(n_process)
+
+    def map(self, callback, freqs):
+        """
+        Evaluate `callback` for all frequencies in `freqs`.
+
+        Returns
+        -------
+        out : list
+            The list of callback results.
+        """
+        if self.pool is None:
+            return [callback(f) for f in freqs]
+
+        key = self.keys[id(callback)]
+        chunk_size = int(nm.ceil(len(freqs) / (4.0 * self.n_process)))
+        return self.pool.map(_call_sweep_callback,
+                             [(key, f) for f in freqs], max(chunk_size, 1))
+
+    def close(self):
+        """
+        Terminate the pool workers and unregister the callbacks.
+        """
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+        for key in self.keys.values():
+            _sweep_callbacks.pop(key, None)
+        self.keys = {}
+
 def detect_band_gaps(mass, freq_info, opts, gap_kind='normal', mtx_b=None):
     """
     Detect band gaps given solution to eigenproblem (eigs,
@@ -148,6 +238,11 @@ def detect_band_gaps(mass, freq_info, opts, gap_kind='normal', mtx_b=None):
     corresponding eigenmomenta are above a given threshold) are taken into
     account.
 
+    The mass matrix eigenvalues are traced in all the frequency intervals
+    at once, by a :class:`FrequencySweep` instance with `opts.n_process`
+    workers, that also evaluates concurrently the points of the brackets
+    in :func:`find_zero()`.
+
     Notes
     -----
     - make freq_eps relative to ]f0, f1[ size?
@@ -170,19 +265,43 @@ def detect_band_gaps(mass, freq_info, opts, gap_kind='normal', mtx_b=None):
     logs = [[] for ii in range(n_col + 1)]
     gaps = []
 
-    for ii in range(freq_info.freq_range.shape[0] + 1):
+    sweep = FrequencySweep([fz_callback, trace_callback],
+                           n_process=opts.n_process, pool_kind=opts.pool_kind)
+    try:
+        _detect_band_gaps(sweep, fz_callback, trace_callback, fm, df,
+                          opts, gap_kind, n_col, logs, gaps)
+
+    finally:
+        sweep.close()
+
+    kinds = describe_gaps(gaps)
+
+    slogs = Struct(freqs=logs[0], eigs=logs[1])
+    if n_col == 2:
+        slogs.eig_vectors = logs[2]
+
+    return slogs, gaps, kinds
+
+def _detect_band_gaps(sweep, fz_callback, trace_callback, fm, df, opts,
+                      gap_kind, n_col, logs, gaps):
+    all_log_freqs = [get_log_freqs(fm[ii], fm[ii+1], df, opts.freq_eps,
+                                   100, 1000)
+                     for ii in range(len(fm) - 1)]
+    all_traces = sweep.map(trace_callback, nm.concatenate(all_log_freqs))
+
+    i0 = 0
+    for ii, log_freqs in enumerate(all_log_freqs):
 
         f0, f1 = fm[[ii, ii+1]]
         output('interval: ]%.8f, %.8f[...' % (f0, f1))
 
-        log_freqs = get_log_freqs(f0, f1, df, opts.freq_eps, 100, 1000)
-
         output('n_logged: %d' % log_freqs.shape[0])
 
         log_mevp = [[] for ii in range(n_col)]
-        for f in log_freqs:
-            for ii, data in enumerate(trace_callback(f)):
+        for trace in all_traces[i0:i0 + len(log_freqs)]:
+            for ii, data in enumerate(trace):
                 log_mevp[ii].append(data)
+        i0 += len(log_freqs)
 
         # Get log for the first and last f in log_freqs.
         lf0 = log_freqs[0]
@@ -233,7 +352,8 @@ def detect_band_gaps(mass, freq_info, opts, gap_kind='normal', mtx_b=None):
                 # Insert fmin, fmax into log.
                 output('finding zero of the largest eig...')
                 smax, fmax, vmax = find_zero(lf0, lf1, fz_callback,
-                                             opts.freq_eps, opts.zero_eps, 1)
+                                             opts.freq_eps, opts.zero_eps, 1,
+                                             sweep=sweep)
                 im = nm.searchsorted(log_freqs, fmax)
                 llog_freqs.insert(im, fmax)
                 for ii, data in enumerate(trace_callback(fmax)):
@@ -245,7 +365,8 @@ def detect_band_gaps(mass, freq_info, opts, gap_kind='normal', mtx_b=None):
                     # having fmax instead of f0 does not work if freq_eps is
                     # large.
                     smin, fmin, vmin = find_zero(lf0, lf1, fz_callback,
-                                                 opts.freq_eps, opts.zero_eps, 0)
+                                                 opts.freq_eps, opts.zero_eps,
+                                                 0, sweep=sweep)
                     im = nm.searchsorted(log_freqs, fmin)
                     # +1 due to fmax already inserted before.
                     llog_freqs.insert(im+1, fmin)
@@ -273,14 +394,6 @@ def detect_band_gaps(mass, freq_info, opts, gap_kind='normal', mtx_b=None):
 
         output('...done')
 
-    kinds = describe_gaps(gaps)
-
-    slogs = Struct(freqs=logs[0], eigs=logs[1])
-    if n_col == 2:
-        slogs.eig_vectors = logs[2]
-
-    return slogs, gaps, kinds
-
 def get_callback(mass, method, mtx_b=None, mode='trace'):
     """
     Return callback to solve band gaps or dispersion eigenproblem P.
@@ -324,12 +437,16 @@ def get_callback(mass, method, mtx_b=None, mode='trace'):
 
     return eval(mode + '_callback')
 
-def find_zero(f0, f1, callback, freq_eps, zero_eps, mode):
+def find_zero(f0, f1, callback, freq_eps, zero_eps, mode, sweep=None):
     """
     For f \in ]f0, f1[ find frequency f for which either the smallest (`mode` =
     0) or the largest (`mode` = 1) eigenvalue of problem P given by `callback`
     is zero.
 
+    If a :class:`FrequencySweep` instance `sweep` with `n` workers is given,
+    the bisection is replaced by the multisection: the bracket is split by
+    `n` points evaluated concurrently in each iteration.
+
     Returns
     -------
     flag : 0, 1, or 2
@@ -353,39 +470,58 @@ def find_zero(f0, f1, callback, freq_eps, zero_eps, mode):
     1       2       f -> f0, largest eigenvalue > 0
     =====  ======  ========
     """
+    n_point = 1 if sweep is None else sweep.n_process
+
     fm, fp = f0, f1
     ieig = {0 : 0, 1 : -1}[mode]
     while 1:
-        f = 0.5 * (fm + fp)
-        meigs = callback(f)
+        if n_point == 1:
+            fs = [0.5 * (fm + fp)]
+            vals = [callback(fs[0])[ieig]]
 
-        val = meigs[ieig]
-        ## print f, f0, f1, fm, fp, val
-        ## print '%.16e' % f, '%.16e' % fm, '%.16e' % fp, '%.16e' % val
+        else:
+            fs = fm + (fp - fm) * nm.arange(1, n_point + 1) / (n_point + 1.0)
+            vals = [meigs[ieig] for meigs in sweep.map(callback, fs)]
 
-        if ((abs(val) < zero_eps)
-            or ((fp - fm) < (abs(fm) * nm.finfo(float).eps))):
-            return 0, f, val
+        # The first point with a positive value bounds the zero from above.
+        ip = n_point
+        for ii, val in enumerate(vals):
+            if val > 0.0:
+                ip = ii
+                break
 
-        if mode == 0:
-            if (f - f0) < freq_eps:
-                return 2, f0, val
+        # Check the new bracket ends.
+        for ii in [ip - 1, ip]:
+            if not (0 <= ii < n_point):
+                continue
 
-            elif (f1 - f) < freq_eps:
-                return 1, f1, val
+            f, val = fs[ii], vals[ii]
+            ## print f, f0, f1, fm, fp, val
+            ## print '%.16e' % f, '%.16e' % fm, '%.16e' % fp, '%.16e' % val
 
-        elif mode == 1:
-            if (f1 - f) < freq_eps:
-                return 1, f1, val
+            if ((abs(val) < zero_eps)
+                or ((fp - fm) < (abs(fm) * nm.finfo(float).eps))):
+                return 0, f, val
 
-            elif (f - f0) < freq_eps:
-                return 2, f0, val
+            if mode == 0:
+                if (f - f0) < freq_eps:
+                    return 2, f0, val
 
-        if val > 0.0:
-            fp = f
+                elif (f1 - f) < freq_eps:
+                    return 1, f1, val
 
-        else:
-            fm = f
+            elif mode == 1:
+                if (f1 - f) < freq_eps:
+                    return 1, f1, val
+
+                elif (f - f0) < freq_eps:
+                    return 2, f0, val
+
+        if ip < n_point:
+            fp = fs[ip]
+
+        if ip > 0:
+            fm = fs[ip - 1]
 
 def describe_gaps(gaps):
     kinds = []
@@ -963,6 +1099,11 @@ class BandGaps(MiniAppBase):
         If not None, the band gaps log is to be saved under the given name.
     raw_log_save_name : str
         If not None, the raw band gaps log is to be saved under the given name.
+    n_process : int
+        The number of workers evaluating the mass matrix eigenvalues for
+        different frequencies in parallel, see :class:`FrequencySweep`.
+    pool_kind : 'process' or 'thread'
+        The kind of the worker pool used if `n_process` is greater than 1.
     """
 
     def process_options(self):
@@ -985,7 +1126,9 @@ class BandGaps(MiniAppBase):
                       zero_eps=get('zero_eps', 1e-8),
                       detect_fun=get('detect_fun', detect_band_gaps),
                       log_save_name=get('log_save_name', None),
-                      raw_log_save_name=get('raw_log_save_name', None))
+                      raw_log_save_name=get('raw_log_save_name', None),
+                      n_process=get('n_process', 1),
+                      pool_kind=get('pool_kind', 'process'))
 
     def __call__(self, volume=None, problem=None, data=None):
         problem = get_default(problem, self.problem)
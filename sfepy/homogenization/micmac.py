@@ -12,6 +12,18 @@ import sfepy.base.multiproc as multi
 import os.path as op
 import six
 
+def _repeat_in_qps(val, n_qp):
+    """
+    Repeat a coefficient value in `n_qp` quadrature points. Values with up to
+    two dimensions are broadcast, i.e. not copied.
+    """
+    if nm.ndim(val) <= 2:
+        val = nm.array(val, dtype=nm.float64, ndmin=3)
+        return nm.broadcast_to(val, (n_qp,) + val.shape[1:])
+
+    else:
+        return nm.tile(val, (n_qp, 1, 1))
+
 def get_homog_coefs_linear(ts, coor, mode,
                            micro_filename=None, regenerate=False,
                            coefs_filename=None, define_args=None):
@@ -56,12 +68,12 @@ def get_homog_coefs_linear(ts, coor, mode,
     elif mode == 'qp':
         for key, val in six.iteritems(coefs.__dict__):
             if type( val ) == nm.ndarray or type(val) == nm.float64:
-                out[key] = nm.tile( val, (coor.shape[0], 1, 1) )
+                out[key] = _repeat_in_qps(val, coor.shape[0])
             elif type(val) == dict:
                 for key2, val2 in six.iteritems(val):
                     if type(val2) == nm.ndarray or type(val2) == nm.float64:
-                        out[key+'_'+key2] = \
-                                          nm.tile(val2, (coor.shape[0], 1, 1))
+                        out[key+'_'+key2] = _repeat_in_qps(val2,
+                                                           coor.shape[0])
 
     else:
         out = None
@@ -1,11 +1,15 @@
 """Some sparse matrix utilities missing in scipy."""
 from __future__ import absolute_import
+import itertools
+
 import numpy as nm
 import scipy.sparse as sp
 
 from sfepy.base.base import assert_
 from six.moves import range
 
+_matrix_generations = itertools.count(1)
+
 def save_sparse_txt(filename, mtx, fmt='%d %d %f\n'):
     """Save a CSR/CSC sparse matrix into a text file"""
     fd = open(filename, 'w')
@@ -246,3 +250,187 @@ def infinity_norm(mtx):
         norm = nm.dot(nm.abs(mtx), ones).max()
 
     return norm
+
+def set_matrix_generations(mtx):
+    """
+    Mark new values of a sparse matrix `mtx` by attaching new generation
+    counters to it.
+
+    The counters are stored in the `generations` attribute as a tuple
+    `(structure, values)`. The values generation is new in each call, the
+    structure generation is kept if the `indptr` and `indices` arrays of
+    `mtx` are the same objects as in the previous call.
+
+    Parameters
+    ----------
+    mtx : spmatrix
+        The sparse matrix, whose values have just been (re)computed.
+
+    Returns
+    -------
+    generations : tuple
+        The new generation counters.
+    """
+    gen = next(_matrix_generations)
+
+    structure = getattr(mtx, '_generation_structure', None)
+    generations = getattr(mtx, 'generations', None)
+    if ((generations is None) or (structure is None)
+        or (structure[0] is not mtx.indptr)
+        or (structure[1] is not mtx.indices)):
+        mtx._generation_structure = (mtx.indptr, mtx.indices)
+        generations = (gen, gen)
+
+    else:
+        generations = (generations[0], gen)
+
+    mtx.generations = generations
+
+    return generations
+
+def get_matrix_generations(mtx):
+    """
+    Get the generation counters of a sparse matrix `mtx` set by
+    :func:`set_matrix_generations()`.
+
+    Returns
+    -------
+    generations : tuple or None
+        The generation counters `(structure, values)`, or None, if the
+        matrix has no counters or its sparsity pattern arrays were replaced
+        since the counters were set.
+    """
+    generations = getattr(mtx, 'generations', None)
+    if generations is None:
+        return None
+
+    structure = mtx._generation_structure
+    if (structure[0] is not mtx.indptr) or (structure[1] is not mtx.indices):
+        return None
+
+    return generations
+
+class SymmetricCSRMatrix(sp.csr_matrix):
+    """
+    Symmetric sparse matrix in the CSR format that stores only its upper
+    triangle, including the diagonal.
+
+    The products with vectors, dense matrices and other sparse matrices use
+    the whole symmetric matrix, and the matrix is its own transpose. The
+    indexing, the conversions to other formats and the other arithmetic
+    operations are applied to the whole matrix, see
+    :func:`SymmetricCSRMatrix.get_full()`, and return plain sparse
+    matrices. The multiplication by a scalar, :func:`copy()`,
+    :func:`astype()`, :func:`diagonal()` and :func:`tocsr()` keep the upper
+    triangle storage. Use :func:`SymmetricCSRMatrix.get_upper()` to access
+    the stored upper triangle.
+    """
+
+    @staticmethod
+    def from_full(mtx):
+        """
+        Create the symmetric matrix from the upper triangle of a full
+        (symmetric) sparse matrix `mtx`.
+        """
+        upper = sp.triu(mtx, format='csr')
+        upper.sort_indices()
+        return SymmetricCSRMatrix((upper.data, upper.indices, upper.indptr),
+                                  shape=upper.shape)
+
+    def get_upper(self):
+        """
+        Return the stored upper triangle as a plain CSR matrix sharing the
+        data arrays.
+        """
+        return sp.csr_matrix((self.data, self.indices, self.indptr),
+                             shape=self.shape, copy=False)
+
+    def get_full(self):
+        """
+        Return the whole symmetric matrix as a plain CSR matrix.
+
+        The result is cached using the matrix generation counters, see
+        :func:`set_matrix_generations()`, and inherits them, so that
+        repeated calls for unchanged values return the same object.
+        """
+        generations = get_matrix_generations(self)
+        cached = getattr(self, '_full', None)
+        if ((generations is not None) and (cached is not None)
+            and (cached[0] == generations)):
+            return cached[1]
+
+        upper = self.get_upper()
+        full = (upper + sp.tril(upper.T, k=-1, format='csr')).tocsr()
+        full.sort_indices()
+
+        if generations is not None:
+            full.generations = generations
+            full._generation_structure = (full.indptr, full.indices)
+
+        self._full = (generations, full)
+
+        return full
+
+    def get_full_graph(self):
+        """
+        Return a plain CSR matrix with the sparsity pattern of the whole
+        symmetric matrix and zero data.
+        """
+        upper = self.get_upper().copy()
+        upper.data = nm.ones_like(upper.data)
+        graph = (upper + upper.T).tocsr()
+        graph.sort_indices()
+        graph.data[:] = 0.0
+
+        return graph
+
+    def _mul_vector(self, other):
+        upper = self.get_upper()
+        out = upper * other + upper.T * other
+        out -= self.diagonal() * other
+        return out
+
+    def _mul_multivector(self, other):
+        upper = self.get_upper()
+        out = upper * other + upper.T * other
+        out -= self.diagonal()[:, None] * other
+        return out
+
+    def _mul_sparse_matrix(self, other):
+        return self.get_full() * other
+
+    _matmul_vector = _mul_vector
+    _matmul_multivector = _mul_multivector
+    _matmul_sparse = _mul_sparse_matrix
+
+    def transpose(self, axes=None, copy=False):
+        if axes is not None:
+            raise ValueError('sparse matrices do not support an "axes"'
+                             ' parameter!')
+        return self.copy() if copy else self
+
+def _make_full_method(name):
+    def method(self, *args, **kwargs):
+        return getattr(self.get_full(), name)(*args, **kwargs)
+
+    method.__name__ = name
+    method.__doc__ = getattr(sp.csr_matrix, name).__doc__
+    return method
+
+for _name in ['__getitem__', '__add__', '__radd__', '__sub__', '__rsub__',
+              '__neg__', '__abs__', 'multiply', 'maximum', 'minimum', 'power',
+              'sum', 'mean', 'max', 'min', 'nonzero', 'count_nonzero',
+              'getrow', 'getcol', 'toarray', 'todense', 'tocoo', 'tocsc',
+              'tolil', 'todok', 'tobsr', 'todia']:
+    setattr(SymmetricCSRMatrix, _name, _make_full_method(_name))
+del _name
+
+def get_full_matrix(mtx):
+    """
+    Return the whole matrix, if `mtx` is a :class:`SymmetricCSRMatrix`,
+    otherwise return `mtx` unchanged.
+    """
+    if isinstance(mtx, SymmetricCSRMatrix):
+        mtx = mtx.get_full()
+
+    return mtx
@@ -343,6 +343,52 @@ def insert_strided_axis(ar, axis, length):
     out = as_strided(ar, shape=shape, strides=strides)
     return out
 
+def broadcast_to_cells(ar, shape):
+    """
+    Broadcast an array to the cell-level shape `shape` = (n_el, n_qp,
+    n_row, n_col) using numpy stride tricks, without copying data along the
+    cell axis.
+
+    Parameters
+    ----------
+    ar : array
+        The input array broadcastable to `shape`, e.g. with the shape (1, 1,
+        n_row, n_col) for constant data, (n_el, 1, n_row, n_col) for
+        per-cell data or (1, n_qp, n_row, n_col) for data varying only in
+        quadrature points. Missing leading axes are added.
+
+    Returns
+    -------
+    out : array
+        The array of the shape `shape`. If `ar` already has that shape, it
+        is returned as it is. If `ar` is constant along the cell axis, `out`
+        is a read-only view with the zero cell stride of a single
+        C-contiguous cell, that can be passed to the C term functions
+        without a copy. Otherwise, `out` is a read-only broadcast view of
+        `ar`.
+
+    Examples
+    --------
+    >>> import numpy as nm
+    >>> from sfepy.linalg import broadcast_to_cells
+    >>> mtx = nm.eye(3)
+    >>> out = broadcast_to_cells(mtx, (1000, 4, 3, 3))
+    >>> out.shape, out.strides
+    ((1000, 4, 3, 3), (0, 72, 24, 8))
+    """
+    ar = nm.asarray(ar)
+    shape = tuple(shape)
+    if ar.shape == shape:
+        return ar
+
+    ar = ar.reshape((1,) * (len(shape) - ar.ndim) + ar.shape)
+    if (ar.shape[0] == 1) and (shape[0] != 1):
+        cell = nm.ascontiguousarray(nm.broadcast_to(ar[0], shape[1:]))
+        ar = cell[None, ...]
+
+    out = nm.broadcast_to(ar, shape)
+    return out
+
 def dot_sequences(mtx, vec, mode='AB'):
     """
     Computes dot product for each pair of items in the two sequences.
@@ -58,6 +58,7 @@ class SchroedingerApp(PDESolverApp):
     def __init__(self, conf, options, output_prefix, **kwargs):
         PDESolverApp.__init__(self, conf, options, output_prefix,
                               init_equations=False)
+        self.eig = None
 
     def setup_options(self):
         PDESolverApp.setup_options(self)
@@ -120,7 +121,7 @@ class SchroedingerApp(PDESolverApp):
         n_eigs = get_default(opts.n_eigs, mtx_a.shape[0])
 
         output('computing resonance frequencies...')
-        eig = Solver.any_from_conf(pb.get_solver_conf(opts.eigen_solver))
+        eig = self.get_eigen_solver()
         eigs, mtx_s_phi = eig(mtx_a, mtx_b, n_eigs, eigenvectors=True)
         output('...done')
 
@@ -175,6 +176,23 @@ class SchroedingerApp(PDESolverApp):
 
         return Struct(pb=pb, eigs=eigs, mtx_phi=mtx_phi)
 
+    def get_eigen_solver(self):
+        """
+        Get the eigenvalue solver given by the 'eigen_solver' option.
+
+        The solver instance is created only once, so that the solvers with
+        the `warm_start` option, e.g. 'eig.scipy_lobpcg' or 'eig.scipy', can
+        use the eigenvectors and the mass matrix factorization of the
+        previous solve in repeated calls of :func:`solve_eigen_problem()`,
+        e.g. in self-consistent iterations with a slowly changing potential.
+        """
+        name = self.app_options.eigen_solver
+        if (self.eig is None) or (self.eig.conf.name != name):
+            conf = self.problem.get_solver_conf(name)
+            self.eig = Solver.any_from_conf(conf)
+
+        return self.eig
+
     def make_full(self, mtx_s_phi):
         variables = self.problem.get_variables()
 
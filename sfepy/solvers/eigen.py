@@ -4,6 +4,7 @@ import time
 import numpy as nm
 
 from sfepy.base.base import output, get_default, try_imports, Struct
+from sfepy.linalg.sparse import get_full_matrix
 from sfepy.solvers.solvers import SolverMeta, Solver, EigenvalueSolver
 from six.moves import range
 
@@ -37,6 +38,10 @@ def standard_call(call):
         mtx_a = get_default(mtx_a, self.mtx_a)
         mtx_b = get_default(mtx_b, self.mtx_b)
         n_eigs = get_default(n_eigs, self.n_eigs)
+
+        # The matrices with the upper triangle storage are expanded.
+        mtx_a = get_full_matrix(mtx_a)
+        mtx_b = get_full_matrix(mtx_b)
         eigenvectors = get_default(eigenvectors, self.eigenvectors)
         status = get_default(status, self.status)
 
@@ -71,6 +76,13 @@ class ScipyEigenvalueSolver(EigenvalueSolver):
          """Which eigenvectors and eigenvalues to find,
             see :func:`scipy.sparse.linalg.eigs()`
             or :func:`scipy.sparse.linalg.eigsh()`."""),
+        ('warm_start', 'bool', False, False,
+         """For sparse problems, if True, start the iterations from the sum
+            of the eigenvectors of the previous call, and reuse the
+            factorization of `mtx_b` of the previous call, if `mtx_b` has not
+            changed and the shift-invert mode (the `sigma` parameter) is not
+            used. Useful for sequences of similar problems, e.g. in
+            self-consistent iterations."""),
         ('*', '*', None, False,
          'Additional parameters supported by the method.'),
     ]
@@ -85,11 +97,53 @@ class ScipyEigenvalueSolver(EigenvalueSolver):
                           'cannot import scipy sparse eigenvalue solvers!')
         self.ssla = aux['ssla']
 
+        self.vecs0 = None
+        self.minv = None
+        self.mtx_b_digest = None
+
+    def get_minv(self, mtx_b):
+        """
+        Get the operator of the inverse of `mtx_b`, reusing the
+        factorization of the previous call if `mtx_b` has the same values.
+
+        The values are compared using the matrix generation counters, see
+        :func:`sfepy.linalg.sparse.set_matrix_generations()`, or, for
+        matrices without the counters, the hash of the matrix arrays.
+        """
+        import scipy.sparse as sps
+        from sfepy.solvers.ls import _get_matrix_digest
+
+        if not (sps.isspmatrix_csr(mtx_b) or sps.isspmatrix_csc(mtx_b)):
+            mtx_b = sps.csr_matrix(mtx_b)
+
+        digest = (mtx_b.shape, mtx_b.format, _get_matrix_digest(mtx_b))
+        if digest != self.mtx_b_digest:
+            solve = self.ssla.factorized(mtx_b.tocsc())
+            self.minv = self.ssla.LinearOperator(mtx_b.shape, matvec=solve,
+                                                 dtype=mtx_b.dtype)
+            self.mtx_b_digest = digest
+
+        return self.minv
+
     @standard_call
     def __call__(self, mtx_a, mtx_b=None, n_eigs=None, eigenvectors=None,
                  status=None, conf=None):
         kwargs = self.build_solver_kwargs(conf)
 
+        if (n_eigs is not None) and conf.warm_start:
+            if ((self.vecs0 is not None)
+                and (self.vecs0.shape[0] == mtx_a.shape[0])):
+                kwargs.setdefault('v0', self.vecs0.sum(axis=1))
+
+            if ((mtx_b is not None) and (kwargs.get('sigma') is None)
+                and hasattr(mtx_b, 'tocsc')):
+                kwargs.setdefault('Minv', self.get_minv(mtx_b))
+
+            eigenvectors0, eigenvectors = eigenvectors, True
+
+        else:
+            eigenvectors0 = eigenvectors
+
         if n_eigs is None:
             mtx_a, mtx_b = self._to_array(mtx_a, mtx_b)
             if conf.method == 'eig':
@@ -116,6 +170,11 @@ class ScipyEigenvalueSolver(EigenvalueSolver):
             mtx_ev = out[1][:, ii]
             out = (eigs[ii], mtx_ev)
 
+            if (n_eigs is not None) and conf.warm_start:
+                self.vecs0 = mtx_ev
+                if not eigenvectors0:
+                    out = out[0]
+
         else:
             out = eigs[ii]
 
@@ -183,6 +242,239 @@ class ScipySGEigenvalueSolver(EigenvalueSolver):
 
         return out
 
+def solve_eigen_slice(args):
+    """
+    Find all eigenpairs of the generalized symmetric eigenvalue problem with
+    eigenvalues in the interval `[lo, hi)` by the shift-invert Lanczos method.
+
+    The shift is in the middle of the interval. The number of computed
+    eigenpairs starts at `n_eigs` and is doubled until an eigenvalue outside
+    of the interval is found, i.e., until all the eigenvalues in the
+    interval are found. The interval is widened by the relative tolerance
+    `eps` on both sides, so that the eigenvalues on its boundaries are not
+    lost due to round-off errors - the eigenpairs found also in a
+    neighbouring slice have to be removed by the caller.
+
+    The factorization of the shifted matrix is done only once, using the
+    global factorization cache, see :mod:`sfepy.solvers.factorization_cache`.
+    Note that when the slices are solved by a pool of processes, each worker
+    process has its own cache, so the factorizations are not shared between
+    the processes and are lost when the pool is closed.
+
+    Parameters
+    ----------
+    args : tuple
+        The tuple `(mtx_a, mtx_b, lo, hi, eps, n_eigs, kwargs)`, where
+        `kwargs` are passed to :func:`scipy.sparse.linalg.eigsh()`.
+
+    Returns
+    -------
+    eigs : array
+        The eigenvalues in the interval.
+    vecs : array
+        The corresponding eigenvectors.
+    """
+    import scipy.sparse as sps
+    import scipy.sparse.linalg as ssla
+    from sfepy.solvers.factorization_cache import get_cached_factorization
+    from sfepy.solvers.ls import _get_matrix_digest
+
+    mtx_a, mtx_b, lo, hi, eps, n_eigs, kwargs = args
+
+    n_dof = mtx_a.shape[0]
+    sigma = 0.5 * (lo + hi)
+    lo = lo - eps * max(1.0, abs(lo))
+    hi = hi + eps * max(1.0, abs(hi))
+    radius = max(sigma - lo, hi - sigma)
+
+    if mtx_b is None:
+        mtx_s = mtx_a - sigma * sps.eye(n_dof, format='csr')
+        digest_b = None
+
+    else:
+        mtx_s = mtx_a - sigma * mtx_b
+        digest_b = _get_matrix_digest(mtx_b)
+
+    key = ('eig.scipy_slice', mtx_a.shape, _get_matrix_digest(mtx_a),
+           digest_b, sigma)
+    solve = get_cached_factorization(
+        key, mtx_s, lambda mtx: ssla.factorized(mtx.tocsc()))
+    op = ssla.LinearOperator(mtx_s.shape, matvec=solve, dtype=mtx_s.dtype)
+
+    n_eigs = min(n_eigs, n_dof - 1)
+    while 1:
+        eigs, vecs = ssla.eigsh(mtx_a, M=mtx_b, k=n_eigs, sigma=sigma,
+                                OPinv=op, which='LM', **kwargs)
+        if ((nm.abs(eigs - sigma).max() > radius)
+            or (n_eigs == (n_dof - 1))):
+            break
+
+        n_eigs = min(2 * n_eigs, n_dof - 1)
+
+    ii = (eigs >= lo) & (eigs <= hi)
+
+    return eigs[ii], vecs[:, ii]
+
+class ScipySliceEigenvalueSolver(EigenvalueSolver):
+    """
+    SciPy-based spectrum slicing solver for sparse symmetric problems.
+
+    Finds all eigenvalues in a window and the corresponding eigenvectors. The
+    window is split into slices and the eigenpairs in each slice are found by
+    the shift-invert Lanczos method with its own matrix factorization, see
+    :func:`solve_eigen_slice()`. The slices can be solved in parallel by a
+    pool of processes. The results are merged and the duplicate eigenpairs
+    found in neighbouring slices are removed.
+
+    The factorizations are stored in the factorization cache of the process
+    solving the slice. With `n_process` greater than 1, they are therefore
+    not reused between the slices, nor between the solver calls.
+
+    If `n_eigs` is given, only the `n_eigs` smallest eigenvalues in the
+    window are returned.
+    """
+    name = 'eig.scipy_slice'
+
+    __metaclass__ = SolverMeta
+
+    _parameters = [
+        ('window', 'sequence of float', None, True,
+         """The eigenvalue window `(min, max)`, or the boundaries of all
+            the slices."""),
+        ('n_slice', 'int', 4, False,
+         """The number of equal slices the window `(min, max)` is split
+            into."""),
+        ('n_eigs_slice', 'int', 10, False,
+         """The initial number of eigenvalues computed in a slice. It is
+            doubled until all the eigenvalues in the slice are found."""),
+        ('n_process', 'int', 1, False,
+         """The number of processes solving the slices. If greater than 1,
+            a :mod:`multiprocessing` pool is used."""),
+        ('eps_dup', 'float', 1e-8, False,
+         """The relative tolerance by which the slices overlap, used also
+            for detecting the duplicate eigenvalues of neighbouring slices.
+            The duplicates need also the same eigenvectors."""),
+        ('*', '*', None, False,
+         """Additional parameters supported by
+            :func:`scipy.sparse.linalg.eigsh()`."""),
+    ]
+
+    def get_slices(self, conf):
+        """
+        Get the boundaries of the slices.
+        """
+        window = nm.asarray(conf.window, dtype=nm.float64)
+        if len(window) == 2:
+            window = nm.linspace(window[0], window[1], conf.n_slice + 1)
+
+        return window
+
+    def remove_duplicates(self, eigs, vecs, islices, mtx_b, eps):
+        """
+        Remove the eigenpairs from different slices with the same
+        eigenvalues (up to the relative tolerance `eps`) and eigenvectors.
+        The input has to be sorted by the eigenvalues.
+
+        An eigenvector is a duplicate, if it lies in the span of the already
+        kept eigenvectors with the same eigenvalue, some of which come from
+        other slices. This handles also multiple eigenvalues, whose
+        eigenvectors computed in different slices can be different bases of
+        the same eigenspace. The kept eigenvectors of such eigenvalues are
+        B-orthonormalized against the eigenvectors from the other slices.
+        """
+        bvecs = vecs.copy() if mtx_b is None else mtx_b * vecs
+
+        keep = nm.ones(len(eigs), dtype=bool)
+        for ii in range(1, len(eigs)):
+            tol = eps * max(1.0, abs(eigs[ii]))
+            close = []
+            for ij in range(ii - 1, -1, -1):
+                if (eigs[ii] - eigs[ij]) > tol:
+                    break
+
+                if keep[ij]:
+                    close.append(ij)
+
+            if not close or (islices[close] == islices[ii]).all():
+                continue
+
+            # The B-orthogonal projection to the span of the close vectors.
+            gram = nm.dot(vecs[:, close].T.conj(), bvecs[:, close])
+            coefs = nm.linalg.solve(gram, nm.dot(bvecs[:, close].T.conj(),
+                                                 vecs[:, ii]))
+            res = vecs[:, ii] - nm.dot(vecs[:, close], coefs)
+            bres = bvecs[:, ii] - nm.dot(bvecs[:, close], coefs)
+            norm2 = abs(nm.vdot(res, bres))
+            if norm2 < 0.25:
+                keep[ii] = False
+
+            else:
+                # Keep the eigenvectors of a multiple eigenvalue
+                # B-orthonormal.
+                vecs[:, ii] = res / nm.sqrt(norm2)
+                bvecs[:, ii] = bres / nm.sqrt(norm2)
+
+        return eigs[keep], vecs[:, keep]
+
+    @standard_call
+    def __call__(self, mtx_a, mtx_b=None, n_eigs=None, eigenvectors=None,
+                 status=None, conf=None):
+        import scipy.sparse as sps
+
+        kwargs = self.build_solver_kwargs(conf)
+
+        mtx_a = sps.csr_matrix(mtx_a)
+        if mtx_b is not None:
+            mtx_b = sps.csr_matrix(mtx_b)
+
+        slices = self.get_slices(conf)
+        n_slice = len(slices) - 1
+        args = [(mtx_a, mtx_b, slices[ii], slices[ii + 1], conf.eps_dup,
+                 conf.n_eigs_slice, kwargs)
+                for ii in range(n_slice)]
+
+        if (conf.n_process > 1) and (n_slice > 1):
+            import multiprocessing
+
+            pool = multiprocessing.Pool(min(conf.n_process, n_slice))
+            try:
+                results = pool.map(solve_eigen_slice, args)
+
+            finally:
+                pool.close()
+                pool.join()
+
+        else:
+            results = [solve_eigen_slice(arg) for arg in args]
+
+        eigs = nm.concatenate([res[0] for res in results])
+        vecs = nm.concatenate([res[1] for res in results], axis=1)
+        islices = nm.concatenate([[ii] * len(res[0])
+                                  for ii, res in enumerate(results)])
+
+        ii = nm.argsort(eigs, kind='mergesort')
+        n_found = len(eigs)
+        eigs, vecs = self.remove_duplicates(eigs[ii], vecs[:, ii],
+                                            islices[ii], mtx_b, conf.eps_dup)
+        output('%d eigenvalues in %d slices, %d duplicates removed'
+               % (len(eigs), n_slice, n_found - len(eigs)),
+               verbose=conf.verbose)
+
+        if status is not None:
+            status['n_slice'] = n_slice
+            status['n_dup'] = n_found - len(eigs)
+
+        if n_eigs is not None:
+            eigs, vecs = eigs[:n_eigs], vecs[:, :n_eigs]
+
+        if eigenvectors:
+            out = (eigs, vecs)
+
+        else:
+            out = eigs
+
+        return out
+
 class LOBPCGEigenvalueSolver(EigenvalueSolver):
     """
     SciPy-based LOBPCG solver for sparse symmetric problems.
@@ -201,6 +493,10 @@ class LOBPCGEigenvalueSolver(EigenvalueSolver):
         ('precond', '{dense matrix, sparse matrix, LinearOperator}',
          None, False,
          'The preconditioner.'),
+        ('warm_start', 'bool', False, False,
+         """If True, use the eigenvectors of the previous call as the initial
+            approximation, if their shape matches. Useful for sequences of
+            similar problems, e.g. in self-consistent iterations."""),
     ]
 
     def __init__(self, conf, **kwargs):
@@ -209,6 +505,8 @@ class LOBPCGEigenvalueSolver(EigenvalueSolver):
         from scipy.sparse.linalg.eigen import lobpcg
         self.lobpcg = lobpcg
 
+        self.vecs0 = None
+
     @standard_call
     def __call__(self, mtx_a, mtx_b=None, n_eigs=None, eigenvectors=None,
                  status=None, conf=None):
@@ -218,8 +516,14 @@ class LOBPCGEigenvalueSolver(EigenvalueSolver):
         else:
             n_eigs = min(n_eigs, mtx_a.shape[0])
 
-        x = nm.zeros((mtx_a.shape[0], n_eigs), dtype=nm.float64)
-        x[:n_eigs] = nm.eye(n_eigs, dtype=nm.float64)
+        shape = (mtx_a.shape[0], n_eigs)
+        if (conf.warm_start and (self.vecs0 is not None)
+            and (self.vecs0.shape == shape)):
+            x = self.vecs0
+
+        else:
+            x = nm.zeros(shape, dtype=nm.float64)
+            x[:n_eigs] = nm.eye(n_eigs, dtype=nm.float64)
 
         out = self.lobpcg(mtx_a, x, mtx_b,
                           M=conf.precond,
@@ -227,6 +531,9 @@ class LOBPCGEigenvalueSolver(EigenvalueSolver):
                           largest=conf.largest,
                           verbosityLevel=conf.verbose)
 
+        if conf.warm_start:
+            self.vecs0 = out[1]
+
         if not eigenvectors:
             out = out[0]
 
@@ -0,0 +1,145 @@
+"""
+Process-wide cache of matrix factorizations.
+
+The direct linear solvers keep the factorization of the last matrix only, so
+alternating between several matrices, e.g. in the subproblems of a
+multi-problem solver, or between several problems in a parameter sweep,
+leads to repeated factorizations of the same matrices. The global
+:data:`factorization_cache` shared by the direct solvers in
+:mod:`sfepy.solvers.ls` stores the factorizations under the matrix
+versions, see :func:`set_matrix_generations()
+<sfepy.linalg.sparse.set_matrix_generations()>`, or under the hashes of the
+matrix arrays.
+
+The cache is controlled by the 'factorization_cache_size' global option
+(see :mod:`sfepy.base.goptions`) - the maximum memory in MB taken by the
+cached factorizations; 0 disables the cache. The least recently used
+factorizations are evicted when the memory budget is exceeded.
+"""
+from __future__ import absolute_import
+from collections import OrderedDict
+
+from sfepy.base.base import get_default, goptions
+
+def get_factorization_size(factor, mtx):
+    """
+    Estimate the memory in bytes taken by the factorization `factor` of the
+    sparse matrix `mtx`.
+
+    The size is known for the SuperLU factorizations and their solve
+    methods. For other factorizations, the size of `mtx` is used as the lower
+    estimate.
+    """
+    lu = getattr(factor, '__self__', factor)
+    nnz = getattr(lu, 'nnz', None)
+    if isinstance(nnz, int) and hasattr(lu, 'perm_r'):
+        return nnz * (mtx.dtype.itemsize + mtx.indices.dtype.itemsize)
+
+    return mtx.data.nbytes + mtx.indices.nbytes + mtx.indptr.nbytes
+
+class FactorizationCache(object):
+    """
+    Least recently used cache of matrix factorizations.
+
+    Parameters
+    ----------
+    max_mem : float
+        The maximum memory in MB taken by the cached factorizations. The
+        least recently used factorizations are evicted if it is exceeded.
+    """
+
+    def __init__(self, max_mem=0):
+        self.max_mem = max_mem
+        self.clear()
+
+    def clear(self):
+        """
+        Clear the cache and the statistics.
+        """
+        self.factors = OrderedDict()
+        self.mem = 0
+        self.stats = {'hits' : 0, 'misses' : 0, 'evictions' : 0}
+
+    def get(self, key):
+        """
+        Get the factorization stored under `key`, or None if it is not in
+        the cache.
+        """
+        item = self.factors.pop(key, None)
+        if item is None:
+            self.stats['misses'] += 1
+            return None
+
+        self.factors[key] = item
+        self.stats['hits'] += 1
+
+        return item[0]
+
+    def put(self, key, factor, size):
+        """
+        Store the factorization `factor` taking `size` bytes under `key`.
+        """
+        if key in self.factors:
+            self.mem -= self.factors.pop(key)[1]
+
+        max_size = self.max_mem * 1024**2
+        if size > max_size:
+            return
+
+        self.factors[key] = (factor, size)
+        self.mem += size
+        while self.mem > max_size:
+            _, (_, old_size) = self.factors.popitem(last=False)
+            self.mem -= old_size
+            self.stats['evictions'] += 1
+
+factorization_cache = FactorizationCache()
+
+def get_factorization_cache():
+    """
+    Get the global :data:`factorization_cache` with the memory budget given
+    by the 'factorization_cache_size' global option, or None if the option
+    is 0.
+    """
+    factorization_cache.max_mem = goptions['factorization_cache_size']
+    if factorization_cache.max_mem == 0:
+        return None
+
+    return factorization_cache
+
+def get_cached_factorization(key, mtx, factorize, get_size=None):
+    """
+    Get the factorization of the matrix `mtx` from the global cache, or
+    compute it by calling `factorize(mtx)` and store it in the cache.
+
+    Parameters
+    ----------
+    key : hashable
+        The key identifying the matrix version and the factorization kind.
+        If None, or if the cache is disabled, the matrix is always
+        factorized.
+    mtx : spmatrix
+        The matrix.
+    factorize : callable
+        The function returning the factorization of `mtx`.
+    get_size : callable, optional
+        The function returning the memory in bytes taken by the
+        factorization, called as `get_size(factor, mtx)`. By default,
+        :func:`get_factorization_size()` is used.
+
+    Returns
+    -------
+    factor : object
+        The factorization.
+    """
+    cache = get_factorization_cache()
+    if (cache is None) or (key is None):
+        return factorize(mtx)
+
+    factor = cache.get(key)
+    if factor is None:
+        factor = factorize(mtx)
+        get_size = get_default(get_size, get_factorization_size)
+        cache.put(key, factor, get_size(factor, mtx))
+
+    return factor
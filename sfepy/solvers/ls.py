@@ -6,13 +6,18 @@ import numpy as nm
 import warnings
 
 import scipy.sparse as sps
+from scipy.sparse.linalg import LinearOperator
 import six
 from six.moves import range
 
 warnings.simplefilter('ignore', sps.SparseEfficiencyWarning)
 
 from sfepy.base.base import output, get_default, assert_, try_imports
+from sfepy.linalg.sparse import (get_matrix_generations, get_full_matrix,
+                                 SymmetricCSRMatrix)
 from sfepy.solvers.solvers import SolverMeta, LinearSolver
+from sfepy.solvers.factorization_cache import (get_factorization_cache,
+                                               get_cached_factorization)
 
 def solve(mtx, rhs, solver_class=None, solver_conf=None):
     """
@@ -47,6 +52,20 @@ def _get_cs_matrix_hash(mtx, chunk_size=100000):
     digest = sha1.hexdigest()
     return digest
 
+def _get_matrix_digest(mtx):
+    """
+    Get the digest of a CSR matrix `mtx`.
+
+    It is the tuple of the generation counters of `mtx`, see
+    :func:`sfepy.linalg.sparse.set_matrix_generations()`, or, for matrices
+    without the counters, the SHA1 hash of the matrix arrays.
+    """
+    digest = get_matrix_generations(mtx)
+    if digest is None:
+        digest = _get_cs_matrix_hash(mtx)
+
+    return digest
+
 def _is_new_matrix(mtx, mtx_digest, force_reuse=False):
     if not isinstance(mtx, sps.csr_matrix):
         return True, mtx_digest
@@ -56,12 +75,89 @@ def _is_new_matrix(mtx, mtx_digest, force_reuse=False):
 
     id0, digest0 = mtx_digest
     id1 = id(mtx)
-    digest1 = _get_cs_matrix_hash(mtx)
+    digest1 = _get_matrix_digest(mtx)
     if (id1 == id0) and (digest1 == digest0):
         return False, (id1, digest1)
 
     return True, (id1, digest1)
 
+def _is_same_structure(mtx_digest0, mtx_digest1):
+    """
+    Return True if the matrix digests `mtx_digest0` and `mtx_digest1` come
+    from the same matrix with the same structure generation counter.
+    """
+    (id0, digest0), (id1, digest1) = mtx_digest0, mtx_digest1
+
+    return ((id0 == id1)
+            and isinstance(digest0, tuple) and isinstance(digest1, tuple)
+            and (digest0[0] == digest1[0]))
+
+def _get_factorization_key(name, mtx, mtx_digest, *args):
+    """
+    Get the key of the factorization of a CSR matrix `mtx` with the digest
+    `mtx_digest` in the factorization cache, or None for other matrices.
+    The solver `name` and `args` identify the factorization kind.
+    """
+    if not isinstance(mtx, sps.csr_matrix):
+        return None
+
+    return ((name, isinstance(mtx, SymmetricCSRMatrix), mtx.shape,
+             mtx_digest[1]) + args)
+
+def _get_operator_precond(mtx):
+    """
+    Get the preconditioner of a matrix-free operator `mtx`, or None, if
+    `mtx` is not a matrix-free operator, or has no preconditioner.
+    """
+    from sfepy.discrete.evaluate import MatrixFreeOperator
+
+    if isinstance(mtx, MatrixFreeOperator):
+        return mtx.precond
+
+    return None
+
+def _solve_columns(solve, rhs, x0, setup_precond=None, **kwargs):
+    """
+    Call `solve(b, x0, **kwargs)` for each column `b` of the 2D array `rhs`
+    and the corresponding column of `x0`, if given.
+
+    If `setup_precond` is given, it is called only once, and its result is
+    passed to all the calls as the `setup_precond` keyword argument.
+
+    Returns
+    -------
+    sol : array
+        The solutions in columns.
+    n_iter : int
+        The total number of iterations, or -1, if not available.
+    """
+    if setup_precond is not None:
+        precond = []
+        def _setup_precond(mtx, context):
+            if not precond:
+                precond.append(setup_precond(mtx, context))
+
+            return precond[0]
+
+        kwargs['setup_precond'] = _setup_precond
+
+    sols = []
+    n_iter = 0
+    for ic in range(rhs.shape[1]):
+        result = solve(rhs[:, ic], None if x0 is None else x0[:, ic],
+                       **kwargs)
+        if isinstance(result, tuple):
+            result, _n_iter = result
+            if n_iter >= 0:
+                n_iter += _n_iter
+
+        else:
+            n_iter = -1
+
+        sols.append(result)
+
+    return nm.column_stack(sols), n_iter
+
 def standard_call(call):
     """
     Decorator handling argument preparation and timing for linear solvers.
@@ -76,12 +172,27 @@ def standard_call(call):
         status = get_default(status, self.status)
         context = get_default(context, self.context)
 
+        if not self.symmetric_storage:
+            mtx = get_full_matrix(mtx)
+
         assert_(mtx.shape[0] == mtx.shape[1] == rhs.shape[0])
         if x0 is not None:
             assert_(x0.shape[0] == rhs.shape[0])
 
-        result = call(self, rhs, x0, conf, eps_a, eps_r, i_max, mtx, status,
-                      context=context, **kwargs)
+        if (rhs.ndim == 2) and not self.block_rhs:
+            def _solve(b, x, **kw):
+                return call(self, b, x, conf, eps_a, eps_r, i_max, mtx,
+                            status, context=context, **kw)
+
+            setup_precond = kwargs.pop('setup_precond',
+                                       conf.get('setup_precond', None))
+            result = _solve_columns(_solve, rhs, x0,
+                                    setup_precond=setup_precond, **kwargs)
+
+        else:
+            result = call(self, rhs, x0, conf, eps_a, eps_r, i_max, mtx,
+                          status, context=context, **kwargs)
+
         if isinstance(result, tuple):
             result, n_iter = result
 
@@ -113,6 +224,9 @@ def petsc_call(call):
         context = get_default(context, self.context)
         comm = get_default(comm, self.comm)
 
+        if not self.symmetric_storage:
+            mtx = get_full_matrix(mtx)
+
         mshape = mtx.size if isinstance(mtx, self.petsc.Mat) else mtx.shape
         rshape = [rhs.size] if isinstance(rhs, self.petsc.Vec) else rhs.shape
 
@@ -121,13 +235,24 @@ def petsc_call(call):
             xshape = [x0.size] if isinstance(x0, self.petsc.Vec) else x0.shape
             assert_(xshape[0] == rshape[0])
 
-        result = call(self, rhs, x0, conf, eps_a, eps_r, i_max, mtx, status,
-                      comm, context=context, **kwargs)
+        if isinstance(rhs, nm.ndarray) and (rhs.ndim == 2):
+            # The KSP solver is reused for all columns.
+            def _solve(b, x, **kw):
+                out = call(self, b, x, conf, eps_a, eps_r, i_max, mtx, status,
+                           comm, context=context, **kw)
+                return out, self.ksp.getIterationNumber()
+
+            result, n_iter = _solve_columns(_solve, rhs, x0, **kwargs)
+
+        else:
+            result = call(self, rhs, x0, conf, eps_a, eps_r, i_max, mtx,
+                          status, comm, context=context, **kwargs)
+            n_iter = self.ksp.getIterationNumber()
 
         ttt = time.clock() - tt
         if status is not None:
             status['time'] = ttt
-            status['n_iter'] = self.ksp.getIterationNumber()
+            status['n_iter'] = n_iter
 
         return result
 
@@ -136,6 +261,16 @@ def petsc_call(call):
 class ScipyDirect(LinearSolver):
     """
     Direct sparse solver from SciPy.
+
+    Real symmetric matrices given by their upper triangle
+    (:class:`SymmetricCSRMatrix <sfepy.linalg.sparse.SymmetricCSRMatrix>`)
+    are factorized using the Cholesky factorization of scikit-sparse, if
+    available. If the matrix is not positive definite or scikit-sparse is
+    not installed, the LU factorization of the full matrix is used.
+
+    If the factorization cache is enabled (see
+    :mod:`sfepy.solvers.factorization_cache`), the matrices are always
+    factorized and the factorizations are shared through the cache.
     """
     name = 'ls.scipy_direct'
 
@@ -150,6 +285,9 @@ class ScipyDirect(LinearSolver):
          'If True, allow warnings.'),
     ]
 
+    symmetric_storage = True
+    block_rhs = True
+
     def __init__(self, conf, **kwargs):
         LinearSolver.__init__(self, conf, solve=None, **kwargs)
         um = self.sls = None
@@ -184,31 +322,75 @@ class ScipyDirect(LinearSolver):
             self.sls.use_solver(useUmfpack=True,
                                 assumeSortedIndices=True)
 
+        aux = try_imports(['import sksparse.cholmod as cholmod'])
+        self.cholmod = aux.get('cholmod')
+
     @standard_call
     def __call__(self, rhs, x0=None, conf=None, eps_a=None, eps_r=None,
                  i_max=None, mtx=None, status=None, **kwargs):
 
-        if conf.presolve:
+        if (conf.presolve or isinstance(mtx, SymmetricCSRMatrix)
+            or (get_factorization_cache() is not None)):
             self.presolve(mtx)
 
         if self.solve is not None:
             # Matrix is already prefactorized.
-            return self.solve(rhs)
+            solve = self.solve
+
+        elif rhs.ndim == 2:
+            # Factorize once for all right-hand sides.
+            solve = self.factorize(mtx)
+
         else:
             return self.sls.spsolve(mtx, rhs)
 
+        if rhs.ndim == 2:
+            # Not all factorizations accept 2D right-hand sides.
+            return nm.column_stack([solve(rhs[:, ic])
+                                    for ic in range(rhs.shape[1])])
+
+        else:
+            return solve(rhs)
+
     def presolve(self, mtx):
         is_new, mtx_digest = _is_new_matrix(mtx, self.mtx_digest)
         if is_new:
-            self.solve = self.sls.factorized(mtx)
+            key = _get_factorization_key(self.name, mtx, mtx_digest,
+                                         self.conf.method)
+            self.solve = get_cached_factorization(key, mtx, self.factorize)
             self.mtx_digest = mtx_digest
 
+    def factorize(self, mtx):
+        """
+        Factorize the matrix `mtx` and return the function solving the linear
+        system for a given right-hand side.
+        """
+        if isinstance(mtx, SymmetricCSRMatrix):
+            full = mtx.get_full()
+            if (self.cholmod is not None) and (mtx.dtype == nm.float64):
+                try:
+                    return self.cholmod.cholesky(full.tocsc())
+
+                except self.cholmod.CholmodNotPositiveDefiniteError:
+                    if self.conf.warn:
+                        output('matrix is not positive definite,'
+                               ' using LU factorization!')
+
+            mtx = full
+
+        return self.sls.factorized(mtx)
+
 class ScipyIterative(LinearSolver):
     """
     Interface to SciPy iterative solvers.
 
     The `eps_r` tolerance is both absolute and relative - the solvers
     stop when either the relative or the absolute residual is below it.
+
+    If `recycle` is greater than zero, the GCROT(m, k) method is used, and
+    the Krylov subspace kept from the previous solves, e.g. in previous time
+    steps, is used to deflate the subsequent solves. This reduces the
+    numbers of iterations when solving sequences of similar linear systems.
     """
     name = 'ls.scipy_iterative'
 
@@ -234,6 +416,10 @@ class ScipyIterative(LinearSolver):
          'The absolute tolerance for the residual.'),
         ('eps_r', 'float', 1e-8, False,
          'The relative tolerance for the residual.'),
+        ('recycle', 'int', 0, False,
+         """If greater than zero, the number of vectors of the Krylov subspace
+            kept from the previous solves and used to deflate the next solves.
+            The 'gcrotmk' method is used instead of other methods."""),
         ('*', '*', None, False,
          'Additional parameters supported by the method.'),
     ]
@@ -245,12 +431,19 @@ class ScipyIterative(LinearSolver):
     def __init__(self, conf, context=None, **kwargs):
         import scipy.sparse.linalg.isolve as la
 
-        LinearSolver.__init__(self, conf, context=context, **kwargs)
+        LinearSolver.__init__(self, conf, context=context, recycled=[],
+                              **kwargs)
+
+        method = self.conf.method
+        if self.conf.recycle and (method != 'gcrotmk'):
+            output('Krylov subspace recycling requires gcrotmk,'
+                   ' using it instead of %s!' % method)
+            method = 'gcrotmk'
 
         try:
-            solver = getattr(la, self.conf.method)
+            solver = getattr(la, method)
         except AttributeError:
-            output('scipy solver %s does not exist!' % self.conf.method)
+            output('scipy solver %s does not exist!' % method)
             output('using cg instead')
             solver = la.cg
         self.solver = solver
@@ -293,6 +486,8 @@ class ScipyIterative(LinearSolver):
             callback(sol)
 
         precond = setup_precond(mtx, context)
+        if precond is None:
+            precond = _get_operator_precond(mtx)
 
         if conf.method == 'qmr':
             prec_args = {'M1' : precond, 'M2' : precond}
@@ -302,6 +497,16 @@ class ScipyIterative(LinearSolver):
 
         solver_kwargs.update(prec_args)
 
+        if conf.recycle:
+            is_new, mtx_digest = _is_new_matrix(mtx, self.mtx_digest)
+            if is_new:
+                # The C vectors depend on the matrix, gcrotmk recomputes them
+                # from the U vectors.
+                self.recycled[:] = [(None, u) for c, u in self.recycled]
+                self.mtx_digest = mtx_digest
+
+            solver_kwargs.update(k=conf.recycle, CU=self.recycled)
+
         try:
             sol, info = self.solver(mtx, rhs, x0=x0, atol=eps_a, tol=eps_r,
                                     maxiter=i_max, callback=iter_callback,
@@ -511,6 +716,8 @@ class PyAMGKrylovSolver(LinearSolver):
             callback(sol)
 
         precond = setup_precond(mtx, context)
+        if precond is None:
+            precond = _get_operator_precond(mtx)
 
         sol, info = self.solver(mtx, rhs, x0=x0, tol=eps_r, maxiter=i_max,
                                 M=precond, callback=iter_callback,
@@ -523,6 +730,21 @@ class PyAMGKrylovSolver(LinearSolver):
 
         return sol, self.iter
 
+class _PETScOperatorContext(object):
+    """
+    The PETSc Python matrix or preconditioner context applying a
+    LinearOperator.
+    """
+
+    def __init__(self, op):
+        self.op = op
+
+    def mult(self, mat, x, y):
+        y[...] = self.op.matvec(x[...])
+
+    def apply(self, pc, x, y):
+        y[...] = self.op.matvec(x[...])
+
 class PETScKrylovSolver(LinearSolver):
     """
     PETSc Krylov subspace solver.
@@ -653,6 +875,12 @@ class PETScKrylovSolver(LinearSolver):
         if isinstance(mtx, self.petsc.Mat):
             pmtx = mtx
 
+        elif isinstance(mtx, LinearOperator):
+            pmtx = self.petsc.Mat()
+            pmtx.createPython(mtx.shape, context=_PETScOperatorContext(mtx),
+                              comm=comm)
+            pmtx.setUp()
+
         else:
             mtx = sps.csr_matrix(mtx)
 
@@ -691,6 +919,16 @@ class PETScKrylovSolver(LinearSolver):
             if setup_precond is not None:
                 ksp.pc.setPythonContext(setup_precond(mtx, context))
 
+            elif isinstance(mtx, LinearOperator):
+                # The matrix entries are not available.
+                precond = _get_operator_precond(mtx)
+                if precond is not None:
+                    ksp.pc.setType(ksp.pc.Type.PYTHON)
+                    ksp.pc.setPythonContext(_PETScOperatorContext(precond))
+
+                else:
+                    ksp.pc.setType(ksp.pc.Type.NONE)
+
             ksp.setFromOptions()
             self.mtx_digest = mtx_digest
             self.ksp = ksp
@@ -734,16 +972,43 @@ class PETScKrylovSolver(LinearSolver):
         return sol
 
 
+def _get_mumps_factors_size(mumps_ls, mtx):
+    """
+    Get the memory in bytes taken by the factors of `mtx` in the MUMPS
+    instance `mumps_ls`.
+    """
+    # INFOG(9) is the number of entries of the factors, negative in millions.
+    n_entry = mumps_ls.struct.infog[8]
+    if n_entry < 0:
+        n_entry = -n_entry * 1000000
+
+    return n_entry * mtx.dtype.itemsize
+
 class MUMPSSolver(LinearSolver):
     """
     Interface to MUMPS solver.
 
+    The matrices given by their upper triangle (:class:`SymmetricCSRMatrix
+    <sfepy.linalg.sparse.SymmetricCSRMatrix>`) are passed to MUMPS directly
+    in its symmetric mode.
+
+    If the factorization cache is enabled (see
+    :mod:`sfepy.solvers.factorization_cache`), the factorized MUMPS
+    instances are shared through the cache.
     """
     name = 'ls.mumps'
 
     __metaclass__ = SolverMeta
 
-    _parameters = []
+    _parameters = [
+        ('sym', '{1, 2}', 1, False,
+         """The MUMPS symmetric mode used for matrices given by their upper
+            triangle: 1 = symmetric positive definite, 2 = general
+            symmetric."""),
+    ]
+
+    symmetric_storage = True
+    block_rhs = True
 
     def __init__(self, conf, **kwargs):
         import sfepy.solvers.ls_mumps as mumps
@@ -752,21 +1017,17 @@ class MUMPSSolver(LinearSolver):
         mumps.load_mumps_libraries()  # try to load MUMPS libraries
 
         LinearSolver.__init__(self, conf, mumps=mumps, mumps_ls=None,
+                              mumps_system=None, mumps_sym=None,
                               mumps_presolved=False, **kwargs)
 
     @standard_call
     def __call__(self, rhs, x0=None, conf=None, eps_a=None, eps_r=None,
                  i_max=None, mtx=None, status=None, **kwargs):
 
-        if self.mumps_ls is None:
-            system = 'complex' if mtx.dtype.name.startswith('complex')\
-                else 'real'
-            self.mumps_ls = self.mumps.MumpsSolver(system=system)
+        self.presolve(mtx)
 
-        if not self.mumps_presolved:
-            self.presolve(mtx)
-
-        out = rhs.copy()
+        # MUMPS expects multiple right-hand sides stored by columns.
+        out = rhs.copy(order='F')
         self.mumps_ls.set_b(out)
         self.mumps_ls(3)  # solve
         from scipy.io import savemat
@@ -774,18 +1035,69 @@ class MUMPSSolver(LinearSolver):
 
         return out
 
+    def init_mumps(self, mtx):
+        """
+        Create the MUMPS instance for the matrix `mtx`, if not already
+        created with the same system type and symmetric mode.
+        """
+        system = 'complex' if mtx.dtype.name.startswith('complex')\
+            else 'real'
+        sym = self.conf.sym if isinstance(mtx, SymmetricCSRMatrix) else 0
+
+        if ((self.mumps_ls is None)
+            or ((system, sym) != (self.mumps_system, self.mumps_sym))):
+            self.mumps_ls = self.mumps.MumpsSolver(sym=sym, system=system)
+            self.mumps_system, self.mumps_sym = system, sym
+            self.mumps_presolved = False
+
     def presolve(self, mtx):
+        self.init_mumps(mtx)
+
         is_new, mtx_digest = _is_new_matrix(mtx, self.mtx_digest)
-        if is_new:
-            if self.conf.verbose:
-                self.mumps_ls.set_verbose()
+        if is_new or not self.mumps_presolved:
+            key = None
+            if get_factorization_cache() is not None:
+                key = _get_factorization_key(self.name, mtx, mtx_digest,
+                                             self.mumps_system,
+                                             self.mumps_sym)
+
+            if key is None:
+                self.factorize(mtx, mtx_digest)
+
+            else:
+                # Do not overwrite an instance possibly stored in the cache.
+                def factorize(mtx):
+                    self.mumps_ls = self.mumps.MumpsSolver(
+                        sym=self.mumps_sym, system=self.mumps_system)
+                    self.mumps_presolved = False
+                    self.factorize(mtx, mtx_digest)
+                    return self.mumps_ls
+
+                self.mumps_ls = get_cached_factorization(
+                    key, mtx, factorize, get_size=_get_mumps_factors_size)
 
-            self.mumps_ls.set_A_centralized(mtx)
-            self.mumps_ls(1)  # analyze
-            self.mumps_ls(2)  # factorize
             self.mumps_presolved = True
             self.mtx_digest = mtx_digest
 
+    def factorize(self, mtx, mtx_digest):
+        """
+        Factorize the matrix `mtx` with the digest `mtx_digest` using the
+        current MUMPS instance. The analysis step is skipped, if the
+        instance was used for a matrix with the same structure.
+        """
+        if self.conf.verbose:
+            self.mumps_ls.set_verbose()
+
+        if isinstance(mtx, SymmetricCSRMatrix):
+            # MUMPS takes the upper triangle in the symmetric modes.
+            mtx = mtx.get_upper() if self.mumps_sym else mtx.get_full()
+
+        self.mumps_ls.set_A_centralized(mtx)
+        if not (self.mumps_presolved
+                and _is_same_structure(mtx_digest, self.mtx_digest)):
+            self.mumps_ls(1)  # analyze
+        self.mumps_ls(2)  # factorize
+
     def __del__(self):
         if self.mumps_ls is not None:
             del(self.mumps_ls)
@@ -872,6 +1184,9 @@ class SchurGeneralized(ScipyDirect):
          'The user defined function.'),
     ]
 
+    symmetric_storage = False
+    block_rhs = False
+
     def __init__(self, conf, context=None, **kwargs):
         ScipyDirect.__init__(self, conf, context=context, **kwargs)
 
@@ -1023,6 +1338,9 @@ class MultiProblem(ScipyDirect):
          'The list of coupling variables.'),
     ]
 
+    symmetric_storage = False
+    block_rhs = False
+
     def __init__(self, conf, context=None, **kwargs):
         ScipyDirect.__init__(self, conf, context=context, **kwargs)
 
@@ -242,8 +242,17 @@ class MumpsSolver(object):
         self.struct.a = data.ctypes.data_as(mumps_pcomplex)
 
     def set_b(self, b):
-        """Set the right hand side of the linear system."""
+        """Set the right hand side of the linear system.
+
+        Parameters
+        ----------
+        b : array
+            The right hand side vector, or a Fortran-ordered 2D array with
+            the right hand sides in columns. The solution overwrites `b`.
+        """
         self._data.update(b=b)
+        self.struct.nrhs = b.shape[1] if b.ndim == 2 else 1
+        self.struct.lrhs = b.shape[0]
         self.struct.rhs = b.ctypes.data_as(mumps_pcomplex)
 
     def __call__(self, job):
@@ -111,6 +111,15 @@ class Newton(NonlinearSolver):
     Solves a nonlinear system :math:`f(x) = 0` using the Newton method.
 
     The solver uses a backtracking line-search on divergence.
+
+    If `reuse_matrix` is nonzero, the modified Newton method is used: a
+    tangent matrix, together with its factorization by the linear solver
+    (see :func:`LinearSolver.presolve()
+    <sfepy.solvers.solvers.LinearSolver.presolve()>`), is reused in the
+    subsequent iterations while the residual norm decreases fast enough,
+    see `reuse_ratio`. A step computed with a reused matrix that does not
+    decrease the residual norm is rejected, and a new tangent matrix is
+    computed instead of the line-search.
     """
     name = 'nls.newton'
 
@@ -162,11 +171,26 @@ class Newton(NonlinearSolver):
             Each of the dict items can be None."""),
         ('is_linear', 'bool', False, False,
          'If True, the problem is considered to be linear.'),
+        ('reuse_matrix', 'int', 0, False,
+         """The maximum number of subsequent iterations, in which a tangent
+            matrix is reused after its computation. If 0, a new tangent matrix
+            is computed in each iteration."""),
+        ('reuse_ratio', '0.0 < float < 1.0', 0.5, False,
+         """The tangent matrix is reused only if
+            :math:`||f(x^i)|| / ||f(x^{i-1})||` is smaller than
+            `reuse_ratio`."""),
+        ('reuse_steps', 'bool', False, False,
+         """If True, a tangent matrix can be reused also in subsequent solver
+            calls, e.g. in the next time step. Only the `reuse_matrix` limit
+            applies in the first iteration of a call."""),
     ]
 
     def __init__(self, conf, **kwargs):
         NonlinearSolver.__init__(self, conf, **kwargs)
 
+        # The reusable tangent matrix and the number of its reuses.
+        self.reused_matrix = None
+
         conf = self.conf
 
         log = get_logging_conf(conf)
@@ -217,6 +241,9 @@ class Newton(NonlinearSolver):
         * Setting `conf.is_linear == True` means a pre-assembled and possibly
           pre-solved matrix. This is mostly useful for linear time-dependent
           problems.
+        * If `conf.reuse_matrix` is nonzero, the numbers of computed, reused
+          and rejected tangent matrices are stored in `status` under the
+          'n_matrix', 'n_reused' and 'n_rejected' keys.
         """
         conf = get_default(conf, self.conf)
         fun = get_default(fun, self.fun)
@@ -241,10 +268,16 @@ class Newton(NonlinearSolver):
             self.log.plot_vlines(color='r', linewidth=1.0)
 
         err = err0 = -1.0
-        err_last = -1.0
+        err_last = err_prev = -1.0
         it = 0
         ls_status = {}
         ls_n_iter = 0
+
+        mtx_a, age = None, 0
+        if conf.reuse_matrix and conf.reuse_steps:
+            mtx_a, age = get_default(self.reused_matrix, (None, 0))
+        is_reused = is_rejected = False
+        n_matrix = n_reused = n_rejected = 0
         while 1:
             if iter_hook is not None:
                 iter_hook(self, vec_x, it, err, err0)
@@ -284,6 +317,17 @@ class Newton(NonlinearSolver):
                         err0 = err;
                         break
                     if err < (err_last * conf.ls_on): break
+
+                    if is_reused:
+                        output('reused matrix step rejected: iter %d,'
+                               ' (%.5e < %.5e)'
+                               % (it, err, err_last * conf.ls_on))
+                        vec_x = vec_x_last.copy()
+                        vec_r, err = vec_r_last, err_last
+                        is_rejected = True
+                        n_rejected += 1
+                        break
+
                     red = conf.ls_red;
                     output('linesearch: iter %d, (%.5e < %.5e) (new ls: %e)'
                            % (it, err, err_last * conf.ls_on, red * ls))
@@ -309,8 +353,9 @@ class Newton(NonlinearSolver):
             if self.log is not None:
                 self.log.plot_vlines([1], color='g', linewidth=0.5)
 
-            err_last = err;
+            err_prev, err_last = err_last, err
             vec_x_last = vec_x.copy()
+            vec_r_last = vec_r
 
             condition = conv_test(conf, it, err, err0)
             if condition >= 0:
@@ -322,7 +367,25 @@ class Newton(NonlinearSolver):
 
             tt = time.clock()
             if not conf.is_linear:
-                mtx_a = fun_grad(vec_x)
+                is_reused = ((mtx_a is not None)
+                             and (age < conf.reuse_matrix)
+                             and not is_rejected
+                             and ((it == 0)
+                                  or (err < conf.reuse_ratio * err_prev)))
+                is_rejected = False
+
+                if is_reused:
+                    age += 1
+                    n_reused += 1
+
+                else:
+                    mtx_a = fun_grad(vec_x)
+                    age = 0
+                    n_matrix += 1
+                    if conf.reuse_matrix:
+                        # Factorize now, so that the factorization is reused
+                        # with the matrix.
+                        lin_solver.presolve(mtx_a)
 
             else:
                 mtx_a = fun_grad('linear')
@@ -377,6 +440,17 @@ class Newton(NonlinearSolver):
             status['ls_n_iter'] = ls_n_iter if ls_n_iter >= 0 else -1
             status['condition'] = condition
 
+        if conf.reuse_matrix and not conf.is_linear:
+            output('tangent matrices: %d computed, %d reused, %d rejected'
+                   % (n_matrix, n_reused, n_rejected))
+            if status is not None:
+                status['n_matrix'] = n_matrix
+                status['n_reused'] = n_reused
+                status['n_rejected'] = n_rejected
+
+            if conf.reuse_steps:
+                self.reused_matrix = (mtx_a, age)
+
         if conf.log.plot is not None:
             if self.log is not None:
                 self.log(save_figure=conf.log.plot)
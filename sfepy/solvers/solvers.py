@@ -205,7 +205,22 @@ class Solver(Struct):
 class LinearSolver(Solver):
     """
     Abstract linear solver class.
+
+    The solvers able to use directly the upper triangle stored in
+    :class:`SymmetricCSRMatrix <sfepy.linalg.sparse.SymmetricCSRMatrix>`
+    matrices have the `symmetric_storage` class attribute set to True, the
+    other solvers get the full matrices.
+
+    The right-hand side can be also given as a 2D array `(n, k)` with `k`
+    right-hand sides in columns - the solution is then a 2D array of the
+    same shape. The solvers handling such right-hand sides natively have the
+    `block_rhs` class attribute set to True, for the other solvers the
+    columns are solved one by one, reusing the matrix factorization or
+    preconditioner, if possible.
     """
+    symmetric_storage = False
+    block_rhs = False
+
     def __init__(self, conf, mtx=None, status=None, context=None, **kwargs):
         Solver.__init__(self, conf=conf, mtx=mtx, status=status,
                         context=context, **kwargs)
@@ -98,6 +98,11 @@ class SimpleTimeSteppingSolver(TimeSteppingSolver):
         ('quasistatic', 'bool', False, False,
          """If True, assume a quasistatic time-stepping. Then the non-linear
             solver is invoked also for the initial time."""),
+        ('predictor', "{'constant', 'linear', 'quadratic', 'secant'}",
+         'constant', False,
+         """The predictor of the nonlinear solver initial guess, see
+            :func:`predict_solution()`. The essential boundary conditions
+            are applied to the prediction by `prestep_fun`."""),
     ]
 
     def __init__(self, conf, nls=None, context=None, **kwargs):
@@ -110,6 +115,25 @@ class SimpleTimeSteppingSolver(TimeSteppingSolver):
 
         self.format = format
         self.verbose = self.conf.verbose
+        self.history = []
+
+    def predict(self, ts, vec):
+        """
+        Predict the solution at the current time of `ts` from the previous
+        solutions, `vec` being the last one.
+        """
+        if len(self.history) and (self.history[-1][1] is vec):
+            return predict_solution(self.history, ts.time,
+                                    self.conf.predictor)
+
+        return vec
+
+    def add_to_history(self, ts, vec):
+        """
+        Store the solution `vec` at the current time of `ts` for the
+        predictor.
+        """
+        self.history = (self.history + [(ts.time, vec)])[-3:]
 
     def solve_step0(self, nls, vec0):
         if self.conf.quasistatic:
@@ -141,6 +165,8 @@ class SimpleTimeSteppingSolver(TimeSteppingSolver):
 
         vec0 = init_fun(ts, vec0)
 
+        self.history = []
+
         self.output_step_info(ts)
         if ts.step == 0:
             prestep_fun(ts, vec0)
@@ -148,6 +174,7 @@ class SimpleTimeSteppingSolver(TimeSteppingSolver):
             vec = self.solve_step0(nls, vec0)
 
             poststep_fun(ts, vec)
+            self.add_to_history(ts, vec)
             ts.advance()
 
         else:
@@ -156,16 +183,74 @@ class SimpleTimeSteppingSolver(TimeSteppingSolver):
         for step, time in ts.iter_from(ts.step):
             self.output_step_info(ts)
 
+            vec = self.predict(ts, vec)
             prestep_fun(ts, vec)
 
             vect = self.solve_step(ts, nls, vec, prestep_fun)
 
             poststep_fun(ts, vect)
+            self.add_to_history(ts, vect)
 
             vec = vect
 
         return vec
 
+def predict_solution(history, time, kind='constant'):
+    """
+    Predict the solution at `time` by extrapolating the previous solutions.
+
+    Parameters
+    ----------
+    history : list of tuples
+        The `(time, vec)` pairs of the previous solutions, the last one is
+        the most recent.
+    time : float
+        The time of the prediction.
+    kind : 'constant', 'linear', 'quadratic' or 'secant'
+        The predictor kind:
+
+        - 'constant' - the last solution.
+        - 'linear' - the linear extrapolation of the last two solutions,
+          assuming a constant time step.
+        - 'secant' - the linear extrapolation of the last two solutions
+          using their times, suitable for variable time steps.
+        - 'quadratic' - the quadratic extrapolation of the last three
+          solutions using their times.
+
+        If not enough solutions are available, a lower order predictor is
+        used.
+
+    Returns
+    -------
+    vec : array
+        The predicted solution.
+    """
+    n_hist = len(history)
+    if (kind == 'constant') or (n_hist < 2):
+        return history[-1][1]
+
+    (t0, vec0), (t1, vec1) = history[-2:]
+    if kind == 'linear':
+        vec = 2.0 * vec1 - vec0
+
+    elif (kind == 'secant') or (n_hist < 3):
+        vec = vec1 + ((time - t1) / (t1 - t0)) * (vec1 - vec0)
+
+    elif kind == 'quadratic':
+        times = [ii[0] for ii in history[-3:]]
+        vec = nm.zeros_like(vec1)
+        for ii, (ti, veci) in enumerate(history[-3:]):
+            coef = 1.0
+            for ij, tj in enumerate(times):
+                if ij != ii:
+                    coef *= (time - tj) / (ti - tj)
+            vec += coef * veci
+
+    else:
+        raise ValueError('unknown predictor kind! (%s)' % kind)
+
+    return vec
+
 def get_min_dt(adt):
     red = adt.red
     while red >= adt.red_max:
@@ -242,12 +327,105 @@ def adapt_time_step(ts, status, adt, context=None, verbose=False):
 
     return is_break
 
+def adapt_time_step_pi(ts, status, adt, context=None, verbose=False):
+    r"""
+    Adapt the time step of `ts` using a PI controller driven by the local
+    truncation error estimate.
+
+    The step is rejected and repeated with a shorter time step, if the
+    nonlinear solver did not converge, or if the scaled error estimate
+    `status.err` is greater than one. Otherwise the time step of the next
+    step is set to :math:`\Delta t \, s \, e_n^{-\alpha} \,
+    e_{n-1}^{\beta}`, where :math:`e_n`, :math:`e_{n-1}` are the current and
+    previous accepted error estimates. This is governed by the following
+    parameters:
+
+    - `red_factor` : time step reduction factor for the nonlinear solver
+      failures, and the minimum factor of the controller
+    - `red_max` : maximum time step reduction factor
+    - `safety` : the safety factor :math:`s`
+    - `max_factor` : maximum time step increase factor
+    - `alpha`, `beta` : the controller exponents
+
+    If `status.err` is None (no estimate available), the step is accepted
+    and the time step is not changed.
+
+    Parameters
+    ----------
+    ts : VariableTimeStepper instance
+        The time stepper.
+    status : IndexedStruct instance
+        The nonlinear solver exit status, with the error estimate in the
+        `err` attribute.
+    adt : Struct instance
+        The object with the adaptivity parameters of the time-stepping solver
+        such as `red_factor` (see above) as attributes.
+    context : object, optional
+        The context can be used in user-defined adaptivity functions. Not used
+        here.
+
+    Returns
+    -------
+    is_break : bool
+        If True, the adaptivity loop should stop.
+    """
+    err = status.get('err', None)
+    if status.condition != 0:
+        is_accepted = False
+        factor = adt.red_factor
+
+    elif err is None:
+        return True
+
+    else:
+        is_accepted = err <= 1.0
+        err = max(err, 1e-10)
+        factor = adt.safety * err**(-adt.alpha) * adt.err_prev**adt.beta
+        factor = min(adt.max_factor, max(adt.red_factor, factor))
+
+    red = adt.red * factor
+    if is_accepted:
+        adt.err_prev = err
+        adt.red = red
+
+        dt = adt.dt0 * red
+        if ts.time + dt > ts.t1:
+            dt = ts.t1 - ts.time
+
+        if dt > 0.0:
+            ts.set_time_step(dt)
+
+        output('%s new time step: %e %s'
+               % (('+++++', ts.dt, '+++++') if factor >= 1.0
+                  else ('-----', ts.dt, '-----')), verbose=verbose)
+        is_break = True
+
+    elif red < adt.red_max:
+        output('minimum time step reached, accepting step!', verbose=verbose)
+        is_break = True
+
+    else:
+        adt.red = red
+        ts.set_time_step(adt.dt0 * red, update_time=True)
+        output('----- step rejected, new time step: %e -----' % ts.dt,
+               verbose=verbose)
+        is_break = False
+
+    return is_break
+
 class AdaptiveTimeSteppingSolver(SimpleTimeSteppingSolver):
     """
     Implicit time stepping solver with an adaptive time step.
 
     Either the built-in or user supplied function can be used to adapt the time
-    step.
+    step. The built-in functions adapt the time step either according to the
+    nonlinear solver convergence (:func:`adapt_time_step()`), or according to
+    the local truncation error estimate (:func:`adapt_time_step_pi()`).
+
+    The error is estimated by the difference of the solution and the linear
+    extrapolation of the two previous solutions, scaled to approximate the
+    error of the first order (backward Euler) time discretization. The
+    estimate of the first step is not available.
     """
     name = 'ts.adaptive'
 
@@ -276,6 +454,23 @@ class AdaptiveTimeSteppingSolver(SimpleTimeSteppingSolver):
             steps."""),
         ('dt_inc_wait', 'int', 5, False,
          'The number of consecutive time steps, see `dt_inc_on_iter`.'),
+        ('dt_control', "{'iterations', 'error'}", 'iterations', False,
+         """The built-in time step control: by the nonlinear solver
+            convergence, or by the local truncation error estimate. Ignored
+            if `adapt_fun` is given."""),
+        ('err_atol', 'float', 1e-6, False,
+         'The absolute tolerance of the local truncation error estimate.'),
+        ('err_rtol', 'float', 1e-3, False,
+         'The relative tolerance of the local truncation error estimate.'),
+        ('dt_safety', 'float', 0.9, False,
+         'The safety factor of the error-based time step control.'),
+        ('dt_max_factor', 'float', 5.0, False,
+         """The maximum time step increase factor of the error-based time step
+            control."""),
+        ('pi_alpha', 'float', 0.35, False,
+         'The exponent of the current error in the PI controller.'),
+        ('pi_beta', 'float', 0.2, False,
+         'The exponent of the previous error in the PI controller.'),
     ]
 
     def __init__(self, conf, nls=None, context=None, **kwargs):
@@ -290,7 +485,11 @@ class AdaptiveTimeSteppingSolver(SimpleTimeSteppingSolver):
                      inc_factor=get('dt_inc_factor', 1.25),
                      inc_on_iter=get('dt_inc_on_iter', 4),
                      inc_wait=get('dt_inc_wait', 5),
-                     red=1.0, wait=0, dt0=0.0)
+                     safety=get('dt_safety', 0.9),
+                     max_factor=get('dt_max_factor', 5.0),
+                     alpha=get('pi_alpha', 0.35),
+                     beta=get('pi_beta', 0.2),
+                     red=1.0, wait=0, dt0=0.0, err_prev=1.0)
         self.adt = adt
 
         adt.dt0 = self.ts.get_default_time_step()
@@ -301,24 +500,71 @@ class AdaptiveTimeSteppingSolver(SimpleTimeSteppingSolver):
 
         self.adapt_time_step = self.conf.adapt_fun
         if self.adapt_time_step is None:
-            self.adapt_time_step = adapt_time_step
+            if self.conf.dt_control == 'error':
+                self.adapt_time_step = adapt_time_step_pi
+
+            else:
+                self.adapt_time_step = adapt_time_step
+
+        self.vec_prev = self.dt_prev = None
+
+    def estimate_error(self, ts, vec0, vec1):
+        """
+        Estimate the local truncation error of the time step from `vec0` to
+        `vec1`.
+
+        Returns
+        -------
+        err : float or None
+            The root mean square of the error estimate scaled by the
+            tolerances, or None, if the previous solution is not available.
+        """
+        if self.vec_prev is None:
+            return None
+
+        dt, dt_prev = ts.dt, self.dt_prev
+        vec_p = vec0 + (dt / dt_prev) * (vec0 - self.vec_prev)
+        vec_e = (dt / (dt + dt_prev)) * (vec1 - vec_p)
+
+        scale = (self.conf.err_atol
+                 + self.conf.err_rtol * nm.maximum(nm.abs(vec0),
+                                                   nm.abs(vec1)))
+        err = nm.sqrt(nm.mean((vec_e / scale)**2))
+
+        return err
+
+    def solve_step0(self, nls, vec0):
+        self.vec_prev = self.dt_prev = None
+
+        return SimpleTimeSteppingSolver.solve_step0(self, nls, vec0)
 
     def solve_step(self, ts, nls, vec, prestep_fun):
         """
         Solve a single time step.
         """
+        # The last solution - vec may be its prediction.
+        vec0 = self.history[-1][1] if len(self.history) else vec
+
         status = IndexedStruct(n_iter=0, condition=0)
         while 1:
             vect = nls(vec, status=status)
 
+            dt = ts.dt
+            status.err = None
+            if status.condition == 0:
+                status.err = self.estimate_error(ts, vec0, vect)
+
             is_break = self.adapt_time_step(ts, status, self.adt, self.context,
                                             verbose=self.verbose)
 
             if is_break:
                 break
 
+            vec = self.predict(ts, vec0)
             prestep_fun(ts, vec)
 
+        self.vec_prev, self.dt_prev = vec0, dt
+
         return vect
 
     def output_step_info(self, ts):
@@ -920,3 +1166,201 @@ class BatheTS(ElastodynamicsBaseTS):
             vec = vec2
 
         return vec
+
+def get_lumped_mass(mtx_m, kind='row_sum'):
+    """
+    Get the lumped (diagonal) mass matrix corresponding to the consistent
+    mass matrix `mtx_m`.
+
+    Parameters
+    ----------
+    mtx_m : spmatrix
+        The consistent mass matrix.
+    kind : 'row_sum' or 'hrz'
+        The lumping kind: the row sums, or the diagonal scaled to preserve
+        the total mass (the Hinton-Rock-Zienkiewicz lumping). The rows with
+        a single nonzero entry, e.g. the identity rows of the essential
+        boundary conditions, are left unchanged in the latter case.
+
+    Returns
+    -------
+    mass : array
+        The diagonal of the lumped mass matrix.
+    """
+    mtx_m = mtx_m.tocsr()
+
+    if kind == 'row_sum':
+        mass = nm.asarray(mtx_m.sum(axis=1)).ravel()
+
+    elif kind == 'hrz':
+        mass = mtx_m.diagonal().copy()
+        ii = nm.diff(mtx_m.indptr) > 1
+        total = mtx_m[ii].sum()
+        mass[ii] *= total / mass[ii].sum()
+
+    else:
+        raise ValueError('unknown mass lumping kind! (%s)' % kind)
+
+    return mass
+
+class CentralDifferenceTS(ElastodynamicsBaseTS):
+    r"""
+    Solve elastodynamics problems by the explicit central difference method
+    with a lumped (diagonal) mass matrix.
+
+    No linear systems are solved - each time step requires a single residual
+    evaluation and a diagonal scaling:
+
+    .. math::
+        u_{n+1} = u_n + \Delta t\ v_n + \frac{\Delta t^2}{2} a_n \;, \quad
+        v_{n+1/2} = v_n + \frac{\Delta t}{2} a_n \;, \\
+        a_{n+1} = - M_L^{-1} r(u_{n+1}, v_{n+1/2}) \;, \quad
+        v_{n+1} = v_{n+1/2} + \frac{\Delta t}{2} a_{n+1} \;,
+
+    where :math:`r` is the residual without the inertia term and :math:`M_L`
+    is the lumped mass matrix obtained from the mass matrix block, i.e. from
+    the ``dw_volume_dot`` term. The damping forces are evaluated with the
+    mid-step velocity. The lumped mass matrix is computed only once.
+
+    The method is only conditionally stable. If `dt_auto` is True, the time
+    step is set to `dt_safety` times the critical time step estimate. If the
+    wave propagation speed :math:`c` is given, the estimate is
+    :math:`\Delta t_{crit} = h_{min} / (c \sqrt{d})`, where :math:`h_{min}`
+    is the minimum element diameter given by
+    :func:`FEDomain.get_element_diameters()
+    <sfepy.discrete.fem.domain.FEDomain.get_element_diameters()>` and
+    :math:`d` is the space dimension. Otherwise, the estimate :math:`2 /
+    \omega_{max}` uses the Gershgorin bound of the highest eigenfrequency
+    :math:`\omega_{max}^2 \leq \max_i \sum_j |K_{ij}| / m_i`.
+    """
+    name = 'ts.central_difference'
+
+    __metaclass__ = SolverMeta
+
+    _parameters = [
+        ('t0', 'float', 0.0, False,
+         'The initial time.'),
+        ('t1', 'float', 1.0, False,
+         'The final time.'),
+        ('dt', 'float', None, False,
+         'The time step. Used if `n_step` is not given.'),
+        ('n_step', 'int', 10, False,
+         'The number of time steps. Has precedence over `dt`.'),
+        ('is_linear', 'bool', False, False,
+         'If True, the problem is considered to be linear.'),
+        ('mass_lumping', "{'row_sum', 'hrz'}", 'row_sum', False,
+         """The mass lumping kind: the row sums of the mass matrix, or its
+            diagonal scaled to preserve the total mass."""),
+        ('dt_auto', 'bool', False, False,
+         """If True, set the time step automatically using the critical time
+            step estimate. Has precedence over `dt` and `n_step`."""),
+        ('dt_safety', 'float', 0.9, False,
+         'The safety factor of the automatic time step.'),
+        ('wave_speed', 'float', None, False,
+         """The maximum wave propagation speed. If given, the critical time
+            step is estimated from the element diameters."""),
+    ]
+
+    def __init__(self, conf, nls=None, context=None, **kwargs):
+        ElastodynamicsBaseTS.__init__(self, conf, nls=nls, context=context,
+                                      **kwargs)
+        self.mass = None
+
+    def get_mass(self, nls, vec):
+        """
+        Get the diagonal of the lumped mass matrix.
+        """
+        if self.mass is None:
+            M = self.get_matrices(nls, vec)[0]
+            self.mass = get_lumped_mass(M, self.conf.mass_lumping)
+
+        return self.mass
+
+    def get_a0(self, nls, u0, v0):
+        vec = nm.r_[u0, v0, nm.zeros_like(u0)]
+
+        aux = nls.fun(vec)
+        i3 = len(u0)
+        r = aux[:i3] + aux[i3:2*i3] + aux[2*i3:]
+
+        a0 = - r / self.get_mass(nls, vec)
+        output_array_stats(a0, 'initial acceleration', verbose=self.verbose)
+        return a0
+
+    def get_critical_time_step(self, nls, vec):
+        """
+        Estimate the critical time step of the method, see
+        :class:`CentralDifferenceTS`.
+        """
+        conf = self.conf
+        problem = self.context
+        if (conf.wave_speed is not None) and hasattr(problem, 'domain'):
+            var = next(problem.get_variables().iter_state(ordered=True))
+            cells = var.field.region.get_cells()
+            hs = var.get_element_diameters(cells, 0, square=False)
+            dim = problem.domain.shape.dim
+            dt = nm.min(hs) / (conf.wave_speed * nm.sqrt(dim))
+
+        else:
+            mass = self.get_mass(nls, vec)
+            K = abs(self.get_matrices(nls, vec)[2].tocsr())
+            omega2 = nm.max(nm.asarray(K.sum(axis=1)).ravel() / mass)
+            dt = 2.0 / nm.sqrt(omega2)
+
+        return dt
+
+    def set_time_step(self, dt):
+        """
+        Set the time step of the time stepper, keeping the current step.
+        """
+        ts = self.ts
+        n_step = int(nm.ceil((ts.t1 - ts.t0) / dt - 1e-8)) + 1
+        ts.set_from_data(ts.t0, ts.t1, n_step=n_step, step=ts.step)
+
+        nd = ts.n_digit
+        self.format = '====== time %%e (step %%%dd of %%%dd) =====' % (nd, nd)
+
+    @standard_ts_call
+    def __call__(self, vec0=None, nls=None, init_fun=None, prestep_fun=None,
+                 poststep_fun=None, status=None, **kwargs):
+        """
+        Solve elastodynamics problems by the explicit central difference
+        method.
+        """
+        nls = get_default(nls, self.nls)
+
+        vec, unpack, pack = self.get_initial_vec(
+            nls, vec0, init_fun, prestep_fun, poststep_fun)
+
+        if self.conf.dt_auto:
+            dt_crit = self.get_critical_time_step(nls, vec)
+            self.set_time_step(self.conf.dt_safety * dt_crit)
+            output('critical time step estimate: %e, time step: %e'
+                   % (dt_crit, self.ts.dt), verbose=self.verbose)
+
+        ts = self.ts
+        for step, time in ts.iter_from(ts.step):
+            output(self.format % (time, step + 1, ts.n_step),
+                   verbose=self.verbose)
+            dt = ts.dt
+
+            prestep_fun(ts, vec)
+            ut, vt, at = unpack(vec)
+            mass = self.get_mass(nls, vec)
+
+            utp = ut + dt * vt + (0.5 * dt**2) * at
+            vm = vt + (0.5 * dt) * at
+
+            aux = nls.fun(pack(utp, vm, nm.zeros_like(at)))
+            i3 = len(at)
+            rt = aux[:i3] + aux[i3:2*i3] + aux[2*i3:]
+
+            atp = - rt / mass
+            vtp = vm + (0.5 * dt) * atp
+
+            vect = pack(utp, vtp, atp)
+            poststep_fun(ts, vect)
+
+            vec = vect
+
+        return vec
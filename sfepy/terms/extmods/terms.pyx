@@ -21,7 +21,7 @@ from sfepy.discrete.common.extmods.types cimport int32, float64, complex128
 cdef extern from 'common.h':
     cdef void _errclear 'errclear'()
 
-cdef extern from 'terms.h':
+cdef extern from 'terms.h' nogil:
     cdef int32 _dq_state_in_qp \
          'dq_state_in_qp'(FMField *out, FMField *state, int32 offset,
                           FMField *bf,
@@ -507,7 +507,8 @@ def dq_state_in_qp(np.ndarray out not None,
     array2fmfield4(_bf, bf)
     array2pint2(&_conn, &n_el, &n_ep, conn)
 
-    ret = _dq_state_in_qp(_out, _state, 0, _bf, _conn, n_el, n_ep)
+    with nogil:
+        ret = _dq_state_in_qp(_out, _state, 0, _bf, _conn, n_el, n_ep)
     return ret
 
 def dq_grad(np.ndarray out not None,
@@ -523,7 +524,8 @@ def dq_grad(np.ndarray out not None,
     array2fmfield1(_state, state)
     array2pint2(&_conn, &n_el, &n_ep, conn)
 
-    ret = _dq_grad(_out, _state, 0, cmap.geo, _conn, n_el, n_ep)
+    with nogil:
+        ret = _dq_grad(_out, _state, 0, cmap.geo, _conn, n_el, n_ep)
     return ret
 
 def dq_div_vector(np.ndarray out not None,
@@ -539,7 +541,8 @@ def dq_div_vector(np.ndarray out not None,
     array2fmfield1(_state, state)
     array2pint2(&_conn, &n_el, &n_ep, conn)
 
-    ret = _dq_div_vector(_out, _state, 0, cmap.geo, _conn, n_el, n_ep)
+    with nogil:
+        ret = _dq_div_vector(_out, _state, 0, cmap.geo, _conn, n_el, n_ep)
     return ret
 
 def d_volume_surface(np.ndarray out not None,
@@ -555,7 +558,8 @@ def d_volume_surface(np.ndarray out not None,
     array2fmfield2(_in_, in_)
     array2pint2(&_conn, &n_el, &n_ep, conn)
 
-    ret = _d_volume_surface(_out, _in_, cmap.geo, _conn, n_el, n_ep)
+    with nogil:
+        ret = _d_volume_surface(_out, _in_, cmap.geo, _conn, n_el, n_ep)
     return ret
 
 def di_surface_moment(np.ndarray out not None,
@@ -571,7 +575,8 @@ def di_surface_moment(np.ndarray out not None,
     array2fmfield2(_in_, in_)
     array2pint2(&_conn, &n_el, &n_ep, conn)
 
-    ret = _di_surface_moment(_out, _in_, cmap.geo, _conn, n_el, n_ep)
+    with nogil:
+        ret = _di_surface_moment(_out, _in_, cmap.geo, _conn, n_el, n_ep)
     return ret
 
 def dq_finite_strain_tl(np.ndarray mtx_f not None,
@@ -600,9 +605,10 @@ def dq_finite_strain_tl(np.ndarray mtx_f not None,
     array2fmfield1(_state, state)
     array2pint2(&_conn, &n_el, &n_ep, conn)
 
-    ret = _dq_finite_strain_tl(_mtx_f, _det_f, _vec_cs, _tr_c, _in_2c,
-                               _vec_inv_cs, _vec_es, _state, 0, cmap.geo,
-                               _conn, n_el, n_ep)
+    with nogil:
+        ret = _dq_finite_strain_tl(_mtx_f, _det_f, _vec_cs, _tr_c, _in_2c,
+                                   _vec_inv_cs, _vec_es, _state, 0, cmap.geo,
+                                   _conn, n_el, n_ep)
     if ret:
         raise ValueError('ccore error (see above)')
 
@@ -632,9 +638,10 @@ def dq_finite_strain_ul(np.ndarray mtx_f not None,
     array2fmfield1(_state, state)
     array2pint2(&_conn, &n_el, &n_ep, conn)
 
-    ret = _dq_finite_strain_ul(_mtx_f, _det_f, _vec_bs, _tr_b, _in_2b,
-                               _vec_es, _state, 0, cmap.geo,
-                               _conn, n_el, n_ep)
+    with nogil:
+        ret = _dq_finite_strain_ul(_mtx_f, _det_f, _vec_bs, _tr_b, _in_2b,
+                                   _vec_es, _state, 0, cmap.geo,
+                                   _conn, n_el, n_ep)
     if ret:
         raise ValueError('ccore error (see above)')
 
@@ -659,9 +666,10 @@ def dq_tl_finite_strain_surface(np.ndarray mtx_f not None,
     array2pint2(&_fis, &n_fa, &n_fp, fis)
     array2pint2(&_conn, &n_el, &n_ep, conn)
 
-    ret = _dq_tl_finite_strain_surface(_mtx_f, _det_f, _mtx_fi, _state, 0,
-                                       cmap.geo,
-                                       _fis, n_fa, n_fp, _conn, n_el, n_ep)
+    with nogil:
+        ret = _dq_tl_finite_strain_surface(_mtx_f, _det_f, _mtx_fi, _state, 0,
+                                           cmap.geo,
+                                           _fis, n_fa, n_fp, _conn, n_el, n_ep)
     if ret:
         raise ValueError('ccore error (see above)')
 
@@ -679,7 +687,8 @@ def dq_tl_he_stress_bulk(np.ndarray out not None,
     array2fmfield4(_det_f, det_f)
     array2fmfield4(_vec_inv_cs, vec_inv_cs)
 
-    ret = _dq_tl_he_stress_bulk(_out, _mat, _det_f, _vec_inv_cs)
+    with nogil:
+        ret = _dq_tl_he_stress_bulk(_out, _mat, _det_f, _vec_inv_cs)
     return ret
 
 def dq_ul_he_stress_bulk(np.ndarray out not None,
@@ -692,7 +701,8 @@ def dq_ul_he_stress_bulk(np.ndarray out not None,
     array2fmfield4(_mat, mat)
     array2fmfield4(_det_f, det_f)
 
-    ret = _dq_ul_he_stress_bulk(_out, _mat, _det_f)
+    with nogil:
+        ret = _dq_ul_he_stress_bulk(_out, _mat, _det_f)
     return ret
 
 def dq_tl_he_stress_bulk_active(np.ndarray out not None,
@@ -707,7 +717,8 @@ def dq_tl_he_stress_bulk_active(np.ndarray out not None,
     array2fmfield4(_det_f, det_f)
     array2fmfield4(_vec_inv_cs, vec_inv_cs)
 
-    ret = _dq_tl_he_stress_bulk_active(_out, _mat, _det_f, _vec_inv_cs)
+    with nogil:
+        ret = _dq_tl_he_stress_bulk_active(_out, _mat, _det_f, _vec_inv_cs)
     return ret
 
 def dq_tl_he_stress_neohook(np.ndarray out not None,
@@ -724,7 +735,8 @@ def dq_tl_he_stress_neohook(np.ndarray out not None,
     array2fmfield4(_tr_c, tr_c)
     array2fmfield4(_vec_inv_cs, vec_inv_cs)
 
-    ret = _dq_tl_he_stress_neohook(_out, _mat, _det_f, _tr_c, _vec_inv_cs)
+    with nogil:
+        ret = _dq_tl_he_stress_neohook(_out, _mat, _det_f, _tr_c, _vec_inv_cs)
     return ret
 
 def dq_ul_he_stress_neohook(np.ndarray out not None,
@@ -741,7 +753,8 @@ def dq_ul_he_stress_neohook(np.ndarray out not None,
     array2fmfield4(_tr_b, tr_b)
     array2fmfield4(_vec_bs, vec_bs)
 
-    ret = _dq_ul_he_stress_neohook(_out, _mat, _det_f, _tr_b, _vec_bs)
+    with nogil:
+        ret = _dq_ul_he_stress_neohook(_out, _mat, _det_f, _tr_b, _vec_bs)
     return ret
 
 def dq_tl_he_stress_mooney_rivlin(np.ndarray out not None,
@@ -763,8 +776,9 @@ def dq_tl_he_stress_mooney_rivlin(np.ndarray out not None,
     array2fmfield4(_vec_cs, vec_cs)
     array2fmfield4(_in_2c, in_2c)
 
-    ret = _dq_tl_he_stress_mooney_rivlin(_out, _mat, _det_f, _tr_c,
-                                         _vec_inv_cs, _vec_cs, _in_2c)
+    with nogil:
+        ret = _dq_tl_he_stress_mooney_rivlin(_out, _mat, _det_f, _tr_c,
+                                             _vec_inv_cs, _vec_cs, _in_2c)
     return ret
 
 def dq_ul_he_stress_mooney_rivlin(np.ndarray out not None,
@@ -783,8 +797,9 @@ def dq_ul_he_stress_mooney_rivlin(np.ndarray out not None,
     array2fmfield4(_vec_bs, vec_bs)
     array2fmfield4(_in_2b, in_2b)
 
-    ret = _dq_ul_he_stress_mooney_rivlin(_out, _mat, _det_f, _tr_b,
-                                         _vec_bs, _in_2b)
+    with nogil:
+        ret = _dq_ul_he_stress_mooney_rivlin(_out, _mat, _det_f, _tr_b,
+                                             _vec_bs, _in_2b)
     return ret
 
 def dq_tl_he_tan_mod_bulk(np.ndarray out not None,
@@ -799,7 +814,8 @@ def dq_tl_he_tan_mod_bulk(np.ndarray out not None,
     array2fmfield4(_det_f, det_f)
     array2fmfield4(_vec_inv_cs, vec_inv_cs)
 
-    ret = _dq_tl_he_tan_mod_bulk(_out, _mat, _det_f, _vec_inv_cs)
+    with nogil:
+        ret = _dq_tl_he_tan_mod_bulk(_out, _mat, _det_f, _vec_inv_cs)
     return ret
 
 def dq_ul_he_tan_mod_bulk(np.ndarray out not None,
@@ -812,7 +828,8 @@ def dq_ul_he_tan_mod_bulk(np.ndarray out not None,
     array2fmfield4(_mat, mat)
     array2fmfield4(_det_f, det_f)
 
-    ret = _dq_ul_he_tan_mod_bulk(_out, _mat, _det_f)
+    with nogil:
+        ret = _dq_ul_he_tan_mod_bulk(_out, _mat, _det_f)
     return ret
 
 def dq_tl_he_tan_mod_bulk_active(np.ndarray out not None,
@@ -827,7 +844,8 @@ def dq_tl_he_tan_mod_bulk_active(np.ndarray out not None,
     array2fmfield4(_det_f, det_f)
     array2fmfield4(_vec_inv_cs, vec_inv_cs)
 
-    ret = _dq_tl_he_tan_mod_bulk_active(_out, _mat, _det_f, _vec_inv_cs)
+    with nogil:
+        ret = _dq_tl_he_tan_mod_bulk_active(_out, _mat, _det_f, _vec_inv_cs)
     return ret
 
 def dq_tl_he_tan_mod_neohook(np.ndarray out not None,
@@ -844,7 +862,8 @@ def dq_tl_he_tan_mod_neohook(np.ndarray out not None,
     array2fmfield4(_tr_c, tr_c)
     array2fmfield4(_vec_inv_cs, vec_inv_cs)
 
-    ret = _dq_tl_he_tan_mod_neohook(_out, _mat, _det_f, _tr_c, _vec_inv_cs)
+    with nogil:
+        ret = _dq_tl_he_tan_mod_neohook(_out, _mat, _det_f, _tr_c, _vec_inv_cs)
     return ret
 
 def dq_ul_he_tan_mod_neohook(np.ndarray out not None,
@@ -861,7 +880,8 @@ def dq_ul_he_tan_mod_neohook(np.ndarray out not None,
     array2fmfield4(_tr_b, tr_b)
     array2fmfield4(_vec_bs, vec_bs)
 
-    ret = _dq_ul_he_tan_mod_neohook(_out, _mat, _det_f, _tr_b, _vec_bs)
+    with nogil:
+        ret = _dq_ul_he_tan_mod_neohook(_out, _mat, _det_f, _tr_b, _vec_bs)
     return ret
 
 def dq_tl_he_tan_mod_mooney_rivlin(np.ndarray out not None,
@@ -883,8 +903,9 @@ def dq_tl_he_tan_mod_mooney_rivlin(np.ndarray out not None,
     array2fmfield4(_vec_cs, vec_cs)
     array2fmfield4(_in_2c, in_2c)
 
-    ret = _dq_tl_he_tan_mod_mooney_rivlin(_out, _mat, _det_f, _tr_c,
-                                          _vec_inv_cs, _vec_cs, _in_2c)
+    with nogil:
+        ret = _dq_tl_he_tan_mod_mooney_rivlin(_out, _mat, _det_f, _tr_c,
+                                              _vec_inv_cs, _vec_cs, _in_2c)
     return ret
 
 def dq_ul_he_tan_mod_mooney_rivlin(np.ndarray out not None,
@@ -903,8 +924,9 @@ def dq_ul_he_tan_mod_mooney_rivlin(np.ndarray out not None,
     array2fmfield4(_vec_bs, vec_bs)
     array2fmfield4(_in_2b, in_2b)
 
-    ret = _dq_ul_he_tan_mod_mooney_rivlin(_out, _mat, _det_f, _tr_b,
-                                          _vec_bs, _in_2b)
+    with nogil:
+        ret = _dq_ul_he_tan_mod_mooney_rivlin(_out, _mat, _det_f, _tr_b,
+                                              _vec_bs, _in_2b)
     return ret
 
 def dw_he_rtm(np.ndarray out not None,
@@ -923,8 +945,9 @@ def dw_he_rtm(np.ndarray out not None,
     array2fmfield4(_mtx_f, mtx_f)
     array2fmfield4(_det_f, det_f)
 
-    ret = _dw_he_rtm(_out, _stress, _tan_mod, _mtx_f, _det_f,
-                     cmap.geo, is_diff, mode_ul)
+    with nogil:
+        ret = _dw_he_rtm(_out, _stress, _tan_mod, _mtx_f, _det_f,
+                         cmap.geo, is_diff, mode_ul)
     return ret
 
 def de_he_rtm(np.ndarray out not None,
@@ -943,8 +966,9 @@ def de_he_rtm(np.ndarray out not None,
     array2fmfield4(_det_f, det_f)
     array2pint1(&_el_list, &n_el, el_list)
 
-    ret = _de_he_rtm(_out, _stress, _det_f,
-                     cmap.geo, _el_list, n_el, mode_ul)
+    with nogil:
+        ret = _de_he_rtm(_out, _stress, _det_f,
+                         cmap.geo, _el_list, n_el, mode_ul)
     return ret
 
 def dq_tl_stress_bulk_pressure(np.ndarray out not None,
@@ -959,7 +983,9 @@ def dq_tl_stress_bulk_pressure(np.ndarray out not None,
     array2fmfield4(_det_f, det_f)
     array2fmfield4(_vec_inv_cs, vec_inv_cs)
 
-    ret = _dq_tl_stress_bulk_pressure(_out, _pressure_qp, _det_f, _vec_inv_cs)
+    with nogil:
+        ret = _dq_tl_stress_bulk_pressure(_out, _pressure_qp, _det_f,
+                                          _vec_inv_cs)
     return ret
 
 def dq_ul_stress_bulk_pressure(np.ndarray out not None,
@@ -972,7 +998,8 @@ def dq_ul_stress_bulk_pressure(np.ndarray out not None,
     array2fmfield4(_pressure_qp, pressure_qp)
     array2fmfield4(_det_f, det_f)
 
-    ret = _dq_ul_stress_bulk_pressure(_out, _pressure_qp, _det_f)
+    with nogil:
+        ret = _dq_ul_stress_bulk_pressure(_out, _pressure_qp, _det_f)
     return ret
 
 def dq_tl_tan_mod_bulk_pressure_u(np.ndarray out not None,
@@ -987,8 +1014,9 @@ def dq_tl_tan_mod_bulk_pressure_u(np.ndarray out not None,
     array2fmfield4(_det_f, det_f)
     array2fmfield4(_vec_inv_cs, vec_inv_cs)
 
-    ret = _dq_tl_tan_mod_bulk_pressure_u(_out, _pressure_qp, _det_f,
-                                         _vec_inv_cs)
+    with nogil:
+        ret = _dq_tl_tan_mod_bulk_pressure_u(_out, _pressure_qp, _det_f,
+                                             _vec_inv_cs)
     return ret
 
 def dq_ul_tan_mod_bulk_pressure_u(np.ndarray out not None,
@@ -1001,7 +1029,8 @@ def dq_ul_tan_mod_bulk_pressure_u(np.ndarray out not None,
     array2fmfield4(_pressure_qp, pressure_qp)
     array2fmfield4(_det_f, det_f)
 
-    ret = _dq_ul_tan_mod_bulk_pressure_u(_out, _pressure_qp, _det_f)
+    with nogil:
+        ret = _dq_ul_tan_mod_bulk_pressure_u(_out, _pressure_qp, _det_f)
     return ret
 
 def dw_tl_volume(np.ndarray out not None,
@@ -1019,8 +1048,9 @@ def dw_tl_volume(np.ndarray out not None,
     array2fmfield4(_vec_inv_cs, vec_inv_cs)
     array2fmfield4(_det_f, det_f)
 
-    ret = _dw_tl_volume(_out, _mtx_f, _vec_inv_cs, _det_f,
-                        cmap_s.geo, cmap_v.geo, transpose, mode)
+    with nogil:
+        ret = _dw_tl_volume(_out, _mtx_f, _vec_inv_cs, _det_f,
+                            cmap_s.geo, cmap_v.geo, transpose, mode)
     return ret
 
 def dw_ul_volume(np.ndarray out not None,
@@ -1034,7 +1064,9 @@ def dw_ul_volume(np.ndarray out not None,
     array2fmfield4(_out, out)
     array2fmfield4(_det_f, det_f)
 
-    ret = _dw_ul_volume(_out, _det_f, cmap_s.geo, cmap_v.geo, transpose, mode)
+    with nogil:
+        ret = _dw_ul_volume(_out, _det_f, cmap_s.geo, cmap_v.geo,
+                            transpose, mode)
     return ret
 
 def dw_tl_diffusion(np.ndarray out not None,
@@ -1056,8 +1088,9 @@ def dw_tl_diffusion(np.ndarray out not None,
     array2fmfield4(_mtx_f, mtx_f)
     array2fmfield4(_det_f, det_f)
 
-    ret = _dw_tl_diffusion(_out, _pressure_grad, _mtx_d, _ref_porosity,
-                           _mtx_f, _det_f, cmap.geo, mode)
+    with nogil:
+        ret = _dw_tl_diffusion(_out, _pressure_grad, _mtx_d, _ref_porosity,
+                               _mtx_f, _det_f, cmap.geo, mode)
     return ret
 
 def d_tl_surface_flux(np.ndarray out not None,
@@ -1079,8 +1112,9 @@ def d_tl_surface_flux(np.ndarray out not None,
     array2fmfield4(_mtx_fi, mtx_fi)
     array2fmfield4(_det_f, det_f)
 
-    ret = _d_tl_surface_flux(_out, _pressure_grad, _mtx_d, _ref_porosity,
-                             _mtx_fi, _det_f, cmap.geo, mode)
+    with nogil:
+        ret = _d_tl_surface_flux(_out, _pressure_grad, _mtx_d, _ref_porosity,
+                                 _mtx_fi, _det_f, cmap.geo, mode)
     return ret
 
 def dw_tl_surface_traction(np.ndarray out not None,
@@ -1103,8 +1137,9 @@ def dw_tl_surface_traction(np.ndarray out not None,
     array2fmfield4(_bf, bf)
     array2pint2(&_fis, &n_fa, &n_fp, fis)
 
-    ret = _dw_tl_surface_traction(_out, _traction, _det_f, _mtx_fi, _bf,
-                                       cmap.geo, _fis, n_fa, n_fp, mode)
+    with nogil:
+        ret = _dw_tl_surface_traction(_out, _traction, _det_f, _mtx_fi, _bf,
+                                           cmap.geo, _fis, n_fa, n_fp, mode)
     return ret
 
 def d_tl_volume_surface(np.ndarray out not None,
@@ -1126,8 +1161,9 @@ def d_tl_volume_surface(np.ndarray out not None,
     array2fmfield4(_bf, bf)
     array2pint2(&_conn, &n_fa, &n_fp, conn)
 
-    ret = _d_tl_volume_surface(_out, _coors, _det_f, _mtx_fi, _bf,
-                               cmap.geo, _conn, n_fa, n_fp)
+    with nogil:
+        ret = _d_tl_volume_surface(_out, _coors, _det_f, _mtx_fi, _bf,
+                                   cmap.geo, _conn, n_fa, n_fp)
     return ret
 
 def dq_def_grad(np.ndarray out not None,
@@ -1144,7 +1180,8 @@ def dq_def_grad(np.ndarray out not None,
     array2fmfield1(_state, state)
     array2pint2(&_conn, &n_el, &n_ep, conn)
 
-    ret = _dq_def_grad(_out, _state, cmap.geo, _conn, n_el, n_ep, mode)
+    with nogil:
+        ret = _dq_def_grad(_out, _state, cmap.geo, _conn, n_el, n_ep, mode)
     return ret
 
 def he_residuum_from_mtx(np.ndarray out not None,
@@ -1163,8 +1200,9 @@ def he_residuum_from_mtx(np.ndarray out not None,
     array2pint2(&_conn, &n_el, &n_ep, conn)
     array2pint1(&_el_list, &n_el2, el_list)
 
-    ret = _he_residuum_from_mtx(_out, _mtx_d, _state,
-                                _conn, n_el, n_ep, _el_list, n_el2)
+    with nogil:
+        ret = _he_residuum_from_mtx(_out, _mtx_d, _state,
+                                    _conn, n_el, n_ep, _el_list, n_el2)
     return ret
 
 def he_eval_from_mtx(np.ndarray out not None,
@@ -1185,8 +1223,9 @@ def he_eval_from_mtx(np.ndarray out not None,
     array2pint2(&_conn, &n_el, &n_ep, conn)
     array2pint1(&_el_list, &n_el2, el_list)
 
-    ret = _he_eval_from_mtx(_out, _mtx_d, _state_v, _state_u,
-                            _conn, n_el, n_ep, _el_list, n_el2)
+    with nogil:
+        ret = _he_eval_from_mtx(_out, _mtx_d, _state_v, _state_u,
+                                _conn, n_el, n_ep, _el_list, n_el2)
     return ret
 
 def dw_laplace(np.ndarray out not None,
@@ -1201,7 +1240,8 @@ def dw_laplace(np.ndarray out not None,
     array2fmfield4(_grad, grad)
     array2fmfield4(_coef, coef)
 
-    ret = _dw_laplace(_out, _grad, _coef, cmap.geo, is_diff)
+    with nogil:
+        ret = _dw_laplace(_out, _grad, _coef, cmap.geo, is_diff)
     return ret
 
 def d_laplace(np.ndarray out not None,
@@ -1217,7 +1257,8 @@ def d_laplace(np.ndarray out not None,
     array2fmfield4(_grad_p2, grad_p2)
     array2fmfield4(_coef, coef)
 
-    ret = _d_laplace(_out, _grad_p1, _grad_p2, _coef, cmap.geo)
+    with nogil:
+        ret = _d_laplace(_out, _grad_p1, _grad_p2, _coef, cmap.geo)
     return ret
 
 def dw_diffusion(np.ndarray out not None,
@@ -1232,7 +1273,8 @@ def dw_diffusion(np.ndarray out not None,
     array2fmfield4(_grad, grad)
     array2fmfield4(_mtx_d, mtx_d)
 
-    ret = _dw_diffusion(_out, _grad, _mtx_d, cmap.geo, is_diff)
+    with nogil:
+        ret = _dw_diffusion(_out, _grad, _mtx_d, cmap.geo, is_diff)
     return ret
 
 def d_diffusion(np.ndarray out not None,
@@ -1248,7 +1290,8 @@ def d_diffusion(np.ndarray out not None,
     array2fmfield4(_grad_p2, grad_p2)
     array2fmfield4(_mtx_d, mtx_d)
 
-    ret = _d_diffusion(_out, _grad_p1, _grad_p2, _mtx_d, cmap.geo)
+    with nogil:
+        ret = _d_diffusion(_out, _grad_p1, _grad_p2, _mtx_d, cmap.geo)
     return ret
 
 def dw_diffusion_r(np.ndarray out not None,
@@ -1260,7 +1303,8 @@ def dw_diffusion_r(np.ndarray out not None,
     array2fmfield4(_out, out)
     array2fmfield4(_mtx_d, mtx_d)
 
-    ret = _dw_diffusion_r(_out, _mtx_d, cmap.geo)
+    with nogil:
+        ret = _dw_diffusion_r(_out, _mtx_d, cmap.geo)
     return ret
 
 def d_surface_flux(np.ndarray out not None,
@@ -1275,7 +1319,8 @@ def d_surface_flux(np.ndarray out not None,
     array2fmfield4(_grad, grad)
     array2fmfield4(_mtx_d, mtx_d)
 
-    ret = _d_surface_flux(_out, _grad, _mtx_d, cmap.geo, mode)
+    with nogil:
+        ret = _d_surface_flux(_out, _grad, _mtx_d, cmap.geo, mode)
     return ret
 
 def dw_surface_flux(np.ndarray out not None,
@@ -1296,8 +1341,9 @@ def dw_surface_flux(np.ndarray out not None,
     array2fmfield4(_bf, bf)
     array2pint2(&_fis, &n_fa, &n_fp, fis)
 
-    ret = _dw_surface_flux(_out, _grad, _mat, _bf,
-                           cmap.geo, _fis, n_fa, n_fp, mode)
+    with nogil:
+        ret = _dw_surface_flux(_out, _grad, _mat, _bf,
+                               cmap.geo, _fis, n_fa, n_fp, mode)
     return ret
 
 def dw_convect_v_grad_s(np.ndarray out not None,
@@ -1313,8 +1359,9 @@ def dw_convect_v_grad_s(np.ndarray out not None,
     array2fmfield4(_val_v, val_v)
     array2fmfield4(_grad_s, grad_s)
 
-    ret = _dw_convect_v_grad_s(_out, _val_v, _grad_s,
-                               cmap_v.geo, cmap_s.geo, is_diff)
+    with nogil:
+        ret = _dw_convect_v_grad_s(_out, _val_v, _grad_s,
+                                   cmap_v.geo, cmap_s.geo, is_diff)
     return ret
 
 def dw_lin_elastic(np.ndarray out not None,
@@ -1330,7 +1377,8 @@ def dw_lin_elastic(np.ndarray out not None,
     array2fmfield4(_strain, strain)
     array2fmfield4(_mtx_d, mtx_d)
 
-    ret = _dw_lin_elastic(_out, coef, _strain, _mtx_d, cmap.geo, is_diff)
+    with nogil:
+        ret = _dw_lin_elastic(_out, coef, _strain, _mtx_d, cmap.geo, is_diff)
     return ret
 
 def d_lin_elastic(np.ndarray out not None,
@@ -1347,7 +1395,9 @@ def d_lin_elastic(np.ndarray out not None,
     array2fmfield4(_strain_v, strain_v)
     array2fmfield4(_mtx_d, mtx_d)
 
-    ret = _d_lin_elastic(_out, coef, _strain_u, _strain_v, _mtx_d, cmap.geo)
+    with nogil:
+        ret = _d_lin_elastic(_out, coef, _strain_u, _strain_v, _mtx_d,
+                             cmap.geo)
     return ret
 
 def d_sd_lin_elastic(np.ndarray out not None,
@@ -1366,8 +1416,9 @@ def d_sd_lin_elastic(np.ndarray out not None,
     array2fmfield4(_grad_w, grad_w)
     array2fmfield4(_mtx_d, mtx_d)
 
-    ret = _d_sd_lin_elastic(_out, coef, _grad_u, _grad_v, _grad_w,
-                            _mtx_d, cmap.geo)
+    with nogil:
+        ret = _d_sd_lin_elastic(_out, coef, _grad_u, _grad_v, _grad_w,
+                                _mtx_d, cmap.geo)
     return ret
 
 def dw_lin_prestress(np.ndarray out not None,
@@ -1379,7 +1430,8 @@ def dw_lin_prestress(np.ndarray out not None,
     array2fmfield4(_out, out)
     array2fmfield4(_stress, stress)
 
-    ret = _dw_lin_prestress(_out, _stress, cmap.geo)
+    with nogil:
+        ret = _dw_lin_prestress(_out, _stress, cmap.geo)
     return ret
 
 def dw_lin_strain_fib(np.ndarray out not None,
@@ -1393,7 +1445,8 @@ def dw_lin_strain_fib(np.ndarray out not None,
     array2fmfield4(_mtx_d, mtx_d)
     array2fmfield4(_mat, mat)
 
-    ret = _dw_lin_strain_fib(_out, _mtx_d, _mat, cmap.geo)
+    with nogil:
+        ret = _dw_lin_strain_fib(_out, _mtx_d, _mat, cmap.geo)
     return ret
 
 def de_cauchy_strain(np.ndarray out not None,
@@ -1406,7 +1459,8 @@ def de_cauchy_strain(np.ndarray out not None,
     array2fmfield4(_out, out)
     array2fmfield4(_strain, strain)
 
-    ret = _de_cauchy_strain(_out, _strain, cmap.geo, mode)
+    with nogil:
+        ret = _de_cauchy_strain(_out, _strain, cmap.geo, mode)
     return ret
 
 def de_cauchy_stress(np.ndarray out not None,
@@ -1421,7 +1475,8 @@ def de_cauchy_stress(np.ndarray out not None,
     array2fmfield4(_strain, strain)
     array2fmfield4(_mtx_d, mtx_d)
 
-    ret = _de_cauchy_stress(_out, _strain, _mtx_d, cmap.geo, mode)
+    with nogil:
+        ret = _de_cauchy_stress(_out, _strain, _mtx_d, cmap.geo, mode)
     return ret
 
 def dq_cauchy_strain(np.ndarray out not None,
@@ -1437,7 +1492,8 @@ def dq_cauchy_strain(np.ndarray out not None,
     array2fmfield1(_state, state)
     array2pint2(&_conn, &n_el, &n_ep, conn)
 
-    ret = _dq_cauchy_strain(_out, _state, 0, cmap.geo, _conn, n_el, n_ep)
+    with nogil:
+        ret = _dq_cauchy_strain(_out, _state, 0, cmap.geo, _conn, n_el, n_ep)
     return ret
 
 def dw_nonsym_elastic(np.ndarray out not None,
@@ -1452,7 +1508,8 @@ def dw_nonsym_elastic(np.ndarray out not None,
     array2fmfield4(_grad, grad)
     array2fmfield4(_mtx_d, mtx_d)
 
-    ret = _dw_nonsym_elastic(_out, _grad, _mtx_d, cmap.geo, is_diff)
+    with nogil:
+        ret = _dw_nonsym_elastic(_out, _grad, _mtx_d, cmap.geo, is_diff)
     return ret
 
 def dw_surface_ltr(np.ndarray out not None,
@@ -1464,7 +1521,8 @@ def dw_surface_ltr(np.ndarray out not None,
     array2fmfield4(_out, out)
     array2fmfield4(_traction, traction)
 
-    ret = _dw_surface_ltr(_out, _traction, cmap.geo)
+    with nogil:
+        ret = _dw_surface_ltr(_out, _traction, cmap.geo)
     return ret
 
 def dw_volume_lvf(np.ndarray out not None,
@@ -1476,7 +1534,8 @@ def dw_volume_lvf(np.ndarray out not None,
     array2fmfield4(_out, out)
     array2fmfield4(_force_qp, force_qp)
 
-    ret = _dw_volume_lvf(_out, _force_qp, cmap.geo)
+    with nogil:
+        ret = _dw_volume_lvf(_out, _force_qp, cmap.geo)
     return ret
 
 def dw_surface_v_dot_n_s(np.ndarray out not None,
@@ -1493,8 +1552,9 @@ def dw_surface_v_dot_n_s(np.ndarray out not None,
     array2fmfield4(_coef, coef)
     array2fmfield4(_val_qp, val_qp)
 
-    ret = _dw_surface_v_dot_n_s(_out, _coef, _val_qp,
-                                rcmap.geo, ccmap.geo, is_diff)
+    with nogil:
+        ret = _dw_surface_v_dot_n_s(_out, _coef, _val_qp,
+                                    rcmap.geo, ccmap.geo, is_diff)
     return ret
 
 def dw_surface_s_v_dot_n(np.ndarray out not None,
@@ -1511,8 +1571,9 @@ def dw_surface_s_v_dot_n(np.ndarray out not None,
     array2fmfield4(_coef, coef)
     array2fmfield4(_val_qp, val_qp)
 
-    ret = _dw_surface_s_v_dot_n(_out, _coef, _val_qp,
-                                rcmap.geo, ccmap.geo, is_diff)
+    with nogil:
+        ret = _dw_surface_s_v_dot_n(_out, _coef, _val_qp,
+                                    rcmap.geo, ccmap.geo, is_diff)
     return ret
 
 def dw_volume_dot_vector(np.ndarray out not None,
@@ -1528,8 +1589,9 @@ def dw_volume_dot_vector(np.ndarray out not None,
     array2fmfield4(_coef, coef)
     array2fmfield4(_val_qp, val_qp)
 
-    ret = _dw_volume_dot_vector(_out, _coef, _val_qp,
-                                rcmap.geo, ccmap.geo, is_diff)
+    with nogil:
+        ret = _dw_volume_dot_vector(_out, _coef, _val_qp,
+                                    rcmap.geo, ccmap.geo, is_diff)
     return ret
 
 def dw_volume_dot_scalar(np.ndarray out not None,
@@ -1545,8 +1607,9 @@ def dw_volume_dot_scalar(np.ndarray out not None,
     array2fmfield4(_coef, coef)
     array2fmfield4(_val_qp, val_qp)
 
-    ret = _dw_volume_dot_scalar(_out, _coef, _val_qp,
-                                rcmap.geo, ccmap.geo, is_diff)
+    with nogil:
+        ret = _dw_volume_dot_scalar(_out, _coef, _val_qp,
+                                    rcmap.geo, ccmap.geo, is_diff)
     return ret
 
 def dw_v_dot_grad_s_vw(np.ndarray out not None,
@@ -1562,8 +1625,9 @@ def dw_v_dot_grad_s_vw(np.ndarray out not None,
     array2fmfield4(_coef, coef)
     array2fmfield4(_grad, grad)
 
-    ret = _dw_v_dot_grad_s_vw(_out, _coef, _grad,
-                              cmap_v.geo, cmap_s.geo, is_diff)
+    with nogil:
+        ret = _dw_v_dot_grad_s_vw(_out, _coef, _grad,
+                                  cmap_v.geo, cmap_s.geo, is_diff)
     return ret
 
 def dw_v_dot_grad_s_sw(np.ndarray out not None,
@@ -1579,8 +1643,9 @@ def dw_v_dot_grad_s_sw(np.ndarray out not None,
     array2fmfield4(_coef, coef)
     array2fmfield4(_val_qp, val_qp)
 
-    ret = _dw_v_dot_grad_s_sw(_out, _coef, _val_qp,
-                              cmap_v.geo, cmap_s.geo, is_diff)
+    with nogil:
+        ret = _dw_v_dot_grad_s_sw(_out, _coef, _val_qp,
+                                  cmap_v.geo, cmap_s.geo, is_diff)
     return ret
 
 def term_ns_asm_div_grad(np.ndarray out not None,
@@ -1595,7 +1660,8 @@ def term_ns_asm_div_grad(np.ndarray out not None,
     array2fmfield4(_grad, grad)
     array2fmfield4(_viscosity, viscosity)
 
-    ret = _term_ns_asm_div_grad(_out, _grad, _viscosity, cmap.geo, is_diff)
+    with nogil:
+        ret = _term_ns_asm_div_grad(_out, _grad, _viscosity, cmap.geo, is_diff)
     return ret
 
 def term_ns_asm_convect(np.ndarray out not None,
@@ -1610,7 +1676,8 @@ def term_ns_asm_convect(np.ndarray out not None,
     array2fmfield4(_grad, grad)
     array2fmfield4(_state, state)
 
-    ret = _term_ns_asm_convect(_out, _grad, _state, cmap.geo, is_diff)
+    with nogil:
+        ret = _term_ns_asm_convect(_out, _grad, _state, cmap.geo, is_diff)
     return ret
 
 def dw_lin_convect(np.ndarray out not None,
@@ -1625,7 +1692,8 @@ def dw_lin_convect(np.ndarray out not None,
     array2fmfield4(_grad, grad)
     array2fmfield4(_state_b, state_b)
 
-    ret = _dw_lin_convect(_out, _grad, _state_b, cmap.geo, is_diff)
+    with nogil:
+        ret = _dw_lin_convect(_out, _grad, _state_b, cmap.geo, is_diff)
     return ret
 
 def dw_div(np.ndarray out not None,
@@ -1641,7 +1709,8 @@ def dw_div(np.ndarray out not None,
     array2fmfield4(_coef, coef)
     array2fmfield4(_div, div)
 
-    ret = _dw_div(_out, _coef, _div, cmap_s.geo, cmap_v.geo, is_diff)
+    with nogil:
+        ret = _dw_div(_out, _coef, _div, cmap_s.geo, cmap_v.geo, is_diff)
     return ret
 
 def dw_grad(np.ndarray out not None,
@@ -1657,7 +1726,8 @@ def dw_grad(np.ndarray out not None,
     array2fmfield4(_coef, coef)
     array2fmfield4(_state, state)
 
-    ret = _dw_grad(_out, _coef, _state, cmap_s.geo, cmap_v.geo, is_diff)
+    with nogil:
+        ret = _dw_grad(_out, _coef, _state, cmap_s.geo, cmap_v.geo, is_diff)
     return ret
 
 def dw_st_pspg_c(np.ndarray out not None,
@@ -1679,8 +1749,9 @@ def dw_st_pspg_c(np.ndarray out not None,
     array2fmfield4(_coef, coef)
     array2pint2(&_conn, &n_el, &n_ep, conn)
 
-    ret = _dw_st_pspg_c(_out, _state_b, _state_u, _coef,
-                        cmap_p.geo, cmap_u.geo, _conn, n_el, n_ep, is_diff)
+    with nogil:
+        ret = _dw_st_pspg_c(_out, _state_b, _state_u, _coef,
+                            cmap_p.geo, cmap_u.geo, _conn, n_el, n_ep, is_diff)
     return ret
 
 def dw_st_supg_p(np.ndarray out not None,
@@ -1698,8 +1769,9 @@ def dw_st_supg_p(np.ndarray out not None,
     array2fmfield4(_grad_p, grad_p)
     array2fmfield4(_coef, coef)
 
-    ret = _dw_st_supg_p(_out, _state_b, _grad_p, _coef,
-                        cmap_u.geo, cmap_p.geo, is_diff)
+    with nogil:
+        ret = _dw_st_supg_p(_out, _state_b, _grad_p, _coef,
+                            cmap_u.geo, cmap_p.geo, is_diff)
     return ret
 
 def dw_st_supg_c(np.ndarray out not None,
@@ -1720,8 +1792,9 @@ def dw_st_supg_c(np.ndarray out not None,
     array2fmfield4(_coef, coef)
     array2pint2(&_conn, &n_el, &n_ep, conn)
 
-    ret = _dw_st_supg_c(_out, _state_b, _state_u, _coef,
-                        cmap.geo, _conn, n_el, n_ep, is_diff)
+    with nogil:
+        ret = _dw_st_supg_c(_out, _state_b, _state_u, _coef,
+                            cmap.geo, _conn, n_el, n_ep, is_diff)
     return ret
 
 def dw_st_grad_div(np.ndarray out not None,
@@ -1736,7 +1809,8 @@ def dw_st_grad_div(np.ndarray out not None,
     array2fmfield4(_div, div)
     array2fmfield4(_coef, coef)
 
-    ret = _dw_st_grad_div(_out, _div, _coef, cmap.geo, is_diff)
+    with nogil:
+        ret = _dw_st_grad_div(_out, _div, _coef, cmap.geo, is_diff)
     return ret
 
 def dw_biot_grad(np.ndarray out not None,
@@ -1753,8 +1827,9 @@ def dw_biot_grad(np.ndarray out not None,
     array2fmfield4(_pressure_qp, pressure_qp)
     array2fmfield4(_mtx_d, mtx_d)
 
-    ret = _dw_biot_grad(_out, coef, _pressure_qp, _mtx_d,
-                        cmap_s.geo, cmap_v.geo, is_diff)
+    with nogil:
+        ret = _dw_biot_grad(_out, coef, _pressure_qp, _mtx_d,
+                            cmap_s.geo, cmap_v.geo, is_diff)
     return ret
 
 def dw_biot_div(np.ndarray out not None,
@@ -1771,8 +1846,9 @@ def dw_biot_div(np.ndarray out not None,
     array2fmfield4(_strain, strain)
     array2fmfield4(_mtx_d, mtx_d)
 
-    ret = _dw_biot_div(_out, coef, _strain, _mtx_d,
-                       cmap_s.geo, cmap_v.geo, is_diff)
+    with nogil:
+        ret = _dw_biot_div(_out, coef, _strain, _mtx_d,
+                           cmap_s.geo, cmap_v.geo, is_diff)
     return ret
 
 def d_biot_div(np.ndarray out not None,
@@ -1789,7 +1865,8 @@ def d_biot_div(np.ndarray out not None,
     array2fmfield4(_strain, strain)
     array2fmfield4(_mtx_d, mtx_d)
 
-    ret = _d_biot_div(_out, coef, _state, _strain, _mtx_d, cmap.geo)
+    with nogil:
+        ret = _d_biot_div(_out, coef, _state, _strain, _mtx_d, cmap.geo)
     return ret
 
 def dw_piezo_coupling(np.ndarray out not None,
@@ -1806,8 +1883,9 @@ def dw_piezo_coupling(np.ndarray out not None,
     array2fmfield4(_charge_grad, charge_grad)
     array2fmfield4(_mtx_g, mtx_g)
 
-    ret = _dw_piezo_coupling(_out, _strain, _charge_grad, _mtx_g,
-                             cmap.geo, mode)
+    with nogil:
+        ret = _dw_piezo_coupling(_out, _strain, _charge_grad, _mtx_g,
+                                 cmap.geo, mode)
     return ret
 
 def d_piezo_coupling(np.ndarray out not None,
@@ -1823,7 +1901,8 @@ def d_piezo_coupling(np.ndarray out not None,
     array2fmfield4(_charge_grad, charge_grad)
     array2fmfield4(_mtx_g, mtx_g)
 
-    ret = _d_piezo_coupling(_out, _strain, _charge_grad, _mtx_g, cmap.geo)
+    with nogil:
+        ret = _d_piezo_coupling(_out, _strain, _charge_grad, _mtx_g, cmap.geo)
     return ret
 
 def dw_electric_source(np.ndarray out not None,
@@ -1837,7 +1916,8 @@ def dw_electric_source(np.ndarray out not None,
     array2fmfield4(_grad, grad)
     array2fmfield4(_coef, coef)
 
-    ret = _dw_electric_source(_out, _grad, _coef, cmap.geo)
+    with nogil:
+        ret = _dw_electric_source(_out, _grad, _coef, cmap.geo)
     return ret
 
 def d_sd_diffusion(np.ndarray out not None,
@@ -1857,8 +1937,9 @@ def d_sd_diffusion(np.ndarray out not None,
     array2fmfield4(_div_w, div_w)
     array2fmfield4(_mtx_d, mtx_d)
 
-    ret = _d_sd_diffusion(_out, _grad_q, _grad_p, _grad_w, _div_w,
-                          _mtx_d, cmap.geo)
+    with nogil:
+        ret = _d_sd_diffusion(_out, _grad_q, _grad_p, _grad_w, _div_w,
+                              _mtx_d, cmap.geo)
     return ret
 
 def mulAB_integrate(np.ndarray out not None,
@@ -1891,7 +1972,8 @@ def mulAB_integrate(np.ndarray out not None,
     else:
         imode = -1
 
-    ret = _mulAB_integrate(_out, _A, _B, cmap.geo, imode)
+    with nogil:
+        ret = _mulAB_integrate(_out, _A, _B, cmap.geo, imode)
     return ret
 
 def actBfT(np.ndarray out not None,
@@ -1904,7 +1986,8 @@ def actBfT(np.ndarray out not None,
     array2fmfield4(_bf, bf)
     array2fmfield4(_A, A)
 
-    ret = _actBfT(_out, _bf, _A)
+    with nogil:
+        ret = _actBfT(_out, _bf, _A)
     return ret
 
 def sym2nonsym(np.ndarray out not None,
@@ -1915,7 +1998,8 @@ def sym2nonsym(np.ndarray out not None,
     array2fmfield4(_out, out)
     array2fmfield4(_A, A)
 
-    ret = _sym2nonsym(_out, _A)
+    with nogil:
+        ret = _sym2nonsym(_out, _A)
     return ret
 
 def dw_adj_convect1(np.ndarray out not None,
@@ -1930,7 +2014,8 @@ def dw_adj_convect1(np.ndarray out not None,
     array2fmfield4(_state_w, state_w)
     array2fmfield4(_grad_u, grad_u)
 
-    ret = _dw_adj_convect1(_out, _state_w, _grad_u, cmap.geo, is_diff)
+    with nogil:
+        ret = _dw_adj_convect1(_out, _state_w, _grad_u, cmap.geo, is_diff)
     return ret
 
 def dw_adj_convect2(np.ndarray out not None,
@@ -1945,7 +2030,8 @@ def dw_adj_convect2(np.ndarray out not None,
     array2fmfield4(_state_w, state_w)
     array2fmfield4(_state_u, state_u)
 
-    ret = _dw_adj_convect2(_out, _state_w, _state_u, cmap.geo, is_diff)
+    with nogil:
+        ret = _dw_adj_convect2(_out, _state_w, _state_u, cmap.geo, is_diff)
     return ret
 
 def dw_st_adj_supg_c(np.ndarray out not None,
@@ -1968,8 +2054,9 @@ def dw_st_adj_supg_c(np.ndarray out not None,
     array2fmfield4(_coef, coef)
     array2pint2(&_conn, &n_el, &n_ep, conn)
 
-    ret = _dw_st_adj_supg_c(_out, _state_w, _state_u, _grad_u, _coef,
-                            cmap.geo, _conn, n_el, n_ep, is_diff)
+    with nogil:
+        ret = _dw_st_adj_supg_c(_out, _state_w, _state_u, _grad_u, _coef,
+                                cmap.geo, _conn, n_el, n_ep, is_diff)
     return ret
 
 def dw_st_adj1_supg_p(np.ndarray out not None,
@@ -1990,8 +2077,9 @@ def dw_st_adj1_supg_p(np.ndarray out not None,
     array2fmfield4(_coef, coef)
     array2pint2(&_conn_w, &n_el_w, &n_ep_w, conn_w)
 
-    ret = _dw_st_adj1_supg_p(_out, _state_w, _grad_p, _coef,
-                             cmap_w.geo, _conn_w, n_el_w, n_ep_w, is_diff)
+    with nogil:
+        ret = _dw_st_adj1_supg_p(_out, _state_w, _grad_p, _coef,
+                                 cmap_w.geo, _conn_w, n_el_w, n_ep_w, is_diff)
     return ret
 
 def dw_st_adj2_supg_p(np.ndarray out not None,
@@ -2013,9 +2101,10 @@ def dw_st_adj2_supg_p(np.ndarray out not None,
     array2fmfield4(_coef, coef)
     array2pint2(&_conn_r, &n_el_r, &n_ep_r, conn_r)
 
-    ret = _dw_st_adj2_supg_p(_out, _grad_u, _state_r, _coef,
-                             cmap_u.geo, cmap_r.geo, _conn_r, n_el_r, n_ep_r,
-                             is_diff)
+    with nogil:
+        ret = _dw_st_adj2_supg_p(_out, _grad_u, _state_r, _coef,
+                                 cmap_u.geo, cmap_r.geo, _conn_r,
+                                 n_el_r, n_ep_r, is_diff)
     return ret
 
 def d_of_nsMinGrad(np.ndarray out not None,
@@ -2029,7 +2118,8 @@ def d_of_nsMinGrad(np.ndarray out not None,
     array2fmfield4(_grad, grad)
     array2fmfield4(_viscosity, viscosity)
 
-    ret = _d_of_nsMinGrad(_out, _grad, _viscosity, cmap.geo)
+    with nogil:
+        ret = _d_of_nsMinGrad(_out, _grad, _viscosity, cmap.geo)
     return ret
 
 def d_of_nsSurfMinDPress(np.ndarray out not None,
@@ -2044,8 +2134,9 @@ def d_of_nsSurfMinDPress(np.ndarray out not None,
     array2fmfield4(_out, out)
     array2fmfield4(_pressure, pressure)
 
-    ret = _d_of_nsSurfMinDPress(_out, _pressure, weight, bpress,
-                                cmap.geo, is_diff)
+    with nogil:
+        ret = _d_of_nsSurfMinDPress(_out, _pressure, weight, bpress,
+                                    cmap.geo, is_diff)
     return ret
 
 def d_sd_div(np.ndarray out not None,
@@ -2067,8 +2158,9 @@ def d_sd_div(np.ndarray out not None,
     array2fmfield4(_div_mv, div_mv)
     array2fmfield4(_grad_mv, grad_mv)
 
-    ret = _d_sd_div(_out, _div_u, _grad_u, _state_p, _div_mv, _grad_mv,
-                    cmap_u.geo, mode)
+    with nogil:
+        ret = _d_sd_div(_out, _div_u, _grad_u, _state_p, _div_mv, _grad_mv,
+                        cmap_u.geo, mode)
     return ret
 
 def d_sd_div_grad(np.ndarray out not None,
@@ -2090,8 +2182,9 @@ def d_sd_div_grad(np.ndarray out not None,
     array2fmfield4(_grad_mv, grad_mv)
     array2fmfield4(_viscosity, viscosity)
 
-    ret = _d_sd_div_grad(_out, _grad_u, _grad_w, _div_mv, _grad_mv, _viscosity,
-                         cmap_u.geo, mode)
+    with nogil:
+        ret = _d_sd_div_grad(_out, _grad_u, _grad_w, _div_mv, _grad_mv,
+                             _viscosity, cmap_u.geo, mode)
     return ret
 
 def d_sd_convect(np.ndarray out not None,
@@ -2113,8 +2206,9 @@ def d_sd_convect(np.ndarray out not None,
     array2fmfield4(_div_mv, div_mv)
     array2fmfield4(_grad_mv, grad_mv)
 
-    ret = _d_sd_convect(_out, _state_u, _grad_u, _state_w, _div_mv, _grad_mv,
-                        cmap_u.geo, mode)
+    with nogil:
+        ret = _d_sd_convect(_out, _state_u, _grad_u, _state_w, _div_mv,
+                            _grad_mv, cmap_u.geo, mode)
     return ret
 
 def d_sd_volume_dot(np.ndarray out not None,
@@ -2131,7 +2225,9 @@ def d_sd_volume_dot(np.ndarray out not None,
     array2fmfield4(_state_q, state_q)
     array2fmfield4(_div_mv, div_mv)
 
-    ret = _d_sd_volume_dot(_out, _state_p, _state_q, _div_mv, cmap.geo, mode)
+    with nogil:
+        ret = _d_sd_volume_dot(_out, _state_p, _state_q, _div_mv, cmap.geo,
+                               mode)
     return ret
 
 def d_sd_st_grad_div(np.ndarray out not None,
@@ -2157,8 +2253,9 @@ def d_sd_st_grad_div(np.ndarray out not None,
     array2fmfield4(_grad_mv, grad_mv)
     array2fmfield4(_coef, coef)
 
-    ret = _d_sd_st_grad_div(_out, _div_u, _grad_u, _div_w, _grad_w,
-                            _div_mv, _grad_mv, _coef, cmap_u.geo, mode)
+    with nogil:
+        ret = _d_sd_st_grad_div(_out, _div_u, _grad_u, _div_w, _grad_w,
+                                _div_mv, _grad_mv, _coef, cmap_u.geo, mode)
     return ret
 
 def d_sd_st_supg_c(np.ndarray out not None,
@@ -2182,8 +2279,9 @@ def d_sd_st_supg_c(np.ndarray out not None,
     array2fmfield4(_grad_mv, grad_mv)
     array2fmfield4(_coef, coef)
 
-    ret = _d_sd_st_supg_c(_out, _state_b, _grad_u, _grad_w, _div_mv, _grad_mv,
-                          _coef, cmap_u.geo, mode)
+    with nogil:
+        ret = _d_sd_st_supg_c(_out, _state_b, _grad_u, _grad_w, _div_mv,
+                              _grad_mv, _coef, cmap_u.geo, mode)
     return ret
 
 def d_sd_st_pspg_c(np.ndarray out not None,
@@ -2207,8 +2305,9 @@ def d_sd_st_pspg_c(np.ndarray out not None,
     array2fmfield4(_grad_mv, grad_mv)
     array2fmfield4(_coef, coef)
 
-    ret = _d_sd_st_pspg_c(_out, _state_b, _grad_u, _grad_r, _div_mv, _grad_mv,
-                          _coef, cmap_u.geo, mode)
+    with nogil:
+        ret = _d_sd_st_pspg_c(_out, _state_b, _grad_u, _grad_r, _div_mv,
+                              _grad_mv, _coef, cmap_u.geo, mode)
     return ret
 
 def d_sd_st_pspg_p(np.ndarray out not None,
@@ -2230,6 +2329,7 @@ def d_sd_st_pspg_p(np.ndarray out not None,
     array2fmfield4(_grad_mv, grad_mv)
     array2fmfield4(_coef, coef)
 
-    ret = _d_sd_st_pspg_p(_out, _grad_r, _grad_p, _div_mv, _grad_mv, _coef,
-                          cmap_p.geo, mode)
+    with nogil:
+        ret = _d_sd_st_pspg_p(_out, _grad_r, _grad_p, _div_mv, _grad_mv, _coef,
+                              cmap_p.geo, mode)
     return ret
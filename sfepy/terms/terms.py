@@ -7,6 +7,8 @@ import numpy as nm
 from sfepy.base.base import (as_float_or_complex, get_default, assert_,
                              Container, Struct, basestr, goptions)
 from sfepy.base.compat import in1d
+from sfepy.base.profiling import profiler, profiled
+from sfepy.linalg.utils import broadcast_to_cells
 
 # Used for imports in term files.
 from sfepy.terms.extmods import terms
@@ -23,6 +25,24 @@ _match_material_opt = re.compile('^opt_material(_[_a-zA-Z0-9]+)?$').match
 _match_material_root = re.compile('(.+)\.(.*)').match
 _match_ts = re.compile('^ts$').match
 
+# The minimal number of cells evaluated by a thread in
+# Term.call_function_threaded().
+_min_cells_per_thread = 32
+
+_thread_pools = {}
+
+def _get_thread_pool(n_threads):
+    """
+    Get a cached pool of `n_threads` threads.
+    """
+    pool = _thread_pools.get(n_threads)
+    if pool is None:
+        from multiprocessing.pool import ThreadPool
+
+        pool = _thread_pools[n_threads] = ThreadPool(n_threads)
+
+    return pool
+
 def get_arg_kinds(arg_types):
     """
     Translate `arg_types` of a Term to a canonical form.
@@ -318,6 +338,11 @@ class Term(Struct):
     arg_shapes = {}
     integration = 'volume'
     geometries = ['1_2', '2_3', '2_4', '3_4', '3_8']
+    # True for terms linear in their state variables, whose cell matrices do
+    # not depend on the state values.
+    is_linear = False
+    # True for terms implementing eval_sum_factorized().
+    sum_factorized = False
 
     @staticmethod
     def new(name, integral, region, **kwargs):
@@ -409,6 +434,15 @@ class Term(Struct):
                 % (self.sign, self.name, self.integral.order,
                    self.region.name, self.arg_str))
 
+    def get_profile_keys(self):
+        """
+        Get the profiler record keys of the term evaluation, see
+        :mod:`sfepy.base.profiling`.
+        """
+        key = ('%s.%d.%s(%s)' % (self.name, self.integral.order,
+                                 self.region.name, self.arg_str))
+        return [('terms', key), ('regions', self.region.name)]
+
     def set_integral(self, integral):
         """
         Set the term integral.
@@ -919,6 +953,127 @@ class Term(Struct):
 
         return cells
 
+    def get_assembling_colors(self, dc, iels):
+        """
+        Return the coloring of the assembling cells `iels` such that no two
+        cells of the same color share a DOF in the DOF connectivity `dc`. The
+        coloring is cached for the given DOF connectivity and cells, so that
+        cell chunks, see :func:`Term.evaluate_chunked()`, are cached
+        separately.
+
+        Returns
+        -------
+        color_ptr : array
+            The pointers to `color_items` delimiting the individual colors.
+        color_items : array
+            The positions in `iels` grouped by colors.
+        """
+        import sfepy.discrete.common.extmods.assemble as asm
+
+        cache = getattr(self, '_assembling_colors', None)
+        if cache is None:
+            cache = self._assembling_colors = {}
+
+        key = (len(iels), iels[0] if len(iels) else 0)
+        item = cache.get(key)
+        if ((item is None) or (item[0] is not dc)
+            or not nm.array_equal(item[1], iels)):
+            n_dof = dc.max() + 1 if dc.size else 0
+            color_ptr, color_items = asm.color_cells(iels, dc, n_dof)
+            item = (dc, iels.copy(), color_ptr, color_items)
+            cache[key] = item
+
+        return item[2:]
+
+    def get_matrix_cache_key(self, args, diff_var):
+        """
+        Return the key identifying the cell matrices of a linear term
+        w.r.t. `diff_var`. The key consists of a tuple of values compared by
+        equality and a tuple of objects compared by identity. It changes
+        whenever the material data or the reference mappings of the term
+        variables are updated.
+        """
+        materials = self.get_materials(join=True)
+        variables = self.get_variables()
+
+        values = ((self.sign, diff_var)
+                  + tuple(mat.data_version for mat in materials)
+                  + tuple(var.field.mappings_version for var in variables)
+                  + tuple(self.get_mapping(var, return_key=True)[2]
+                          for var in variables))
+        objs = ((self.integral, self.region)
+                + tuple(materials)
+                + tuple(var.field for var in variables)
+                + tuple(arg for arg in args if isinstance(arg, nm.ndarray)))
+
+        return values, objs
+
+    def get_cached_matrix(self, key):
+        """
+        Return the cached `(vals, iels, status)` cell matrices data for the
+        cache `key` given by :func:`Term.get_matrix_cache_key()`, or None, if
+        not in the cache.
+        """
+        cache = getattr(self, '_matrix_cache', None)
+        if (cache is None) or (cache[0] is not self):
+            return None
+
+        values, objs = key
+        item = cache[1].get(values[1])
+        if item is None:
+            return None
+
+        cvalues, cobjs = item[0]
+        if ((cvalues != values) or (len(cobjs) != len(objs))
+            or not all(obj is cobj for obj, cobj in zip(objs, cobjs))):
+            return None
+
+        return item[1]
+
+    def set_cached_matrix(self, key, data):
+        """
+        Store the cell matrices `data` in the cache under `key`, see
+        :func:`Term.get_cached_matrix()`.
+        """
+        cache = getattr(self, '_matrix_cache', None)
+        if (cache is None) or (cache[0] is not self):
+            # Term copies share the instance dict items.
+            cache = self._matrix_cache = (self, {})
+
+        cache[1][key[0][1]] = (key, data)
+
+    def clear_matrix_cache(self):
+        """
+        Clear the cell matrices cache.
+        """
+        self._matrix_cache = None
+
+    def get_scatter_map(self, mtx, rdc, cdc, iels, key=None, upper=False):
+        """
+        Return the scatter map of the cell matrices given by the DOF
+        connectivities `rdc`, `cdc` and the assembling cells `iels` into the
+        data array of the CSR matrix `mtx`. The map is cached for the given
+        `key` (e.g. the differentiation variable name) and recomputed only
+        when the connectivities, the cells or the matrix structure change.
+        If `upper` is True, the map skips the items below the diagonal.
+        """
+        import sfepy.discrete.common.extmods.assemble as asm
+
+        cache = getattr(self, '_scatter_maps', None)
+        if cache is None:
+            cache = self._scatter_maps = {}
+
+        item = cache.get(key)
+        if ((item is None) or (item[0] is not rdc) or (item[1] is not cdc)
+            or (item[2] is not mtx.indptr) or (item[3] is not mtx.indices)
+            or not nm.array_equal(item[4], iels)):
+            offsets = asm.create_scatter_map(mtx.indptr, mtx.indices, iels,
+                                             rdc, cdc, upper)
+            item = (rdc, cdc, mtx.indptr, mtx.indices, iels.copy(), offsets)
+            cache[key] = item
+
+        return item[5]
+
     def time_update(self, ts):
         if ts is not None:
             self.step = ts.step
@@ -1253,8 +1408,14 @@ class Term(Struct):
         return fargs
 
     def call_function(self, out, fargs):
+        n_threads = goptions['n_threads']
+        fargs = self.get_kernel_fargs(fargs)
         try:
-            status = self.function(out, *fargs)
+            if (n_threads > 1) and (out is not None):
+                status = self.call_function_threaded(out, fargs, n_threads)
+
+            else:
+                status = self.function(out, *fargs)
 
         except (RuntimeError, ValueError):
             terms.errclear()
@@ -1266,6 +1427,56 @@ class Term(Struct):
 
         return status
 
+    def call_function_threaded(self, out, fargs, n_threads):
+        """
+        Call the term function in `n_threads` threads, each evaluating a
+        contiguous range of cells of `out`.
+
+        The low level term functions release the GIL and allocate their
+        scratch arrays per call, so each thread works with its own
+        arrays. The C error state is thread-local, so an error in one
+        thread does not stop the other threads. It is cleared in the thread
+        where it occurred and reported by the returned status or the raised
+        exception. If the function arguments cannot be restricted to cell
+        ranges, see :func:`Term.get_cell_fargs()`, or there are too few
+        cells, the function is called once for all cells.
+        """
+        n_el = out.shape[0]
+        n_chunk = min(n_threads, n_el // _min_cells_per_thread)
+        if n_chunk < 2:
+            return self.function(out, *fargs)
+
+        bounds = nm.linspace(0, n_el, n_chunk + 1).astype(nm.int64)
+        calls = []
+        for ii in range(n_chunk):
+            start, stop = bounds[ii], bounds[ii + 1]
+            cfargs = self.get_cell_fargs(fargs, start, stop, n_el)
+            if cfargs is None:
+                return self.function(out, *fargs)
+
+            calls.append((out[start:stop], cfargs))
+
+        function = self.function
+        def call_chunk(call):
+            try:
+                status = function(call[0], *call[1])
+
+            except Exception:
+                terms.errclear()
+                raise
+
+            if status:
+                terms.errclear()
+
+            return status
+
+        pool = _get_thread_pool(n_threads)
+        statuses = pool.map(call_chunk, calls)
+
+        status = next((ii for ii in statuses if ii), 0)
+
+        return status
+
     def eval_real(self, shape, fargs, mode='eval', term_mode=None,
                   diff_var=None, **kwargs):
         out = nm.empty(shape, dtype=nm.float64)
@@ -1317,6 +1528,231 @@ class Term(Struct):
         else:
             return out, status
 
+    def get_weak_shape(self, diff_var=None):
+        """
+        Get the shape of the cell vectors (`diff_var` is None) or matrices
+        computed in 'weak' evaluation mode.
+        """
+        varr = self.get_virtual_variable()
+
+        n_elr, n_qpr, dim, n_enr, n_cr = self.get_data_shape(varr)
+        n_row = n_cr * n_enr
+
+        if diff_var is None:
+            shape = (n_elr, 1, n_row, 1)
+
+        else:
+            varc = self.get_variables(as_list=False)[diff_var]
+            n_elc, n_qpc, dim, n_enc, n_cc = self.get_data_shape(varc)
+            n_col = n_cc * n_enc
+
+            shape = (n_elr, 1, n_row, n_col)
+
+        return shape
+
+    def eval_weak(self, shape, fargs, term_mode=None, diff_var=None,
+                  **kwargs):
+        """
+        Evaluate the term function in 'weak' mode with the data type given
+        by the virtual variable.
+        """
+        varr = self.get_virtual_variable()
+
+        if varr.dtype == nm.float64:
+            vals, status = self.eval_real(shape, fargs, 'weak', term_mode,
+                                          diff_var, **kwargs)
+
+        elif varr.dtype == nm.complex128:
+            vals, status = self.eval_complex(shape, fargs, 'weak', term_mode,
+                                             diff_var, **kwargs)
+
+        else:
+            raise ValueError('unsupported term dtype! (%s)' % varr.dtype)
+
+        return vals, status
+
+    @staticmethod
+    def get_kernel_fargs(fargs):
+        """
+        Prepare the broadcast array arguments in `fargs` for the C term
+        functions.
+
+        The arrays broadcast along the cell axis with C-contiguous cells, see
+        :func:`broadcast_to_cells() <sfepy.linalg.utils.broadcast_to_cells()>`,
+        are passed without copying. Other non-contiguous arrays, e.g.
+        per-cell material data broadcast over quadrature points, are copied
+        to C-contiguous arrays.
+        """
+        kfargs = []
+        for arg in fargs:
+            if isinstance(arg, nm.ndarray) and not arg.flags.c_contiguous:
+                if ((arg.ndim == 4) and (arg.strides[0] == 0)
+                    and (arg.shape[0] > 1)):
+                    if not arg[0].flags.c_contiguous:
+                        arg = broadcast_to_cells(arg[:1], arg.shape)
+
+                else:
+                    arg = nm.ascontiguousarray(arg)
+
+            kfargs.append(arg)
+
+        return kfargs
+
+    @staticmethod
+    def get_cell_fargs(fargs, start, stop, n_el):
+        """
+        Restrict the term function arguments `fargs` to the cells in the
+        range [`start`, `stop`).
+
+        Reference mappings and arrays of the FMField shape `(n_el, n_qp,
+        n_row, n_col)` are restricted, scalars, strings and callables are
+        kept as they are.
+
+        Returns
+        -------
+        cfargs : list or None
+            The restricted arguments, or None, if an argument cannot be
+            restricted.
+        """
+        from sfepy.discrete.common.extmods.mappings import CMapping
+
+        cfargs = []
+        for arg in fargs:
+            if isinstance(arg, CMapping):
+                if arg.n_el != n_el:
+                    return None
+
+                arg = arg.get_cells(start, stop)
+
+            elif isinstance(arg, nm.ndarray):
+                if (arg.ndim == 4) and (arg.shape[0] == n_el):
+                    arg = arg[start:stop]
+
+                elif (n_el > 1) and (arg.ndim > 0) and (arg.shape[0] == n_el):
+                    return None
+
+            elif not ((arg is None)
+                      or isinstance(arg, (basestr, bool, int, float, complex,
+                                          nm.number))
+                      or callable(arg)):
+                return None
+
+            cfargs.append(arg)
+
+        return cfargs
+
+    def evaluate_chunked(self, chunk_size, diff_var=None, standalone=True,
+                         ret_status=False, **kwargs):
+        """
+        Evaluate the term in 'weak' mode by chunks of cells.
+
+        This is a generator yielding the results of the evaluation of at
+        most `chunk_size` cells at a time, so that only the cell vectors or
+        matrices of a single chunk are stored. Assembling all the chunks
+        gives the same result as assembling the output of
+        :func:`Term.evaluate(mode='weak') <Term.evaluate()>`. If the term
+        function arguments cannot be restricted to cell chunks, see
+        :func:`Term.get_cell_fargs()`, or the term uses a custom evaluation
+        function, all cells are evaluated at once.
+
+        Parameters
+        ----------
+        chunk_size : int
+            The maximum number of cells in a chunk.
+        diff_var : str, optional
+            The variable to differentiate with respect to.
+
+        Yields
+        ------
+        vals : array
+            The cell vectors or matrices of the chunk.
+        iels : array
+            The local cell indices of the chunk.
+        status : int, optional
+            The flag indicating evaluation success (0) or failure
+            (nonzero). Only provided if `ret_status` is True.
+        """
+        if standalone:
+            self.standalone_setup()
+
+        kwargs = kwargs.copy()
+        term_mode = kwargs.pop('term_mode', None)
+
+        if self.get_virtual_variable() is None:
+            raise ValueError('no virtual variable in weak mode! (in "%s")'
+                             % self.get_str())
+
+        # The generator is profiled by parts, so that the time spent by the
+        # caller between the chunks is not included.
+        with profiler.section(self.get_profile_keys):
+            args = self.get_args(**kwargs)
+            self.check_shapes(*args)
+
+            vals = None
+            if (diff_var is None) and (term_mode is None) and not kwargs:
+                vals = self.eval_sum_factorized_residual(args)
+
+            if vals is None:
+                _args = tuple(args) + ('weak', term_mode, diff_var)
+                fargs = self.call_get_fargs(_args, kwargs)
+
+        if vals is not None:
+            vals *= self.sign
+            out = (vals, self.get_assembling_cells(vals.shape))
+            if ret_status:
+                out = out + (0,)
+
+            yield out
+            return
+
+        shape = self.get_weak_shape(diff_var)
+        n_el = shape[0]
+        chunk_size = max(int(chunk_size), 1)
+
+        is_default = ((self.eval_real.__func__ is Term.eval_real)
+                      and (self.eval_complex.__func__ is Term.eval_complex))
+        if (not is_default) or (n_el <= chunk_size):
+            chunks = [(0, n_el)]
+
+        else:
+            chunks = [(ii, min(ii + chunk_size, n_el))
+                      for ii in range(0, n_el, chunk_size)]
+            if self.get_cell_fargs(fargs, 0, 0, n_el) is None:
+                chunks = [(0, n_el)]
+
+        iels = None
+        for start, stop in chunks:
+            if (start, stop) == (0, n_el):
+                cshape, cfargs = shape, fargs
+
+            else:
+                cshape = (stop - start,) + shape[1:]
+                cfargs = self.get_cell_fargs(fargs, start, stop, n_el)
+
+            with profiler.section(self.get_profile_keys):
+                vals, status = self.eval_weak(cshape, cfargs, term_mode,
+                                              diff_var, **kwargs)
+
+            if not isinstance(vals, tuple):
+                vals *= self.sign
+                if iels is None:
+                    iels = self.get_assembling_cells(shape)
+                out = (vals, iels[start:stop])
+
+            else:
+                vals = (self.sign * vals[0],) + vals[1:]
+                out = (vals, None)
+
+            if goptions['check_term_finiteness']:
+                assert_(nm.isfinite(out[0]).all(),
+                        msg='"%s" term values not finite!' % self.get_str())
+
+            if ret_status:
+                out = out + (status,)
+
+            yield out
+
+    @profiled(lambda self, *args, **kwargs: self.get_profile_keys())
     def evaluate(self, mode='eval', diff_var=None,
                  standalone=True, ret_status=False, **kwargs):
         """
@@ -1376,38 +1812,38 @@ class Term(Struct):
                 raise ValueError('no virtual variable in weak mode! (in "%s")'
                                  % self.get_str())
 
-            if diff_var is not None:
-                varc = self.get_variables(as_list=False)[diff_var]
-
             args = self.get_args(**kwargs)
             self.check_shapes(*args)
 
+            if (diff_var is None) and (term_mode is None) and not kwargs:
+                vals = self.eval_sum_factorized_residual(args)
+                if vals is not None:
+                    vals *= self.sign
+                    out = (vals, self.get_assembling_cells(vals.shape))
+                    if ret_status:
+                        out = out + (0,)
+
+                    return out
+
+            use_cache = (goptions['cache_term_matrices'] and self.is_linear
+                         and (diff_var is not None) and (term_mode is None)
+                         and not kwargs)
+            if use_cache:
+                cache_key = self.get_matrix_cache_key(args, diff_var)
+                cached = self.get_cached_matrix(cache_key)
+                if cached is not None:
+                    out = cached[:2]
+                    if ret_status:
+                        out = out + (cached[2],)
+
+                    return out
+
             _args = tuple(args) + (mode, term_mode, diff_var)
             fargs = self.call_get_fargs(_args, kwargs)
 
-            n_elr, n_qpr, dim, n_enr, n_cr = self.get_data_shape(varr)
-            n_row = n_cr * n_enr
-
-            if diff_var is None:
-                shape = (n_elr, 1, n_row, 1)
-
-            else:
-                n_elc, n_qpc, dim, n_enc, n_cc = self.get_data_shape(varc)
-                n_col = n_cc * n_enc
-
-                shape = (n_elr, 1, n_row, n_col)
-
-            if varr.dtype == nm.float64:
-                vals, status = self.eval_real(shape, fargs, mode, term_mode,
-                                              diff_var, **kwargs)
-
-            elif varr.dtype == nm.complex128:
-                vals, status = self.eval_complex(shape, fargs, mode, term_mode,
-                                                 diff_var, **kwargs)
-
-            else:
-                raise ValueError('unsupported term dtype! (%s)'
-                                 % varr.dtype)
+            shape = self.get_weak_shape(diff_var)
+            vals, status = self.eval_weak(shape, fargs, term_mode, diff_var,
+                                          **kwargs)
 
             if not isinstance(vals, tuple):
                 vals *= self.sign
@@ -1419,6 +1855,9 @@ class Term(Struct):
 
             out = (vals, iels)
 
+            if use_cache and not isinstance(vals, tuple):
+                self.set_cached_matrix(cache_key, (vals, iels, status))
+
         if goptions['check_term_finiteness']:
             assert_(nm.isfinite(out[0]).all(),
                     msg='"%s" term values not finite!' % self.get_str())
@@ -1431,6 +1870,279 @@ class Term(Struct):
 
         return out
 
+    def get_matrix_sign(self, diff_var):
+        """
+        Get the factor of the term matrix w.r.t. the state variable
+        `diff_var`, that is applied in the matrix assembling.
+
+        It is 1 / dt for time derivatives of `diff_var` (zero in the first
+        step of quasistatic problems) and 1 otherwise.
+        """
+        sign = 1.0
+        if self.arg_derivatives[diff_var.name]:
+            if not self.is_quasistatic or (self.step > 0):
+                sign *= 1.0 / self.dt
+
+            else:
+                sign = 0.0
+
+        return sign
+
+    def get_matrix_dof_conns(self, diff_var):
+        """
+        Get the row and column DOF connectivities of the term matrix w.r.t.
+        the state variable `diff_var`.
+        """
+        vvar = self.get_virtual_variable()
+        dc_type = self.get_dof_conn_type()
+
+        rdc = vvar.get_dof_conn(dc_type)
+
+        is_trace = self.arg_traces[diff_var.name]
+        cdc = diff_var.get_dof_conn(dc_type, is_trace=is_trace)
+
+        return rdc, cdc
+
+    def assemble_action_to(self, out, vec, val, iels, diff_var):
+        """
+        Assemble the action of the term matrix w.r.t. `diff_var` on the
+        vector `vec` into the vector `out`, without assembling the matrix.
+
+        The cell matrices in `val` corresponding to cells `iels` are
+        multiplied by the cell parts of `vec` and the results are added to
+        `out`. Both vectors use the DOF numbering of the matrix assembled by
+        :func:`Term.assemble_to()`, the DOFs with negative connectivity
+        entries are skipped.
+        """
+        sign = self.get_matrix_sign(diff_var)
+        if sign == 0.0:
+            return
+
+        if not isinstance(val, tuple):
+            rdc, cdc = self.get_matrix_dof_conns(diff_var)
+            rdc, cdc = rdc[iels], cdc[iels]
+            assert_(val.shape[2:] == (rdc.shape[1], cdc.shape[1]))
+
+            vec_els = nm.zeros(cdc.shape, dtype=vec.dtype)
+            ii = cdc >= 0
+            vec_els[ii] = vec[cdc[ii]]
+            out_els = sign * nm.einsum('cij,cj->ci', val[:, 0], vec_els)
+
+            ii = rdc >= 0
+            rows, vals = rdc[ii], out_els[ii]
+
+        else:
+            vals, rows, cols, rvar, cvar = val
+            if rvar.eq_map is not None:
+                req, ceq = rvar.eq_map.eq, cvar.eq_map.eq
+
+                rows, cols = req[rows], ceq[cols]
+                active = (rows >= 0) & (cols >= 0)
+                vals, rows, cols = vals[active], rows[active], cols[active]
+
+            vals = sign * vals * vec[cols]
+
+        if nm.iscomplexobj(vals):
+            out += nm.bincount(rows, weights=vals.real, minlength=len(out))
+            out += 1j * nm.bincount(rows, weights=vals.imag,
+                                    minlength=len(out))
+
+        else:
+            out += nm.bincount(rows, weights=vals, minlength=len(out))
+
+    def get_block_diagonal_entries(self, val, iels, diff_var, blocks):
+        """
+        Get the entries of the term matrix w.r.t. `diff_var`, whose row and
+        column DOFs belong to the same block.
+
+        Parameters
+        ----------
+        val : array or tuple
+            The cell matrices corresponding to cells `iels`, as returned by
+            :func:`Term.evaluate()` in the 'weak' mode.
+        iels : array
+            The cells of `val`.
+        diff_var : Variable instance
+            The variable the term matrix is differentiated w.r.t.
+        blocks : array
+            The block numbers of DOFs.
+
+        Returns
+        -------
+        vals : array
+            The matrix entries, multiplied by :func:`Term.get_matrix_sign()`.
+        rows : array
+            The row DOFs of the entries.
+        cols : array
+            The column DOFs of the entries.
+        """
+        sign = self.get_matrix_sign(diff_var)
+
+        if not isinstance(val, tuple):
+            rdc, cdc = self.get_matrix_dof_conns(diff_var)
+            rdc, cdc = rdc[iels], cdc[iels]
+            assert_(val.shape[2:] == (rdc.shape[1], cdc.shape[1]))
+
+            rows = nm.repeat(rdc[:, :, None], cdc.shape[1], axis=2)
+            cols = nm.repeat(cdc[:, None, :], rdc.shape[1], axis=1)
+            vals = val[:, 0]
+
+        else:
+            vals, rows, cols, rvar, cvar = val
+            if rvar.eq_map is not None:
+                req, ceq = rvar.eq_map.eq, cvar.eq_map.eq
+                rows, cols = req[rows], ceq[cols]
+
+        ii = (rows >= 0) & (cols >= 0)
+        vals, rows, cols = vals[ii], rows[ii], cols[ii]
+
+        ii = blocks[rows] == blocks[cols]
+        vals, rows, cols = sign * vals[ii], rows[ii], cols[ii]
+
+        return vals, rows, cols
+
+    def get_sum_factorization(self):
+        """
+        Get the sum factorization of the state variable field bases, see
+        :mod:`sfepy.discrete.fem.sum_factorization`.
+
+        The sum factorization is used, if the 'sum_factorization' global
+        option is True, for the volume terms with `sum_factorized` set, whose
+        virtual and real-valued state variables share the same field and
+        whose state variable is used in the current time step without time
+        derivatives.
+
+        Returns
+        -------
+        sf : SumFactorization instance or None
+            The sum factorization, or None, if it cannot be used.
+        """
+        if not (self.sum_factorized and goptions['sum_factorization']
+                and (self.integration == 'volume')):
+            return None
+
+        vvar = self.get_virtual_variable()
+        svars = self.get_state_variables()
+        if (vvar is None) or (len(svars) != 1):
+            return None
+
+        svar = svars[0]
+        if ((svar.field is not vvar.field)
+            or self.arg_steps[svar.name] or self.arg_derivatives[svar.name]
+            or (svar.dtype != nm.float64)
+            or not hasattr(svar.field, 'get_sum_factorization')):
+            return None
+
+        return svar.field.get_sum_factorization(self.region, self.integral)
+
+    def eval_sum_factorized(self, sf, vals, *args):
+        """
+        Evaluate the term cell vectors corresponding to the state variable
+        cell DOF values `vals` using the sum factorization `sf`. Implemented
+        in the terms with `sum_factorized` set.
+
+        Parameters
+        ----------
+        sf : SumFactorization instance
+            The sum factorization of the state variable field bases.
+        vals : array
+            The state variable cell DOF values with shape `(n_cell, n_c,
+            n_nod)`.
+        *args : list
+            The term arguments, as returned by :func:`Term.get_args()`.
+
+        Returns
+        -------
+        out : array or None
+            The cell vectors with shape `(n_cell, n_c, n_nod)`, or None, if
+            the term arguments are not supported.
+        """
+        return None
+
+    def get_sum_factorized_data_key(self):
+        """
+        Return the key identifying the material parameters of the term and
+        their data versions, that is passed to
+        :func:`SumFactorization.get_qp_data()
+        <sfepy.discrete.fem.sum_factorization.SumFactorization.get_qp_data()>`
+        in :func:`Term.eval_sum_factorized()` implementations.
+
+        Returns
+        -------
+        names : tuple
+            The material and parameter names.
+        versions : tuple
+            The material data versions.
+        """
+        materials = self.get_materials()
+        names = tuple((mat.name, par_name) for mat, par_name in materials)
+        versions = tuple(mat.data_version for mat, _ in materials)
+
+        return names, versions
+
+    def eval_sum_factorized_residual(self, args):
+        """
+        Evaluate the term cell vectors using the sum factorization, if
+        possible, see :func:`Term.get_sum_factorization()`.
+
+        Returns
+        -------
+        vals : array or None
+            The cell vectors with the shape of :func:`Term.evaluate()` results
+            in the 'weak' mode, or None, if the sum factorization cannot be
+            used.
+        """
+        sf = self.get_sum_factorization()
+        if sf is None:
+            return None
+
+        svar = self.get_state_variables()[0]
+        econn = svar.field.get_econn(self.get_dof_conn_type(), self.region,
+                                     integration=self.integration)
+        dofs = svar().reshape((-1, svar.n_components))[econn]
+
+        out = self.eval_sum_factorized(sf, nm.swapaxes(dofs, 1, 2), *args)
+        if out is None:
+            return None
+
+        return out.reshape((out.shape[0], 1, -1, 1))
+
+    def assemble_sum_factorized_action(self, out, vec):
+        """
+        Assemble the action of the term matrix on the vector `vec` into the
+        vector `out` using the sum factorization, if possible, see
+        :func:`Term.assemble_action_to()` and
+        :func:`Term.get_sum_factorization()`.
+
+        Returns
+        -------
+        done : bool
+            True, if the action was assembled.
+        """
+        sf = self.get_sum_factorization()
+        if sf is None:
+            return False
+
+        svar = self.get_state_variables()[0]
+        sign = self.sign * self.get_matrix_sign(svar)
+
+        rdc, cdc = self.get_matrix_dof_conns(svar)
+        vec_els = nm.zeros(cdc.shape, dtype=nm.float64)
+        ii = cdc >= 0
+        vec_els[ii] = vec[cdc[ii]]
+        vec_els = vec_els.reshape((cdc.shape[0], svar.n_components, -1))
+
+        out_els = self.eval_sum_factorized(sf, vec_els, *self.get_args())
+        if out_els is None:
+            return False
+
+        out_els = sign * out_els.reshape(rdc.shape)
+
+        ii = rdc >= 0
+        out += nm.bincount(rdc[ii], weights=out_els[ii], minlength=len(out))
+
+        return True
+
     def assemble_to(self, asm_obj, val, iels, mode='vector', diff_var=None):
         """
         Assemble the results of term evaluation.
@@ -1444,12 +2156,19 @@ class Term(Struct):
         matrix has to be added to the global matrix by the caller. By default,
         this is done in :func:`Equations.evaluate()
         <sfepy.discrete.equations.Equations.evaluate()>`.
+
+        If `asm_obj` is a :class:`SymmetricCSRMatrix
+        <sfepy.linalg.sparse.SymmetricCSRMatrix>`, only the upper triangle
+        items are assembled.
         """
         import sfepy.discrete.common.extmods.assemble as asm
+        from sfepy.linalg.sparse import SymmetricCSRMatrix
 
         vvar = self.get_virtual_variable()
         dc_type = self.get_dof_conn_type()
 
+        n_threads = goptions['n_threads']
+
         extra = None
 
         if mode == 'vector':
@@ -1467,7 +2186,14 @@ class Term(Struct):
                 dc = vvar.get_dof_conn(dc_type)
                 assert_(val.shape[2] == dc.shape[1])
 
-                assemble(asm_obj, val, iels, 1.0, dc)
+                if n_threads and (asm_obj.dtype == nm.float64):
+                    colors = self.get_assembling_colors(dc, iels)
+                    asm.assemble_vector_colored(asm_obj, val, iels, 1.0, dc,
+                                                colors[0], colors[1],
+                                                n_threads)
+
+                else:
+                    assemble(asm_obj, val, iels, 1.0, dc)
 
             else:
                 vals, rows, var = val
@@ -1491,27 +2217,45 @@ class Term(Struct):
 
             svar = diff_var
             tmd = (asm_obj.data, asm_obj.indptr, asm_obj.indices)
+            upper = isinstance(asm_obj, SymmetricCSRMatrix)
 
             if ((asm_obj.dtype == nm.complex128)
                 and (val.dtype == nm.float64)):
                 val = val.astype(nm.complex128)
 
-            sign = 1.0
-            if self.arg_derivatives[svar.name]:
-                if not self.is_quasistatic or (self.step > 0):
-                    sign *= 1.0 / self.dt
-
-                else:
-                    sign = 0.0
+            sign = self.get_matrix_sign(svar)
 
             if not isinstance(val, tuple):
-                rdc = vvar.get_dof_conn(dc_type)
-
-                is_trace = self.arg_traces[svar.name]
-                cdc = svar.get_dof_conn(dc_type, is_trace=is_trace)
+                rdc, cdc = self.get_matrix_dof_conns(svar)
                 assert_(val.shape[2:] == (rdc.shape[1], cdc.shape[1]))
 
-                assemble(tmd[0], tmd[1], tmd[2], val, iels, sign, rdc, cdc)
+                is_real = asm_obj.dtype == nm.float64
+                if goptions['use_scatter_maps'] and is_real:
+                    # Cell chunks are distinguished by their first cell.
+                    key = (svar.name, iels[0] if len(iels) else 0)
+                    offsets = self.get_scatter_map(asm_obj, rdc, cdc, iels,
+                                                   key=key, upper=upper)
+                    if n_threads:
+                        colors = self.get_assembling_colors(rdc, iels)
+                        asm.assemble_matrix_mapped_colored(tmd[0], val, sign,
+                                                           offsets,
+                                                           colors[0],
+                                                           colors[1],
+                                                           n_threads)
+
+                    else:
+                        asm.assemble_matrix_mapped(tmd[0], val, sign, offsets)
+
+                elif n_threads and is_real:
+                    colors = self.get_assembling_colors(rdc, iels)
+                    asm.assemble_matrix_colored(tmd[0], tmd[1], tmd[2], val,
+                                                iels, sign, rdc, cdc,
+                                                colors[0], colors[1],
+                                                n_threads, upper)
+
+                else:
+                    assemble(tmd[0], tmd[1], tmd[2], val, iels, sign, rdc,
+                             cdc, upper)
 
             else:
                 from scipy.sparse import coo_matrix
@@ -1524,6 +2268,10 @@ class Term(Struct):
                     active = (rows >= 0) & (cols >= 0)
                     vals, rows, cols = vals[active], rows[active], cols[active]
 
+                if upper:
+                    ii = rows <= cols
+                    vals, rows, cols = vals[ii], rows[ii], cols[ii]
+
                 extra = coo_matrix((sign * vals, (rows, cols)),
                                    shape=asm_obj.shape)
 
@@ -1,6 +1,6 @@
 import numpy as nm
 
-from sfepy.linalg import dot_sequences
+from sfepy.linalg import dot_sequences, broadcast_to_cells
 from sfepy.terms.terms import Term, terms
 from sfepy.terms.terms_th import THTerm, ETHTerm
 from sfepy.terms.terms_elastic import CauchyStressTerm
@@ -224,13 +224,15 @@ class BiotTHTerm(BiotTerm, THTerm):
                 def iter_kernel():
                     for ii, mat in enumerate(mats):
                         val_qp = self.get(qp_var, qp_name, step=-ii)
-                        mat = nm.tile(mat, (n_el, n_qp, 1, 1))
+                        mat = broadcast_to_cells(mat, (n_el, n_qp)
+                                                 + mat.shape[-2:])
                         yield ii, (ts.dt, val_qp, mat, svg, vvg, 0)
                 fargs = iter_kernel
 
             else:
                 val_qp = nm.array([0], ndmin=4, dtype=nm.float64)
-                mat = nm.tile(mats[0], (n_el, n_qp, 1, 1))
+                mat = broadcast_to_cells(mats[0], (n_el, n_qp)
+                                         + mats[0].shape[-2:])
                 fargs = ts.dt, val_qp, mat, svg, vvg, 1
 
             return fargs
@@ -32,6 +32,8 @@ class DiffusionTerm(Term):
     arg_shapes = {'material' : 'D, D', 'virtual' : (1, 'state'),
                   'state' : 1, 'parameter_1' : 1, 'parameter_2' : 1}
     modes = ('weak', 'eval')
+    is_linear = True
+    sum_factorized = True
     symbolic = {'expression': 'div( K * grad( u ) )',
                 'map' : {'u' : 'state', 'K' : 'material'}}
 
@@ -71,6 +73,26 @@ class DiffusionTerm(Term):
 
         return (n_el, 1, 1, 1), state.dtype
 
+    def eval_sum_factorized(self, sf, vals, mat, virtual, state):
+        grad = sf.eval_grad(vals)
+
+        if mat is None:
+            flux = grad
+
+        else:
+            key = self.get_sum_factorized_data_key()
+            mat = sf.get_qp_data(mat, key=key)
+            if mat is None:
+                return None
+
+            if mat.shape[-1] == 1:
+                flux = mat * grad
+
+            else:
+                flux = nm.matmul(grad, nm.swapaxes(mat, -1, -2))
+
+        return sf.integrate_grad(flux)
+
     def set_arg_types(self):
         if self.mode == 'weak':
             self.function = terms.dw_diffusion
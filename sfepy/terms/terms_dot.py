@@ -1,7 +1,7 @@
 import numpy as nm
 
 from sfepy.base.base import assert_
-from sfepy.linalg import dot_sequences
+from sfepy.linalg import dot_sequences, broadcast_to_cells
 from sfepy.terms.terms import Term, terms
 from sfepy.terms.terms_th import THTerm, ETHTerm
 
@@ -44,6 +44,8 @@ class DotProductVolumeTerm(Term):
                   {'opt_material' : 'D, D'},
                   {'opt_material' : None}]
     modes = ('weak', 'eval')
+    is_linear = True
+    sum_factorized = True
 
     @staticmethod
     def dw_dot(out, mat, val_qp, vgeo, sgeo, fun, fmode):
@@ -132,6 +134,23 @@ class DotProductVolumeTerm(Term):
 
         return (n_cell, 1, 1, 1), state.dtype
 
+    def eval_sum_factorized(self, sf, vals, mat, virtual, state):
+        val = sf.eval_val(vals)
+
+        if mat is not None:
+            key = self.get_sum_factorized_data_key()
+            mat = sf.get_qp_data(mat, key=key)
+            if mat is None:
+                return None
+
+            if mat.shape[-1] == 1:
+                val = mat[..., 0] * val
+
+            else:
+                val = nm.matmul(mat, val[..., None])[..., 0]
+
+        return sf.integrate_val(val)
+
     def set_arg_types(self):
         if self.mode == 'weak':
             self.function = self.dw_dot
@@ -252,14 +271,16 @@ class DotSProductVolumeOperatorWTHTerm(THTerm):
             def iter_kernel():
                 for ii, mat in enumerate(mats):
                     val_qp = self.get(state, 'val', step=-ii)
-                    mat = nm.tile(mat, (n_el, n_qp, 1, 1))
-                    yield ii, (ts.dt * mat, val_qp, vg, vg, 0)
+                    mat = broadcast_to_cells(ts.dt * mat,
+                                             (n_el, n_qp) + mat.shape[-2:])
+                    yield ii, (mat, val_qp, vg, vg, 0)
             fargs = iter_kernel
 
         else:
             val_qp = nm.array([0], ndmin=4, dtype=nm.float64)
-            mat = nm.tile(mats[0], (n_el, n_qp, 1, 1))
-            fargs = ts.dt * mat, val_qp, vg, vg, 1
+            mat = broadcast_to_cells(ts.dt * mats[0],
+                                     (n_el, n_qp) + mats[0].shape[-2:])
+            fargs = mat, val_qp, vg, vg, 1
 
         return fargs
 
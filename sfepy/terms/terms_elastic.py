@@ -1,6 +1,6 @@
 import numpy as nm
 
-from sfepy.linalg import dot_sequences
+from sfepy.linalg import dot_sequences, broadcast_to_cells
 from sfepy.homogenization.utils import iter_sym
 from sfepy.terms.terms import Term, terms
 from sfepy.terms.terms_th import THTerm, ETHTerm
@@ -48,6 +48,8 @@ class LinearElasticTerm(Term):
     arg_shapes = {'material' : 'S, S', 'virtual' : ('D', 'state'),
                   'state' : 'D', 'parameter_1' : 'D', 'parameter_2' : 'D'}
     modes = ('weak', 'eval')
+    is_linear = True
+    sum_factorized = True
 ##     symbolic = {'expression': expr,
 ##                 'map' : {'u' : 'state', 'D_sym' : 'material'}}
 
@@ -82,6 +84,27 @@ class LinearElasticTerm(Term):
 
         return (n_el, 1, 1, 1), state.dtype
 
+    def eval_sum_factorized(self, sf, vals, mat, virtual, state):
+        key = self.get_sum_factorized_data_key()
+        mat = sf.get_qp_data(mat, key=key)
+        if mat is None:
+            return None
+
+        grad = sf.eval_grad(vals)
+        dim = grad.shape[-1]
+
+        ir, ic = nm.array(list(iter_sym(dim))).T
+        strain = grad[..., ir, ic] + grad[..., ic, ir]
+        strain[..., :dim] *= 0.5
+
+        stress = nm.matmul(mat, strain[..., None])[..., 0]
+
+        flux = nm.empty_like(grad)
+        flux[..., ir, ic] = stress
+        flux[..., ic, ir] = stress
+
+        return sf.integrate_grad(flux)
+
     def set_arg_types(self):
         if self.mode == 'weak':
             self.function = terms.dw_lin_elastic
@@ -132,6 +155,13 @@ class LinearElasticIsotropicTerm(LinearElasticTerm):
                        mode=None, term_mode=None, diff_var=None, **kwargs):
         return LinearElasticTerm.get_eval_shape(self, None, None, state)
 
+    def eval_sum_factorized(self, sf, vals, lam, mu, virtual, state):
+        from sfepy.mechanics.matcoefs import stiffness_from_lame
+
+        mat = stiffness_from_lame(self.region.dim, lam, mu)[:, :, 0, 0, :, :]
+        return LinearElasticTerm.eval_sum_factorized(self, sf, vals, mat,
+                                                     virtual, state)
+
 class SDLinearElasticTerm(Term):
     r"""
     Sensitivity analysis of the linear elastic term.
@@ -213,13 +243,15 @@ class LinearElasticTHTerm(THTerm):
                     for ii, mat in enumerate(mats):
                         strain = self.get(state, 'cauchy_strain',
                                           step=-ii)
-                        mat = nm.tile(mat, (n_el, n_qp, 1, 1))
+                        mat = broadcast_to_cells(mat, (n_el, n_qp)
+                                                 + mat.shape[-2:])
                         yield ii, (ts.dt, strain, mat, vg, 0)
                 fargs = iter_kernel
 
             else:
                 strain = nm.array([0], ndmin=4, dtype=nm.float64)
-                mat = nm.tile(mats[0], (n_el, n_qp, 1, 1))
+                mat = broadcast_to_cells(mats[0], (n_el, n_qp)
+                                         + mats[0].shape[-2:])
                 fargs = ts.dt, strain, mat, vg, 1
 
             return fargs
@@ -568,7 +600,8 @@ class CauchyStressTHTerm(CauchyStressTerm, THTerm):
             for ii, mat in enumerate(mats):
                 strain = self.get(state, 'cauchy_strain',
                                   step=-ii)
-                mat = nm.tile(mat, (n_el, n_qp, 1, 1))
+                mat = broadcast_to_cells(mat, (n_el, n_qp)
+                                         + mat.shape[-2:])
                 yield ii, (ts.dt, strain, mat, vg, fmode)
 
         return iter_kernel
@@ -32,6 +32,7 @@ class DivGradTerm(Term):
                    'state' : 'D', 'parameter_1' : 'D', 'parameter_2' : 'D'},
                   {'opt_material' : None}]
     modes = ('weak', 'eval')
+    is_linear = True
 
     function = staticmethod(terms.term_ns_asm_div_grad)
 
@@ -214,6 +215,7 @@ class StokesTerm(Term):
                    'parameter_v' : 'D', 'parameter_s' : 1},
                   {'opt_material' : None}]
     modes = ('grad', 'div', 'eval')
+    is_linear = True
 
     @staticmethod
     def d_eval(out, coef, vec_qp, div, vvg):
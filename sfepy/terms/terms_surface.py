@@ -191,9 +191,8 @@ class ContactPlaneTerm(Term):
 
     @staticmethod
     def _get_force_pars(force_pars, shape):
-        k = force_pars[..., 0]
-        f0 = force_pars[..., 1]
-        k.shape = f0.shape = shape
+        k = force_pars[..., 0].reshape(shape)
+        f0 = force_pars[..., 1].reshape(shape)
 
         ir = f0 >= 1e-14
         eps = nm.where(ir, - 2.0 * f0 / k, 0.0)
@@ -17,6 +17,10 @@ compile_flags = '-g -O2'
 # extension modules.
 link_flags = ''
 
+# Flags used to compile and link the C extension modules with OpenMP support,
+# e.g. '-fopenmp' for gcc. If '', the threaded code paths run serially.
+openmp_flags = ''
+
 # Can be '' or one or several from '-DDEBUG_FMF', '-DDEBUG_MESH'. For
 # developers internal use only.
 debug_flags = ''
@@ -106,3 +106,120 @@ class Test(TestCommon):
                                   label1='assembled',
                                   label2='expected')
         return ok
+
+    def test_color_cells(self):
+        from sfepy.discrete.common.extmods.assemble import color_cells
+
+        conn = nm.array([[0, 1, 2],
+                         [2, 3, 4],
+                         [4, 5, 6],
+                         [6, 7, -1],
+                         [8, 9, 0]], dtype=nm.int32)
+        iels = nm.arange(len(conn), dtype=nm.int32)
+
+        color_ptr, color_items = color_cells(iels, conn, conn.max() + 1)
+        self.report('color pointers:', color_ptr)
+        self.report('color items:', color_items)
+
+        ok = ((color_ptr[-1] == len(iels))
+              and (nm.sort(color_items) == iels).all())
+        for ic in range(len(color_ptr) - 1):
+            cells = iels[color_items[color_ptr[ic]:color_ptr[ic + 1]]]
+            dofs = conn[cells].ravel()
+            dofs = dofs[dofs >= 0]
+            _ok = len(nm.unique(dofs)) == len(dofs)
+            self.report('color %d cells: %s, disjoint: %s'
+                        % (ic, cells, _ok))
+            ok = ok and _ok
+
+        return ok
+
+    def test_assemble_vector_colored(self):
+        from sfepy.discrete.common.extmods.assemble import (
+            assemble_vector_colored, color_cells)
+
+        vec = nm.zeros(self.num, dtype=nm.float64)
+
+        color_ptr, color_items = color_cells(self.iels, self.conn, self.num)
+        assemble_vector_colored(vec, self.vec_in_els, self.iels, 1, self.conn,
+                                color_ptr, color_items, 2)
+
+        aux = nm.array([1, 1, 3, 2, 2], dtype=nm.float64)
+
+        self.report('assembled: %s' % vec)
+        self.report('expected: %s' % aux)
+        ok = self.compare_vectors(vec, aux,
+                                  label1='assembled',
+                                  label2='expected')
+        return ok
+
+    def test_assemble_matrix_colored(self):
+        from sfepy.discrete.common.extmods.assemble import (
+            assemble_matrix_colored, color_cells)
+
+        mtx = sps.csr_matrix(nm.ones((self.num, self.num),
+                                     dtype=nm.float64))
+        mtx.data[:] = 0.0
+
+        color_ptr, color_items = color_cells(self.iels, self.conn, self.num)
+        assemble_matrix_colored(mtx.data, mtx.indptr, mtx.indices,
+                                self.mtx_in_els, self.iels, 1,
+                                self.conn, self.conn,
+                                color_ptr, color_items, 2)
+
+        aux = nm.array([[1, 1, 1, 0, 0],
+                        [1, 1, 1, 0, 0],
+                        [1, 1, 3, 2, 2],
+                        [0, 0, 2, 2, 2],
+                        [0, 0, 2, 2, 2]], dtype=nm.float64)
+
+        self.report('assembled:\n%s' % mtx.toarray())
+        self.report('expected:\n%s' % aux)
+        ok = self.compare_vectors(mtx, aux,
+                                  label1='assembled',
+                                  label2='expected')
+        return ok
+
+    def test_assemble_matrix_mapped(self):
+        from sfepy.discrete.common.extmods.assemble import (
+            assemble_matrix_mapped, assemble_matrix_mapped_colored,
+            create_scatter_map, color_cells)
+
+        mtx = sps.csr_matrix(nm.ones((self.num, self.num),
+                                     dtype=nm.float64))
+        mtx.data[:] = 0.0
+
+        conn = self.conn.copy()
+        conn[0, 0] = -1
+
+        offsets = create_scatter_map(mtx.indptr, mtx.indices, self.iels,
+                                     conn, conn)
+        self.report('scatter map:\n%s' % offsets)
+
+        aux = nm.array([[0, 0, 0, 0, 0],
+                        [0, 1, 1, 0, 0],
+                        [0, 1, 3, 2, 2],
+                        [0, 0, 2, 2, 2],
+                        [0, 0, 2, 2, 2]], dtype=nm.float64)
+
+        ok = True
+        for n_threads in [0, 2]:
+            mtx.data[:] = 0.0
+            if n_threads:
+                color_ptr, color_items = color_cells(self.iels, conn,
+                                                     self.num)
+                assemble_matrix_mapped_colored(mtx.data, self.mtx_in_els, 1,
+                                               offsets, color_ptr,
+                                               color_items, n_threads)
+
+            else:
+                assemble_matrix_mapped(mtx.data, self.mtx_in_els, 1, offsets)
+
+            self.report('assembled:\n%s' % mtx.toarray())
+            self.report('expected:\n%s' % aux)
+            _ok = self.compare_vectors(mtx, aux,
+                                       label1='assembled',
+                                       label2='expected')
+            ok = ok and _ok
+
+        return ok
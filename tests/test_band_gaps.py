@@ -0,0 +1,116 @@
+from __future__ import absolute_import
+import numpy as nm
+
+from sfepy.base.testing import TestCommon
+
+def eval_mass_eigs(freq):
+    """
+    The eigenvalues of a model frequency-dependent mass matrix with a
+    resonance at 1.
+    """
+    val = 1.0 - 0.5 * freq**2 / (freq**2 - 1.0)
+    return nm.array([val - 1.0, val])
+
+class Test(TestCommon):
+
+    @staticmethod
+    def from_conf(conf, options):
+        test = Test(conf=conf, options=options)
+        return test
+
+    def test_frequency_sweep(self):
+        from sfepy.homogenization.coefs_phononic import (FrequencySweep,
+                                                         find_zero)
+
+        freqs = nm.linspace(1.1, 3.0, 50)
+        ref = [eval_mass_eigs(f) for f in freqs]
+        val0 = find_zero(1.0 + 1e-8, 3.0, eval_mass_eigs, 1e-8, 1e-12, 0)
+        val1 = find_zero(1.0 + 1e-8, 3.0, eval_mass_eigs, 1e-8, 1e-12, 1)
+        self.report('zeros found by bisection:', val0, val1)
+
+        ok = True
+        for pool_kind in ['thread', 'process']:
+            sweep = FrequencySweep([eval_mass_eigs], n_process=3,
+                                   pool_kind=pool_kind)
+            try:
+                out = sweep.map(eval_mass_eigs, freqs)
+                pval0 = find_zero(1.0 + 1e-8, 3.0, eval_mass_eigs, 1e-8,
+                                  1e-12, 0, sweep=sweep)
+                pval1 = find_zero(1.0 + 1e-8, 3.0, eval_mass_eigs, 1e-8,
+                                  1e-12, 1, sweep=sweep)
+
+            finally:
+                sweep.close()
+
+            _ok = nm.allclose(out, ref, atol=0.0, rtol=0.0)
+            self.report('%s pool sweep:' % pool_kind, _ok)
+            ok = ok and _ok
+
+            self.report('zeros found by multisection:', pval0, pval1)
+            _ok = all((val[0] == pval[0]) and (abs(val[1] - pval[1]) < 1e-8)
+                      for val, pval in [(val0, pval0), (val1, pval1)])
+            self.report('%s pool multisection:' % pool_kind, _ok)
+            ok = ok and _ok
+
+        return ok
+
+    def test_frequency_sweep_start_methods(self):
+        """
+        Test the process pool sweep with the spawn default start method and
+        the fallback to the thread pool, where forking is not available.
+        """
+        import multiprocessing
+        from sfepy.homogenization.coefs_phononic import FrequencySweep
+
+        # A closure, that cannot be pickled.
+        shift = 0.5
+        def callback(freq):
+            return eval_mass_eigs(freq) + shift
+
+        freqs = nm.linspace(1.1, 3.0, 20)
+        ref = [callback(f) for f in freqs]
+
+        def sweep_freqs():
+            sweep = FrequencySweep([callback], n_process=2,
+                                   pool_kind='process')
+            try:
+                out = sweep.map(callback, freqs)
+
+            finally:
+                sweep.close()
+
+            return sweep.pool_kind, out
+
+        ok = True
+        start_method = multiprocessing.get_start_method(allow_none=True)
+        multiprocessing.set_start_method('spawn', force=True)
+        try:
+            pool_kind, out = sweep_freqs()
+
+        finally:
+            multiprocessing.set_start_method(start_method, force=True)
+
+        _ok = (pool_kind == 'process') and nm.allclose(out, ref, atol=0.0,
+                                                       rtol=0.0)
+        self.report('process pool sweep with spawn default:', _ok)
+        ok = ok and _ok
+
+        get_context = multiprocessing.get_context
+        def get_context_no_fork(method=None):
+            if method == 'fork':
+                raise ValueError('cannot find context for %r' % method)
+            return get_context(method)
+
+        multiprocessing.get_context = get_context_no_fork
+        try:
+            pool_kind, out = sweep_freqs()
+
+        finally:
+            multiprocessing.get_context = get_context
+
+        _ok = (pool_kind == 'thread') and nm.allclose(out, ref, atol=0.0,
+                                                      rtol=0.0)
+        self.report('thread pool sweep without fork:', _ok)
+        ok = ok and _ok
+
+        return ok
@@ -68,6 +68,12 @@ solvers = {
         'i_max' : 100,
         'largest' : False,
     }),
+    'evp4' : ('eig.scipy_slice', {
+        'window' : (0.0, 0.25),
+        'n_slice' : 3,
+        'n_eigs_slice' : 2,
+        'n_process' : 2,
+    }),
     'evp3' : ('eig.pysparse', {
         'i_max' : 100,
         'eps_a' : 1e-10,
@@ -145,3 +151,131 @@ class Test(TestCommon):
             self.report('%.2f [s] : %s (ok: %s)' % (row[1], row[0], row[2]))
 
         return ok
+
+    def test_warm_start(self):
+        import scipy.sparse as sps
+        import scipy.linalg as sla
+        from sfepy.base.base import Struct
+        from sfepy.linalg.sparse import set_matrix_generations
+
+        n_eigs = 5
+        n_dof = self.mtx.shape[0]
+        mtx_b = sps.diags(nm.linspace(1.0, 2.0, n_dof), 0, format='csr')
+        pot = sps.diags(nm.linspace(0.0, 0.1, n_dof), 0, format='csr')
+
+        # A sequence of problems with a slowly changing potential.
+        mtxs = [self.mtx + (0.1 * ii) * pot for ii in range(4)]
+        refs = [sla.eigh(mtx.toarray(), mtx_b.toarray(),
+                         eigvals_only=True)[:n_eigs] for mtx in mtxs]
+
+        ok = True
+        errs = {}
+        for warm_start in [False, True]:
+            eig_solver = Solver.any_from_conf(Struct(
+                name='lobpcg', kind='eig.scipy_lobpcg', i_max=10,
+                eps_a=1e-12, largest=False, warm_start=warm_start))
+
+            errs[warm_start] = []
+            for mtx, ref in zip(mtxs, refs):
+                eigs = eig_solver(mtx, mtx_b, n_eigs=n_eigs,
+                                  eigenvectors=False)
+                errs[warm_start].append(nm.abs(eigs - ref).max())
+
+            self.report('LOBPCG warm start %s errors:' % warm_start,
+                        errs[warm_start])
+
+        _ok = errs[True][-1] < (0.1 * errs[False][-1])
+        self.report('LOBPCG warm start more accurate:', _ok)
+        ok = ok and _ok
+
+        eig_solver = Solver.any_from_conf(Struct(
+            name='arpack', kind='eig.scipy', method='eigh', which='SA',
+            warm_start=True))
+        minvs = []
+        for mtx, ref in zip(mtxs, refs):
+            eigs = eig_solver(mtx, mtx_b.copy(), n_eigs=n_eigs,
+                              eigenvectors=False)
+            minvs.append(eig_solver.minv)
+
+            _ok = nm.allclose(eigs, ref, rtol=0.0, atol=1e-8)
+            self.report('ARPACK warm start eigenvalues:', _ok)
+            ok = ok and _ok
+
+        _ok = all(minv is minvs[0] for minv in minvs)
+        self.report('mass matrix factorization reused:', _ok)
+        ok = ok and _ok
+
+        # An assembled matrix is recognized by its generation counters.
+        set_matrix_generations(mtx_b)
+        minv0 = eig_solver.get_minv(mtx_b)
+        minv1 = eig_solver.get_minv(mtx_b)
+        set_matrix_generations(mtx_b)
+        minv2 = eig_solver.get_minv(mtx_b)
+        _ok = (minv1 is minv0) and (minv2 is not minv0)
+        self.report('mass matrix generations checked:', _ok)
+        ok = ok and _ok
+
+        return ok
+
+    def _get_reference_eigenvalues(self, vmax):
+        import scipy.linalg as sla
+
+        eigs = sla.eigh(self.mtx.toarray(), eigvals_only=True)
+        return eigs[eigs <= vmax]
+
+    def test_slice_doubling(self):
+        from sfepy.solvers.eigen import solve_eigen_slice
+
+        ref = self._get_reference_eigenvalues(0.25)
+        ref = ref[(ref >= 0.1) & (ref <= 0.2)]
+
+        # Only one eigenvalue computed initially in a slice with three.
+        eigs, vecs = solve_eigen_slice((self.mtx, None, 0.1, 0.2, 1e-8, 1,
+                                        {}))
+        self.report('slice eigenvalues:', eigs)
+        self.report('reference eigenvalues:', ref)
+
+        ii = nm.argsort(eigs)
+        eigs, vecs = eigs[ii], vecs[:, ii]
+        ok = (len(ref) == 3) and nm.allclose(eigs, ref, rtol=0.0, atol=1e-8)
+        self.report('all eigenvalues found:', ok)
+
+        res = self.mtx * vecs - vecs * eigs
+        _ok = nm.abs(res).max() < 1e-8
+        self.report('eigenvectors ok:', _ok)
+        ok = ok and _ok
+
+        return ok
+
+    def test_slice_boundaries(self):
+        from sfepy.base.base import Struct
+
+        ref = self._get_reference_eigenvalues(0.25)
+
+        # The double eigenvalue ref[1] and the simple eigenvalue ref[3] lie
+        # on the slice boundaries.
+        eig_solver = Solver.any_from_conf(Struct(
+            name='slice', kind='eig.scipy_slice',
+            window=[0.0, ref[1], ref[3], 0.25], n_eigs_slice=2))
+        status = {}
+        eigs, vecs = eig_solver(self.mtx, eigenvectors=True, status=status)
+        self.report('eigenvalues:', eigs)
+        self.report('reference eigenvalues:', ref)
+        self.report('duplicates removed:', status['n_dup'])
+
+        ok = ((len(eigs) == len(ref))
+              and nm.allclose(eigs, ref, rtol=0.0, atol=1e-8))
+        self.report('no eigenvalue lost or duplicated:', ok)
+
+        _ok = status['n_dup'] > 0
+        self.report('boundary eigenvalues found in both slices:', _ok)
+        ok = ok and _ok
+
+        # The eigenvectors of the double eigenvalues from different slices
+        # span their eigenspaces.
+        aux = nm.dot(vecs.T, vecs)
+        _ok = nm.allclose(aux, nm.eye(len(eigs)), rtol=0.0, atol=1e-6)
+        self.report('eigenvectors orthonormal:', _ok)
+        ok = ok and _ok
+
+        return ok
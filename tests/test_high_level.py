@@ -144,6 +144,515 @@ class Test(TestCommon):
 
         return ok
 
+    def test_matrix_cache(self):
+        from sfepy.base.base import goptions
+        from sfepy.discrete import FieldVariable, Material, Integral
+        from sfepy.terms import Term
+        from sfepy.mechanics.matcoefs import stiffness_from_lame
+
+        u = FieldVariable('u', 'unknown', self.field)
+        v = FieldVariable('v', 'test', self.field, primary_var_name='u')
+
+        m = Material('m', D=stiffness_from_lame(self.dim, 1.0, 1.0))
+
+        integral = Integral('i', order=3)
+
+        term = Term.new('dw_lin_elastic(m.D, v, u)',
+                        integral, self.omega, m=m, v=v, u=u)
+        term.setup()
+
+        aux = goptions['cache_term_matrices']
+        goptions['cache_term_matrices'] = True
+        try:
+            mtx0, iels0 = term.evaluate(mode='weak', diff_var='u')
+            mtx1, iels1 = term.evaluate(mode='weak', diff_var='u')
+            _ok = mtx1 is mtx0
+            self.report('cached matrices reused:', _ok)
+            ok = _ok
+
+            self.field.clear_mappings()
+            mtx2, iels2 = term.evaluate(mode='weak', diff_var='u')
+            _ok = (mtx2 is not mtx0) and nm.allclose(mtx2, mtx0)
+            self.report('invalidated by mappings update:', _ok)
+            ok = ok and _ok
+
+            m.reset()
+            mtx3, iels3 = term.evaluate(mode='weak', diff_var='u')
+            _ok = (mtx3 is not mtx2) and nm.allclose(mtx3, mtx0)
+            self.report('invalidated by material update:', _ok)
+            ok = ok and _ok
+
+        finally:
+            goptions['cache_term_matrices'] = aux
+
+        return ok
+
+    def test_material_caches(self):
+        from sfepy.discrete import (FieldVariable, Material, Integral,
+                                    Equation, Equations)
+        from sfepy.solvers.ts import TimeStepper
+        from sfepy.terms import Term
+
+        u = FieldVariable('u', 'unknown', self.field)
+        v = FieldVariable('v', 'test', self.field, primary_var_name='u')
+
+        calls = []
+        def get_pars(ts, coors, mode=None, names=None, **kwargs):
+            if mode != 'qp': return
+
+            calls.append(names)
+            val = nm.ones((coors.shape[0], 1, 1), dtype=nm.float64)
+            out = {'D' : coors[:, 0:1, None] * val,
+                   'f' : ts.time * val,
+                   'c' : coors[:, 1:2, None] * (1.0 + ts.time) * val}
+            if names is not None:
+                out = {name : out[name] for name in names}
+
+            return out
+
+        m = Material('m', function=get_pars,
+                     flags={'time_independent' : ['D'],
+                            'state_independent' : ['f']})
+
+        integral = Integral('i', order=3)
+        term = Term.new('dw_volume_dot(m.D, v, u)',
+                        integral, self.omega, m=m, v=v, u=u)
+        eqs = Equations([Equation('eq', term)])
+
+        ts = TimeStepper(0.0, 1.0, n_step=3)
+        key = term.get_qp_key()
+
+        m.time_update(ts, eqs)
+        qps0 = m.qps_cache[key][3]
+        datas0 = m.datas[key]
+
+        m.time_update(ts, eqs)
+        ts.advance()
+        m.time_update(ts, eqs)
+        datas = m.datas[key]
+
+        _ok = calls == [None, ['c'], ['c', 'f']]
+        self.report('only changing parameters reevaluated:', _ok, calls)
+        ok = _ok
+
+        _ok = ((datas['D'] is datas0['D'])
+               and nm.allclose(datas['f'], ts.time)
+               and nm.allclose(datas['c'], datas0['c'] * 1.5))
+        self.report('parameter values correct:', _ok)
+        ok = ok and _ok
+
+        _ok = m.qps_cache[key][3] is qps0
+        self.report('physical quadrature points reused:', _ok)
+        ok = ok and _ok
+
+        coors0 = self.omega.domain.mesh.coors.copy()
+        try:
+            self.omega.domain.mesh.coors[:] *= 2.0
+            m.time_update(ts, eqs)
+
+        finally:
+            self.omega.domain.mesh.coors[:] = coors0
+
+        qps = m.qps_cache[key][3]
+        _ok = ((calls[-1] is None) and (qps is not qps0)
+               and nm.allclose(qps.values, 2.0 * qps0.values)
+               and nm.allclose(m.datas[key]['D'], 2.0 * datas0['D']))
+        self.report('invalidated by mesh motion:', _ok)
+        ok = ok and _ok
+
+        return ok
+
+    def test_broadcast_materials(self):
+        from sfepy.discrete import FieldVariable, Material, Integral
+        from sfepy.terms import Term
+        from sfepy.mechanics.matcoefs import stiffness_from_lame
+
+        u = FieldVariable('u', 'unknown', self.field)
+        v = FieldVariable('v', 'test', self.field, primary_var_name='u')
+
+        integral = Integral('i', order=3)
+        n_el = self.omega.shape.n_cell
+        mtx_d = stiffness_from_lame(self.dim, 1.0, 1.0)
+        coefs = nm.linspace(1.0, 2.0, n_el)[:, None, None, None]
+
+        def get_pars(ts, coors, mode=None, kind=None, **kwargs):
+            if mode != 'qp': return
+
+            if kind == 'per-cell':
+                val = coefs * mtx_d
+
+            elif kind == 'per-qp':
+                n_qp = coors.shape[0] // n_el
+                val = nm.repeat(coefs[:, 0], n_qp, axis=0) * mtx_d
+
+            else:
+                val = nm.tile(mtx_d, (coors.shape[0], 1, 1))
+
+            return {'D' : val}
+
+        def eval_matrix(m):
+            term = Term.new('dw_lin_elastic(m.D, v, u)',
+                            integral, self.omega, m=m, v=v, u=u)
+            term.setup()
+            mtx, iels = term.evaluate(mode='weak', diff_var='u')
+            return mtx, m.get_data(term.get_qp_key(), 'D')
+
+        m = Material('m', D=mtx_d)
+        mtx0, val0 = eval_matrix(m)
+
+        m = Material('m', function=get_pars)
+        mtx1, val1 = eval_matrix(m)
+
+        _ok = (val0.strides[0] == 0) and (val1.strides[0] != 0)
+        self.report('constant data not copied to cells:', _ok)
+        ok = _ok
+
+        _ok = nm.allclose(mtx0, mtx1, rtol=0.0, atol=1e-14)
+        self.report('same matrices:', _ok)
+        ok = ok and _ok
+
+        m.set_extra_args(kind='per-cell')
+        mtx2, val2 = eval_matrix(m)
+        m.set_extra_args(kind='per-qp')
+        mtx3, val3 = eval_matrix(m)
+
+        _ok = ((val2.strides[1] == 0) and (val3.strides[1] != 0)
+               and nm.allclose(mtx2, mtx3, rtol=0.0, atol=1e-14)
+               and nm.allclose(mtx2, coefs * mtx0, rtol=0.0, atol=1e-14))
+        self.report('per-cell data broadcast over quadrature points:', _ok)
+        ok = ok and _ok
+
+        return ok
+
+    def test_graph_cache(self):
+        import shutil
+        from sfepy.discrete.common.extmods.cmesh import create_mesh_graph
+        from sfepy.discrete.graph_cache import (MatrixGraphCache,
+                                                create_cached_mesh_graph)
+
+        n_nod = self.field.n_nod
+        conn = self.field.econn
+        aux = create_mesh_graph(n_nod, n_nod, 1, [conn], [conn])
+
+        cache_dir = op.join(self.options.out_dir, 'graph_cache')
+        if op.exists(cache_dir):
+            shutil.rmtree(cache_dir)
+        cache = MatrixGraphCache(max_mem=1, cache_dir=cache_dir)
+
+        def _check(msg, stats):
+            graph = create_cached_mesh_graph(n_nod, n_nod, 1, [conn], [conn],
+                                             cache=cache)
+            _ok = ((graph[0] == aux[0])
+                   and nm.all(graph[1] == aux[1])
+                   and nm.all(graph[2] == aux[2])
+                   and (cache.stats == stats))
+            self.report('%s: %s' % (msg, _ok))
+            return _ok
+
+        ok = _check('created', {'hits' : 0, 'disk_hits' : 0, 'misses' : 1})
+        ok = _check('from memory',
+                    {'hits' : 1, 'disk_hits' : 0, 'misses' : 1}) and ok
+
+        cache.clear()
+        ok = _check('from disk',
+                    {'hits' : 0, 'disk_hits' : 1, 'misses' : 0}) and ok
+
+        # Too small memory limit.
+        cache = MatrixGraphCache(max_mem=1e-4)
+        ok = _check('not stored',
+                    {'hits' : 0, 'disk_hits' : 0, 'misses' : 1}) and ok
+        _ok = (len(cache.graphs) == 0) and (cache.mem == 0)
+        self.report('empty cache:', _ok)
+        ok = ok and _ok
+
+        return ok
+
+    def test_mapping_cache(self):
+        import shutil
+        from sfepy.discrete import Integral
+        from sfepy.discrete.mapping_cache import MappingCache, get_mapping_size
+
+        field = self.field
+        integrals = [Integral('i', order=order) for order in [1, 2, 3]]
+        refs = [field.create_mapping(self.omega, integral, 'volume')[0]
+                for integral in integrals]
+        size = max(get_mapping_size(geo) for geo in refs)
+
+        cache_dir = op.join(self.options.out_dir, 'mapping_cache')
+        if op.exists(cache_dir):
+            shutil.rmtree(cache_dir)
+
+        def _check(msg, cache, stats, rtol=0.0):
+            field.mappings = cache
+            _ok = True
+            for ii in [0, 1, 2, 0, 1, 2]:
+                geo, _ = field.get_mapping(self.omega, integrals[ii], 'volume')
+                for name in ['bf', 'bfg', 'det', 'volume']:
+                    val = getattr(geo, name)
+                    _ok = (_ok and (val.dtype == nm.float64)
+                           and nm.allclose(val, getattr(refs[ii], name),
+                                           rtol=rtol, atol=0.0))
+
+            _ok = _ok and (cache.stats == stats)
+            self.report('%s: %s, %s' % (msg, cache.stats, _ok))
+            return _ok
+
+        mappings = field.mappings
+        try:
+            cache = MappingCache()
+            ok = _check('no limit', cache,
+                        {'hits' : 3, 'disk_hits' : 0, 'misses' : 3})
+
+            cache = MappingCache(max_mem=1.5 * size / 1024**2)
+            _ok = _check('LRU, limited memory', cache,
+                         {'hits' : 0, 'disk_hits' : 0, 'misses' : 6})
+            _ok = _ok and (len(cache) == 1)
+            ok = ok and _ok
+
+            cache = MappingCache(max_mem=1.5 * size / 1024**2,
+                                 cache_dir=cache_dir)
+            _ok = _check('LRU, spill to disk', cache,
+                         {'hits' : 1, 'disk_hits' : 2, 'misses' : 3})
+            geo, _ = field.get_mapping(self.omega, integrals[0], 'volume')
+            _ok = (_ok and (len(cache) == 3) and (cache.mem <= size)
+                   and isinstance(geo.bfg, nm.memmap))
+            self.report('served from memory-mapped files:', _ok)
+            spill_dir = cache.spill_dir
+            cache.clear()
+            _ok = _ok and (len(cache) == 0) and not op.exists(spill_dir)
+            self.report('spilled mappings removed:', _ok)
+            ok = ok and _ok
+
+            cache = MappingCache(bfg_dtype=nm.float32)
+            _ok = _check('float32 gradients', cache,
+                         {'hits' : 3, 'disk_hits' : 0, 'misses' : 3},
+                         rtol=1e-6)
+            geo0, _ = field.get_mapping(self.omega, integrals[0], 'volume')
+            geo1, _ = field.get_mapping(self.omega, integrals[0], 'volume')
+            _ok = (_ok and (geo0 is geo1) and (len(cache.expanded) == 1)
+                   and (cache.mem < sum(get_mapping_size(geo)
+                                        for geo in refs)))
+            self.report('expanded mapping reused:', _ok)
+            ok = ok and _ok
+
+        finally:
+            field.mappings = mappings
+
+        return ok
+
+    def test_profiling(self):
+        from sfepy.base.base import goptions
+        from sfepy.base.profiling import profiler
+        from sfepy.discrete import FieldVariable, Material, Integral
+        from sfepy.terms import Term
+
+        u = FieldVariable('u', 'parameter', self.field,
+                          primary_var_name='(set-to-None)')
+        u.set_constant(1.0)
+        m = Material('m', val=2.0)
+
+        integral = Integral('i', order=3)
+        term = Term.new('ev_integrate_mat(m.val, u)',
+                        integral, self.omega, m=m, u=u)
+        term.setup()
+
+        aux = goptions['profile']
+        goptions['profile'] = True
+        profiler.reset()
+        try:
+            self.field.clear_mappings()
+            term.evaluate(mode='eval')
+            term.evaluate(mode='eval')
+
+        finally:
+            goptions['profile'] = aux
+            profiler.stop()
+
+        report = profiler.get_report()
+        profiler.print_report()
+
+        key = 'ev_integrate_mat.3.Omega(m.val, u)'
+        ok = ((report['terms'][key]['calls'] == 2)
+              and (report['regions']['Omega']['calls'] == 2)
+              and (report['materials']['m']['calls'] == 1)
+              and (report['mappings']['fu.Omega.volume']['calls'] == 1))
+        self.report('call counts:', ok)
+
+        profiler.reset()
+        term.evaluate(mode='eval')
+        _ok = profiler.get_report() == {}
+        self.report('profiling disabled:', _ok)
+        ok = ok and _ok
+
+        return ok
+
+    def test_chunked_evaluation(self):
+        from sfepy.discrete import FieldVariable, Material, Integral
+        from sfepy.terms import Term
+        from sfepy.mechanics.matcoefs import stiffness_from_lame
+
+        u = FieldVariable('u', 'unknown', self.field)
+        v = FieldVariable('v', 'test', self.field, primary_var_name='u')
+        u.set_constant(1.0)
+
+        m = Material('m', D=stiffness_from_lame(self.dim, 1.0, 1.0))
+
+        integral = Integral('i', order=3)
+
+        term = Term.new('dw_lin_elastic(m.D, v, u)',
+                        integral, self.omega, m=m, v=v, u=u)
+        term.setup()
+
+        ok = True
+        for diff_var in [None, 'u']:
+            vals, iels = term.evaluate(mode='weak', diff_var=diff_var)
+
+            chunks = list(term.evaluate_chunked(7, diff_var=diff_var))
+            cvals = nm.concatenate([chunk[0] for chunk in chunks])
+            ciels = nm.concatenate([chunk[1] for chunk in chunks])
+
+            _ok = ((len(chunks) == (len(iels) + 6) // 7)
+                   and (max(len(chunk[1]) for chunk in chunks) <= 7)
+                   and (ciels == iels).all()
+                   and (cvals == vals).all())
+            self.report('diff_var: %s, %d chunks, same values: %s'
+                        % (diff_var, len(chunks), _ok))
+            ok = ok and _ok
+
+        return ok
+
+    def test_threaded_evaluation(self):
+        from sfepy.base.base import goptions
+        from sfepy.discrete import FieldVariable, Material, Integral
+        from sfepy.terms import Term
+        from sfepy.mechanics.matcoefs import stiffness_from_lame
+
+        u = FieldVariable('u', 'unknown', self.field)
+        v = FieldVariable('v', 'test', self.field, primary_var_name='u')
+        u.set_data(nm.linspace(0, 1, u.n_dof))
+
+        m = Material('m', D=stiffness_from_lame(self.dim, 1.0, 1.0))
+
+        integral = Integral('i', order=3)
+
+        term = Term.new('dw_lin_elastic(m.D, v, u)',
+                        integral, self.omega, m=m, v=v, u=u)
+        term.setup()
+
+        eterm = Term.new('ev_cauchy_stress(m.D, u)',
+                         integral, self.omega, m=m, u=u)
+        eterm.setup()
+
+        def evaluate():
+            out = [term.evaluate(mode='weak', diff_var=diff_var)[0]
+                   for diff_var in [None, 'u']]
+            out.append(eterm.evaluate(mode='el_avg'))
+            return out
+
+        n_threads = goptions['n_threads']
+        try:
+            goptions['n_threads'] = 0
+            vals0 = evaluate()
+            goptions['n_threads'] = 3
+            vals = evaluate()
+
+        finally:
+            goptions['n_threads'] = n_threads
+
+        ok = True
+        for ii, val in enumerate(vals):
+            _ok = nm.allclose(val, vals0[ii], rtol=0.0, atol=1e-14)
+            self.report('%d: same values: %s' % (ii, _ok))
+            ok = ok and _ok
+
+        return ok
+
+    def test_sum_factorization(self):
+        from sfepy.base.base import goptions
+        from sfepy.mesh.mesh_generators import gen_block_mesh
+        from sfepy.discrete.fem import FEDomain, Field
+        from sfepy.discrete import (FieldVariable, Material, Integral,
+                                    Equation, Equations, Problem)
+        from sfepy.terms import Term
+        from sfepy.mechanics.matcoefs import stiffness_from_lame
+        from sfepy.discrete.fem.geometry_element import GeometryElement
+        from sfepy.discrete.fem.poly_spaces import PolySpace
+        from sfepy.discrete.fem.sum_factorization import SumFactorization
+
+        def evaluate(dim, base, term_str, shape, **mat_vals):
+            mesh = gen_block_mesh([1.0] * dim, [3] * dim, [0.5] * dim,
+                                  name='block', verbose=False)
+            mesh.coors[:] += 0.05 * nm.sin(4.0 * mesh.coors[:, ::-1])
+            domain = FEDomain('domain', mesh)
+            omega = domain.create_region('Omega', 'all')
+            field = Field.from_args('f', nm.float64, shape, omega,
+                                    approx_order=3, poly_space_base=base)
+
+            u = FieldVariable('u', 'unknown', field)
+            v = FieldVariable('v', 'test', field, primary_var_name='u')
+            m = Material('m', **mat_vals)
+            integral = Integral('i', order=6)
+
+            term = Term.new(term_str, integral, omega, m=m, v=v, u=u)
+            pb = Problem('problem', equations=Equations([Equation('eq', term)]),
+                         active_only=True)
+            pb.time_update()
+            pb.update_materials()
+
+            state = pb.create_state()
+            state.vec[:] = nm.linspace(-1.0, 1.0, state.vec.shape[0])**2
+            vec = nm.cos(nm.arange(state.vec.shape[0], dtype=nm.float64))
+
+            ev = pb.get_evaluator()
+            out = []
+            for flag in [False, True]:
+                goptions['sum_factorization'] = flag
+                out.append((ev.eval_residual(state()),
+                            pb.equations.eval_tangent_action(state(), vec)))
+
+            return out, len(field.sum_factorizations) > 0
+
+        ok = True
+        sum_factorization = goptions['sum_factorization']
+        try:
+            for dim in [2, 3]:
+                mtx_d = stiffness_from_lame(dim, 1.0, 2.0)
+                mtx_m = nm.eye(dim) + 0.1
+                for base in ['lagrange', 'lobatto']:
+                    for term_str, shape, mat_vals in [
+                            ('dw_laplace(m.c, v, u)', 1, {'c' : 2.0}),
+                            ('dw_volume_dot(m.M, v, u)', dim, {'M' : mtx_m}),
+                            ('dw_lin_elastic(m.D, v, u)', dim, {'D' : mtx_d}),
+                    ]:
+                        out, used = evaluate(dim, base, term_str, shape,
+                                             **mat_vals)
+                        _ok = used
+                        for val0, val1 in zip(*out):
+                            _ok = _ok and nm.allclose(val1, val0, rtol=0.0,
+                                                      atol=1e-12
+                                                      * nm.abs(val0).max())
+                        self.report('%dD %s %s: same residual and action: %s'
+                                    % (dim, base, term_str, _ok))
+                        ok = ok and _ok
+
+        finally:
+            goptions['sum_factorization'] = sum_factorization
+
+        gel = GeometryElement('2_4')
+        ps = PolySpace.any_from_args('ps', gel, 2, base='lagrange')
+        sf = SumFactorization(ps, [0.2, 0.8], [0.5, 0.5])
+        data = nm.ones((3, 5, 1, 1))
+        out0 = sf.get_qp_data(data, key=(('m', 'c'), (1,)))
+        data[:, 1] = 2.0
+        out1 = sf.get_qp_data(data, key=(('m', 'c'), (1,)))
+        out2 = sf.get_qp_data(data, key=(('m', 'c'), (2,)))
+        _ok = ((out0.shape == (3, 1, 1, 1)) and (out1 is not None)
+               and (out2 is None))
+        self.report('constancy in QPs checked once per data version:', _ok)
+        ok = ok and _ok
+
+        return ok
+
     def test_solving(self):
         from sfepy.base.base import IndexedStruct
         from sfepy.discrete import (FieldVariable, Material, Problem, Function,
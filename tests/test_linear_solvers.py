@@ -299,3 +299,309 @@ class Test(TestCommon):
             self.report('sol0 == 2 * sol2:', _ok); ok = ok and _ok
 
         return ok
+
+    def test_ls_generations(self):
+        import numpy as nm
+        from sfepy.solvers import Solver
+        from sfepy.discrete.state import State
+        from sfepy.linalg.sparse import get_matrix_generations
+
+        self.problem.init_solvers(ls_conf=self.problem.solver_confs['d00'])
+        nls = self.problem.get_nls()
+
+        state0 = State(self.problem.equations.variables)
+        state0.apply_ebc()
+        vec0 = state0.get_reduced()
+
+        self.problem.update_materials()
+
+        rhs = nls.fun(vec0)
+        mtx = nls.fun_grad(vec0)
+        gen0 = get_matrix_generations(mtx)
+
+        conf = self.problem.solver_confs['d00'].copy()
+        conf.presolve = True
+        ls = Solver.any_from_conf(conf)
+        sol0 = ls(rhs, mtx=mtx)
+        digest0 = ls.mtx_digest
+        solve0 = ls.solve
+
+        sol1 = ls(rhs, mtx=mtx)
+        solve1 = ls.solve
+
+        mtx = nls.fun_grad(vec0)
+        gen1 = get_matrix_generations(mtx)
+        sol2 = ls(rhs, mtx=mtx)
+        digest2 = ls.mtx_digest
+
+        ok = True
+        _ok = (gen0 is not None) and (digest0[1] == gen0)
+        self.report('digest uses generations:', _ok); ok = ok and _ok
+        _ok = solve0 is solve1
+        self.report('factorization reused:', _ok); ok = ok and _ok
+        _ok = (gen1[0] == gen0[0]) and (gen1[1] > gen0[1])
+        self.report('same structure, new values:', _ok); ok = ok and _ok
+        _ok = (digest2[1] == gen1) and (ls.solve is not solve1)
+        self.report('refactorized:', _ok); ok = ok and _ok
+        _ok = (nm.allclose(sol0, sol1, atol=1e-12, rtol=0.0)
+               and nm.allclose(sol0, sol2, atol=1e-12, rtol=0.0))
+        self.report('same solutions:', _ok); ok = ok and _ok
+
+        return ok
+
+    def test_matrix_free(self):
+        import numpy as nm
+        from sfepy.solvers import Solver
+        from sfepy.discrete.state import State
+        from sfepy.discrete.evaluate import MatrixFreeOperator
+
+        self.problem.init_solvers(ls_conf=self.problem.solver_confs['d00'])
+        nls = self.problem.get_nls()
+
+        state0 = State(self.problem.equations.variables)
+        state0.apply_ebc()
+        vec0 = state0.get_reduced()
+
+        self.problem.update_materials()
+
+        rhs = nls.fun(vec0)
+        mtx = nls.fun_grad(vec0)
+
+        ok = True
+        for precond in [None, 'diagonal', 'block']:
+            op = MatrixFreeOperator(self.problem, state0(), precond=precond)
+
+            _ok = op.chunk_size > 0
+            self.report('%s: chunked cell evaluation: %s' % (precond, _ok))
+            ok = ok and _ok
+
+            _ok = nm.allclose(op * rhs, mtx * rhs, atol=1e-12, rtol=0.0)
+            self.report('%s: same product: %s' % (precond, _ok))
+            ok = ok and _ok
+
+            for name in ['i20', 'i21']:
+                ls = Solver.any_from_conf(self.problem.solver_confs[name])
+                sol0 = ls(rhs, mtx=mtx)
+                sol = ls(rhs, mtx=op)
+
+                _ok = nm.allclose(sol, sol0, atol=1e-6, rtol=0.0)
+                self.report('%s, %s: same solution: %s' % (precond, name, _ok))
+                ok = ok and _ok
+
+        return ok
+
+    def test_symmetric_storage(self):
+        import numpy as nm
+        import scipy.sparse as sp
+        from sfepy.solvers import Solver
+        from sfepy.discrete.state import State
+        from sfepy.linalg.sparse import SymmetricCSRMatrix
+
+        eqs = self.problem.equations
+
+        state0 = State(eqs.variables)
+        state0.apply_ebc()
+
+        self.problem.update_materials()
+
+        mtx = eqs.eval_tangent_matrices(state0(), eqs.create_matrix_graph())
+        mtx_s = eqs.eval_tangent_matrices(state0(),
+                                          eqs.create_matrix_graph(symmetric=True))
+
+        ok = isinstance(mtx_s, SymmetricCSRMatrix)
+        self.report('symmetric matrix: %s' % ok)
+
+        aux = (sp.triu(mtx) - mtx_s.get_upper()).tocsr()
+        _ok = mtx_s.nnz < mtx.nnz and (abs(aux).max() < 1e-12)
+        self.report('upper triangle: %s' % _ok)
+        ok = ok and _ok
+
+        _ok = abs(mtx_s.get_full() - mtx).max() < 1e-12
+        self.report('full matrix: %s' % _ok)
+        ok = ok and _ok
+
+        n_dof = mtx.shape[0]
+        _ok = ((abs(mtx_s[n_dof // 2:, :n_dof // 2]
+                    - mtx[n_dof // 2:, :n_dof // 2]).max() < 1e-12)
+               and nm.allclose(mtx_s.toarray(), mtx.toarray(),
+                               atol=1e-12, rtol=0.0))
+        self.report('indexing and conversions: %s' % _ok)
+        ok = ok and _ok
+
+        mtx_n = SymmetricCSRMatrix.from_full(mtx + sp.triu(mtx, k=1) * 1e-3)
+        try:
+            eqs.check_tangent_symmetry(state0(), mtx_n)
+
+        except ValueError:
+            _ok = True
+
+        else:
+            _ok = False
+        eqs.check_tangent_symmetry(state0(), mtx_s)
+        self.report('nonsymmetric matrix detected: %s' % _ok)
+        ok = ok and _ok
+
+        rhs = nm.random.RandomState(0).rand(mtx.shape[0])
+        _ok = nm.allclose(mtx_s * rhs, mtx * rhs, atol=1e-12, rtol=0.0)
+        self.report('same product: %s' % _ok)
+        ok = ok and _ok
+
+        for name in ['d00', 'd01', 'd10', 'i20']:
+            conf = self.problem.solver_confs[name]
+            try:
+                ls = Solver.any_from_conf(conf)
+                sol0 = ls(rhs, mtx=mtx)
+                sol = ls(rhs, mtx=mtx_s)
+
+            except (ImportError, AttributeError, OSError):
+                if conf.kind in self.can_fail:
+                    self.report('%s not available' % name)
+                    continue
+                raise
+
+            _ok = nm.allclose(sol, sol0, atol=1e-8, rtol=0.0)
+            self.report('%s: same solution: %s' % (name, _ok))
+            ok = ok and _ok
+
+        return ok
+
+    def test_block_rhs(self):
+        import numpy as nm
+        from sfepy.base.base import IndexedStruct
+        from sfepy.solvers import Solver
+        from sfepy.discrete.state import State
+
+        eqs = self.problem.equations
+
+        state0 = State(eqs.variables)
+        state0.apply_ebc()
+
+        self.problem.update_materials()
+
+        mtx = eqs.eval_tangent_matrices(state0(), eqs.create_matrix_graph())
+        rhs = nm.random.RandomState(0).rand(mtx.shape[0], 3)
+
+        ok = True
+        for name in ['d00', 'd01', 'd10', 'i00', 'i02', 'i12', 'i20']:
+            conf = self.problem.solver_confs[name]
+            status = IndexedStruct()
+            try:
+                ls = Solver.any_from_conf(conf, status=status)
+                sol = ls(rhs, mtx=mtx)
+                sols = [ls(rhs[:, ic], mtx=mtx) for ic in range(rhs.shape[1])]
+
+            except (ImportError, AttributeError, OSError):
+                if conf.kind in self.can_fail:
+                    self.report('%s not available' % name)
+                    continue
+                raise
+
+            _ok = ((sol.shape == rhs.shape)
+                   and nm.allclose(sol, nm.column_stack(sols), atol=1e-8,
+                                   rtol=0.0))
+            self.report('%s: same block solution: %s' % (name, _ok))
+            ok = ok and _ok
+
+        return ok
+
+    def test_factorization_cache(self):
+        import numpy as nm
+        from sfepy.base.base import goptions
+        from sfepy.solvers import Solver
+        from sfepy.discrete.state import State
+        from sfepy.linalg.sparse import set_matrix_generations
+        from sfepy.solvers.factorization_cache import (factorization_cache,
+                                                       FactorizationCache)
+
+        eqs = self.problem.equations
+
+        state0 = State(eqs.variables)
+        state0.apply_ebc()
+
+        self.problem.update_materials()
+
+        mtx1 = eqs.eval_tangent_matrices(state0(), eqs.create_matrix_graph())
+        set_matrix_generations(mtx1)
+        mtx2 = 2.0 * mtx1
+        set_matrix_generations(mtx2)
+        rhs = nm.random.RandomState(0).rand(mtx1.shape[0])
+
+        conf = self.problem.solver_confs['d01']
+        sol1 = Solver.any_from_conf(conf)(rhs, mtx=mtx1)
+
+        factorization_cache.clear()
+        goptions['factorization_cache_size'] = 1000
+        try:
+            ls1 = Solver.any_from_conf(conf)
+            ls2 = Solver.any_from_conf(conf)
+            sols = []
+            for ls, mtx in [(ls1, mtx1), (ls1, mtx2), (ls1, mtx1),
+                            (ls2, mtx2)]:
+                sols.append(ls(rhs, mtx=mtx))
+
+        finally:
+            goptions['factorization_cache_size'] = 0
+
+        stats = factorization_cache.stats
+        self.report('cache statistics:', stats)
+        ok = (stats['misses'] == 2) and (stats['hits'] == 2)
+        self.report('factorizations reused:', ok)
+
+        _ok = (nm.allclose(sols[0], sol1, atol=1e-10, rtol=0.0)
+               and nm.allclose(sols[2], sol1, atol=1e-10, rtol=0.0)
+               and nm.allclose(sols[1], 0.5 * sol1, atol=1e-10, rtol=0.0)
+               and nm.allclose(sols[3], 0.5 * sol1, atol=1e-10, rtol=0.0))
+        self.report('same solutions:', _ok)
+        ok = ok and _ok
+
+        cache = FactorizationCache(max_mem=2.5 / 1024)
+        for ii in range(3):
+            cache.put(ii, ii, 1024)
+        _ok = ((cache.get(0) is None) and (cache.get(2) == 2)
+               and (cache.stats['evictions'] == 1))
+        self.report('least recently used factorization evicted:', _ok)
+        ok = ok and _ok
+
+        factorization_cache.clear()
+
+        return ok
+
+    def test_krylov_recycling(self):
+        import numpy as nm
+        import scipy.sparse as sp
+        from sfepy.base.base import IndexedStruct
+        from sfepy.solvers.ls import ScipyIterative
+
+        # A sequence of similar systems, as in time stepping.
+        nn = 50
+        aux = sp.diags([-1.0, 2.0, -1.0], [-1, 0, 1], shape=(nn, nn))
+        mtx = (sp.kron(aux, sp.eye(nn)) + sp.kron(sp.eye(nn), aux)).tocsr()
+        coors = nm.linspace(0, 1, mtx.shape[0])
+        rhss = [nm.sin(3 * coors + 0.1 * step) for step in range(6)]
+
+        ok = True
+        n_iters = []
+        for recycle in [0, 20]:
+            status = IndexedStruct()
+            ls = ScipyIterative({'method' : 'gcrotmk', 'recycle' : recycle,
+                                 'i_max' : 1000, 'eps_a' : 1e-8,
+                                 'eps_r' : 1e-8},
+                                status=status)
+            n_iter = 0
+            for ii, rhs in enumerate(rhss):
+                sol = ls(rhs, mtx=mtx)
+                n_iter += status.n_iter
+
+                _ok = nm.linalg.norm(mtx * sol - rhs) < 1e-6
+                ok = ok and _ok
+
+            self.report('recycle: %d, iterations: %d' % (recycle, n_iter))
+            n_iters.append(n_iter)
+
+        self.report('solutions converged:', ok)
+
+        _ok = n_iters[1] < n_iters[0]
+        self.report('fewer iterations with recycling:', _ok)
+        ok = ok and _ok
+
+        return ok
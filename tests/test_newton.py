@@ -0,0 +1,79 @@
+from __future__ import absolute_import
+import numpy as nm
+import scipy.sparse as sps
+
+from sfepy.base.testing import TestCommon
+
+def define_system(n_dof=50, coef=0.5):
+    """
+    Define the nonlinear system :math:`A x + c x^3 = b`.
+    """
+    mtx = sps.diags([-1.0, 2.5, -1.0], [-1, 0, 1], shape=(n_dof, n_dof),
+                    format='csr')
+    rhs = nm.linspace(1.0, 2.0, n_dof)
+
+    def fun(vec_x):
+        return mtx * vec_x + coef * vec_x**3 - rhs
+
+    def fun_grad(vec_x):
+        return (mtx + sps.diags(3.0 * coef * vec_x**2, 0)).tocsr()
+
+    return fun, fun_grad
+
+class Test(TestCommon):
+
+    @staticmethod
+    def from_conf(conf, options):
+        test = Test(conf=conf, options=options)
+        return test
+
+    def test_modified_newton(self):
+        from sfepy.base.base import IndexedStruct
+        from sfepy.solvers.ls import ScipyDirect
+        from sfepy.solvers.nls import Newton
+
+        fun, fun_grad = define_system()
+        vec_x0 = nm.zeros(50)
+
+        ls = ScipyDirect({})
+
+        status0 = IndexedStruct()
+        nls = Newton({'i_max' : 20, 'eps_a' : 1e-12, 'eps_r' : 1e-12},
+                     fun=fun, fun_grad=fun_grad, lin_solver=ls,
+                     status=status0)
+        sol0 = nls(vec_x0)
+
+        ok = status0.condition == 0
+        self.report('Newton converged:', ok)
+
+        status = IndexedStruct()
+        nls = Newton({'i_max' : 20, 'eps_a' : 1e-12, 'eps_r' : 1e-12,
+                      'reuse_matrix' : 10, 'reuse_ratio' : 0.5},
+                     fun=fun, fun_grad=fun_grad, lin_solver=ScipyDirect({}),
+                     status=status)
+        sol = nls(vec_x0)
+
+        _ok = ((status.condition == 0)
+               and nm.allclose(sol, sol0, atol=1e-10, rtol=0.0))
+        self.report('modified Newton converged: %s, %d/%d iterations'
+                    % (_ok, status.n_iter, status0.n_iter))
+        ok = ok and _ok
+
+        self.report('tangent matrices: %d computed, %d reused, %d rejected'
+                    % (status.n_matrix, status.n_reused, status.n_rejected))
+        _ok = ((status.n_matrix < status0.n_iter)
+               and (status.n_matrix + status.n_reused == status.n_iter))
+        self.report('tangent matrices reused:', _ok)
+        ok = ok and _ok
+
+        # The matrix reuse in the next call.
+        nls.conf.reuse_steps = True
+        nls(vec_x0)
+        sol = nls(vec_x0)
+        _ok = ((status.condition == 0) and (status.n_reused > 0)
+               and nm.allclose(sol, sol0, atol=1e-10, rtol=0.0))
+        self.report('matrix reused in next call: %s, %d computed, %d reused'
+                    % (_ok, status.n_matrix, status.n_reused))
+        ok = ok and _ok
+
+        return ok
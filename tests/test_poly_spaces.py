@@ -296,3 +296,73 @@ class Test(TestCommon):
             ok = ok and _ok
 
         return ok
+
+    def test_base_cache(self):
+        """
+        Test the sharing of reference bases among equivalent fields.
+        """
+        import sfepy
+        from sfepy.base.base import goptions
+        from sfepy.discrete import Integral
+        from sfepy.discrete.fem import Mesh, FEDomain, Field
+        from sfepy.discrete.fem.poly_spaces import (base_cache,
+                                                    clear_base_cache)
+
+        clear_base_cache()
+
+        mesh = Mesh.from_file('meshes/elements/3_8_2.mesh',
+                              prefix_dir=sfepy.data_dir)
+        integral = Integral('i', order=3)
+
+        fields = []
+        for ii in range(2):
+            domain = FEDomain('domain%d' % ii, mesh)
+            omega = domain.create_region('Omega', 'all')
+            field = Field.from_args('f%d' % ii, nm.float64, shape=1,
+                                    region=omega, approx_order=2)
+            fields.append(field)
+
+        f0, f1 = fields
+        ok = True
+        for diff in [0, 1]:
+            bf0 = f0.get_base('v', diff, integral)
+            bf1 = f1.get_base('v', diff, integral)
+
+            qp = f0.get_qp('v', integral)
+            bf = f0.poly_space.eval_base(qp.vals, diff=diff)
+
+            _ok = ((bf0 is bf1) and (not bf0.flags.writeable)
+                   and nm.allclose(bf0, bf, rtol=0.0, atol=1e-14))
+            self.report('diff: %d, shared read-only bases: %s' % (diff, _ok))
+            ok = ok and _ok
+
+        mapping0 = f0.create_mapping(f0.region, integral, 'volume',
+                                     return_mapping=False)
+        goptions['cache_reference_bases'] = False
+        try:
+            f1.clear_qp_base()
+            bf1 = f1.get_base('v', 0, integral)
+            mapping1 = f1.create_mapping(f1.region, integral, 'volume',
+                                         return_mapping=False)
+
+        finally:
+            goptions['cache_reference_bases'] = True
+
+        _ok = ((bf1 is not f0.get_base('v', 0, integral))
+               and nm.allclose(mapping0.bfg, mapping1.bfg, rtol=0.0,
+                               atol=1e-14)
+               and nm.allclose(mapping0.det, mapping1.det, rtol=0.0,
+                               atol=1e-14))
+        self.report('cached and uncached mappings equal:', _ok)
+        ok = ok and _ok
+
+        field = Field.from_args('fh', nm.float64, shape=1,
+                                region=f0.region, approx_order=2,
+                                poly_space_base='lobatto')
+        n_cached = len(base_cache)
+        bf = field.get_base('v', 1, integral)
+        _ok = (field.ori is not None) and (len(base_cache) == n_cached)
+        self.report('per-cell bases not cached:', _ok)
+        ok = ok and _ok
+
+        return ok
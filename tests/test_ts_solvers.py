@@ -0,0 +1,226 @@
+from __future__ import absolute_import
+import numpy as nm
+
+from sfepy.base.base import Struct
+from sfepy.base.testing import TestCommon
+
+class ImplicitEuler(Struct):
+    r"""
+    The implicit Euler step of the ODE system :math:`y' = - \lambda y` in
+    place of a nonlinear solver.
+    """
+
+    def __call__(self, vec0, status=None):
+        if status is not None:
+            status.condition = 0
+            status.n_iter = 1
+
+        return vec0 / (1.0 + self.lam * self.ts.dt)
+
+    def fun(self, vec):
+        return nm.zeros_like(vec)
+
+class NewtonEuler(Struct):
+    r"""
+    The Newton solver of the implicit Euler step of the ODE system :math:`y'
+    = \cos(t) - y^3` in place of a nonlinear solver. The previous solution
+    `y0` has to be set by the time stepping solver hooks.
+    """
+
+    def __call__(self, vec0, status=None):
+        dt, t = self.ts.dt, self.ts.time
+
+        vec = vec0.copy()
+        n_iter = 0
+        while 1:
+            res = vec - self.y0 - dt * (nm.cos(t) - vec**3)
+            if nm.abs(res).max() < 1e-10:
+                break
+
+            vec = vec - res / (1.0 + 3.0 * dt * vec**2)
+            n_iter += 1
+
+        self.n_iter += n_iter
+        if status is not None:
+            status.condition = 0
+            status.n_iter = n_iter
+
+        return vec
+
+    def fun(self, vec):
+        return nm.zeros_like(vec)
+
+def solve_newton_euler(cls, conf):
+    from sfepy.base.base import IndexedStruct
+
+    nls = NewtonEuler(n_iter=0)
+    tss = cls(conf, nls=nls, verbose=False)
+    nls.ts = tss.ts
+
+    def init_fun(ts, vec):
+        nls.y0 = vec.copy()
+        return vec
+
+    def poststep_fun(ts, vec):
+        nls.y0 = vec.copy()
+
+    status = IndexedStruct()
+    vec = tss(nm.array([0.5, 1.0]), init_fun=init_fun,
+              poststep_fun=poststep_fun, status=status)
+
+    return nls.n_iter, vec
+
+def define_chain(n_dof=20):
+    """
+    Define the block residual and matrix functions of a fixed-free chain
+    given by the 1D linear finite element mass and stiffness matrices.
+    """
+    import scipy.sparse as sps
+
+    h = 1.0 / n_dof
+    K = sps.diags([-1.0, 2.0, -1.0], [-1, 0, 1], shape=(n_dof, n_dof),
+                  format='lil') / h
+    M = sps.diags([1.0, 4.0, 1.0], [-1, 0, 1], shape=(n_dof, n_dof),
+                  format='lil') * (h / 6.0)
+    K[-1, -1] *= 0.5
+    M[-1, -1] *= 0.5
+    K, M = K.tocsr(), M.tocsr()
+    C = sps.csr_matrix((n_dof, n_dof))
+
+    def fun(vec):
+        u, v, a = nm.split(vec, 3)
+        return nm.r_[K * u, C * v, M * a]
+
+    def fun_grad(vec):
+        return sps.block_diag((K, C, M), format='csr')
+
+    return Struct(fun=fun, fun_grad=fun_grad), M, K
+
+def solve_ode(cls, conf):
+    from sfepy.base.base import IndexedStruct
+
+    nls = ImplicitEuler(lam=nm.array([1.0, 10.0]))
+    tss = cls(conf, nls=nls, verbose=False)
+    nls.ts = tss.ts
+
+    errs = []
+    def poststep_fun(ts, vec):
+        errs.append(nm.abs(vec - nm.exp(-nls.lam * ts.time)).max())
+
+    status = IndexedStruct()
+    tss(nm.ones(2), poststep_fun=poststep_fun, status=status)
+
+    return status.n_step, max(errs), tss.ts.time
+
+class Test(TestCommon):
+
+    @staticmethod
+    def from_conf(conf, options):
+        test = Test(conf=conf, options=options)
+        return test
+
+    def test_error_control(self):
+        from sfepy.solvers.ts_solvers import (SimpleTimeSteppingSolver,
+                                              AdaptiveTimeSteppingSolver)
+
+        n_step, err, t1 = solve_ode(AdaptiveTimeSteppingSolver,
+                                    {'t0' : 0.0, 't1' : 5.0, 'n_step' : 1001,
+                                     'dt_control' : 'error',
+                                     'err_atol' : 1e-4, 'err_rtol' : 1e-3})
+        self.report('error control: %d steps, max. error: %e'
+                    % (n_step, err))
+
+        n_step0, err0, _ = solve_ode(SimpleTimeSteppingSolver,
+                                     {'t0' : 0.0, 't1' : 5.0,
+                                      'n_step' : 2 * n_step})
+        self.report('fixed time step: %d steps, max. error: %e'
+                    % (n_step0, err0))
+
+        ok = abs(t1 - 5.0) < 1e-12
+        self.report('final time reached:', ok)
+
+        _ok = err < err0
+        self.report('error control more accurate with fewer steps:', _ok)
+        ok = ok and _ok
+
+        return ok
+
+    def test_central_difference(self):
+        import scipy.linalg as sla
+        from sfepy.solvers.ts_solvers import (CentralDifferenceTS,
+                                              get_lumped_mass)
+
+        nls, M, K = define_chain()
+
+        ok = True
+        for kind in ['row_sum', 'hrz']:
+            mass = get_lumped_mass(M, kind)
+            _ok = (abs(mass.sum() - M.sum()) < 1e-12) and (mass > 0).all()
+            self.report('%s lumped mass preserves total mass:' % kind, _ok)
+            ok = ok and _ok
+
+        # The exact solution of the lumped mass system.
+        mass = get_lumped_mass(M, 'row_sum')
+        w2, phi = sla.eigh(K.toarray(), nm.diag(mass))
+        x = nm.linspace(0.05, 1.0, M.shape[0])
+        u0 = 1e-2 * x * (2.0 - x)
+        t1 = 2.0
+        uex = nm.dot(phi, nm.cos(nm.sqrt(w2) * t1) * nm.dot(phi.T, mass * u0))
+        dt_crit = 2.0 / nm.sqrt(w2.max())
+
+        vec0 = nm.r_[u0, nm.zeros_like(u0), nm.zeros_like(u0)]
+
+        errs = []
+        for safety in [0.9, 0.45]:
+            tss = CentralDifferenceTS({'t0' : 0.0, 't1' : t1,
+                                       'dt_auto' : True,
+                                       'dt_safety' : safety,
+                                       'is_linear' : True}, nls=nls)
+            u1 = nm.split(tss(vec0), 3)[0]
+            err = nm.abs(u1 - uex).max() / nm.abs(u0).max()
+            self.report('dt: %e (critical: %e), relative error: %e'
+                        % (tss.ts.dt, dt_crit, err))
+
+            _ok = tss.ts.dt < dt_crit
+            self.report('time step below critical:', _ok)
+            ok = ok and _ok
+
+            errs.append(err)
+
+        _ok = (errs[0] < 1e-2) and (errs[1] < 0.5 * errs[0])
+        self.report('central difference accurate and converging:', _ok)
+        ok = ok and _ok
+
+        return ok
+
+    def test_predictors(self):
+        from sfepy.solvers.ts_solvers import (SimpleTimeSteppingSolver,
+                                              AdaptiveTimeSteppingSolver)
+
+        ok = True
+        for cls, conf, preds in [
+                (SimpleTimeSteppingSolver, {}, ['linear', 'quadratic']),
+                (AdaptiveTimeSteppingSolver,
+                 {'dt_control' : 'error', 'err_atol' : 1e-5},
+                 ['secant', 'quadratic']),
+        ]:
+            conf.update({'t0' : 0.0, 't1' : 10.0, 'n_step' : 201})
+
+            n_iter0, vec0 = solve_newton_euler(cls, conf)
+            self.report('%s constant predictor: %d Newton iterations'
+                        % (cls.name, n_iter0))
+
+            for pred in preds:
+                conf['predictor'] = pred
+                n_iter, vec = solve_newton_euler(cls, conf)
+                self.report('%s predictor: %d Newton iterations'
+                            % (pred, n_iter))
+
+                _ok = (n_iter < n_iter0) and nm.allclose(vec, vec0,
+                                                         atol=1e-6, rtol=0.0)
+                self.report('fewer iterations, same solution:', _ok)
+                ok = ok and _ok
+
+                n_iter0 = n_iter
+
+        return ok